@@ -0,0 +1,225 @@
+# backtest/engine.py
+"""
+Бэктест стратегии на исторических свечах.
+
+Сигналы берутся из strategy.signals.signal_masks (те же правила, что
+Strategy._decide), объём — из OrderManager.calc_qty с балансом симуляции
+и шагами монеты из сохранённого instruments_file (как у живого бота).
+Вход — рыночным ордером по close сигнальной свечи, выход — по TP/SL на
+бирже (триггер LastPrice): уровни проверяются по high/low следующих свечей,
+если в одной свече задеты оба уровня, считается, что сработал SL.
+"""
+import heapq
+import logging
+
+import numpy as np
+
+from exchange.kline_cache import KlineCache
+from orders.order_manager import OrderManager
+from strategy.signals import signal_masks
+from strategy.strategy import Strategy
+from utils.stats_logger import summarize_trades
+
+logger = logging.getLogger("vetlan_strategy")
+
+# Размер первого окна поиска выхода (дальше окно удваивается)
+_SCAN_CHUNK = 256
+
+# Монеты без правил инструмента, о которых уже предупредили (подбор
+# параметров создаёт Backtester на каждую конфигурацию)
+_WARNED = set()
+
+
+def _first_exit(h, l, start, tp, sl, is_long):
+    """
+    Индекс первой свечи >= start, в которой задет TP или SL,
+    и признак срабатывания SL. (None, False), если выхода не было.
+    """
+    n = len(h)
+    chunk = _SCAN_CHUNK
+    while start < n:
+        stop = min(n, start + chunk)
+        if is_long:
+            hit_sl = l[start:stop] <= sl
+            hit_tp = h[start:stop] >= tp
+        else:
+            hit_sl = h[start:stop] >= sl
+            hit_tp = l[start:stop] <= tp
+        hits = np.flatnonzero(hit_sl | hit_tp)
+        if len(hits):
+            i = hits[0]
+            return start + i, bool(hit_sl[i])
+        start = stop
+        chunk *= 2
+    return None, False
+
+
+class Backtester:
+    """
+    settings — словарь в формате BYBIT_CONFIG; fee_pct и slippage_pct —
+    комиссия тейкера и проскальзывание в процентах от цены на каждую сторону.
+    cache — {symbol: dict} для рядов индикаторов между прогонами на тех же
+    свечах (см. signal_masks). instruments — InstrumentsCache для повторных
+    прогонов (по умолчанию загружается из instruments_file).
+    """
+
+    def __init__(self, settings, balance=1000.0, fee_pct=0.055, slippage_pct=0.02, cache=None,
+                 instruments=None):
+        self.settings = settings
+        self.initial_balance = float(balance)
+        self.fee = fee_pct / 100.0
+        self.slippage = slippage_pct / 100.0
+        self.cache = cache
+
+        self.strategy = Strategy(
+            client=None, orders=None, settings=settings, klines=KlineCache(None)
+        )
+        # позиции не запрашиваем: баланс симуляции задаётся перед каждым расчётом;
+        # правила монет — из instruments_file, без обращения к бирже
+        self.orders = OrderManager(client=None, cfg={**settings, "position_book": False})
+        if instruments is not None:
+            self.orders.instruments = instruments
+
+    # ---------------------------
+    # Запуск
+    # ---------------------------
+    def run(self, candles):
+        """
+        candles — {symbol: (ts, open, high, low, close, volume)}, свечи
+        в хронологическом порядке (например, CandleStore.ohlcv).
+        Возвращает словарь с trades, equity (ts, баланс) и summary.
+        """
+        data = {}
+        entries = []
+        for symbol, (ts, o, h, l, c, v) in candles.items():
+            if self.orders.get_instrument(symbol) is None and symbol not in _WARNED:
+                _WARNED.add(symbol)
+                logger.warning(
+                    "[%s] Нет правил инструмента (%s): объём округляется до целого числа контрактов",
+                    symbol,
+                    self.settings.get("instruments_file"),
+                )
+            ts, o, h, l, c, v = (np.asarray(x, dtype=float) for x in (ts, o, h, l, c, v))
+            cache = None if self.cache is None else self.cache.setdefault(symbol, {})
+            masks = signal_masks(self.strategy, o, h, l, c, v, cache=cache)
+            data[symbol] = (ts, o, h, l, c, masks["tp"], masks["sl"], masks["long"])
+            for i in np.flatnonzero(masks["long"] | masks["short"]):
+                entries.append((ts[i], symbol, int(i)))
+
+        # все сигналы всех монет в порядке времени
+        entries.sort(key=lambda e: (e[0], e[1]))
+
+        balance = self.initial_balance
+        equity_ts, equity = [], []
+        trades = []
+        exits = []  # куча (ts выхода, порядковый номер, сделка)
+        busy = set()
+
+        def close_until(now):
+            nonlocal balance
+            while exits and exits[0][0] <= now:
+                _, _, trade = heapq.heappop(exits)
+                balance += trade["pnl"]
+                busy.discard(trade["symbol"])
+                equity_ts.append(trade["exit_ts"])
+                equity.append(balance)
+
+        for entry_ts, symbol, i in entries:
+            close_until(entry_ts)
+            if symbol in busy or balance <= 0:
+                continue
+
+            trade = self._open(symbol, i, data[symbol], balance)
+            if trade is None:
+                continue
+
+            trades.append(trade)
+            busy.add(symbol)
+            if trade["exit_ts"] is not None:
+                heapq.heappush(exits, (trade["exit_ts"], len(trades), trade))
+
+        close_until(np.inf)
+
+        closed = [t for t in trades if t["exit_ts"] is not None]
+        summary = summarize_trades(
+            [t["pnl"] for t in closed],
+            open_trades=len(trades) - len(closed),
+        )
+        summary.update(self._equity_stats(equity))
+
+        return {
+            "trades": trades,
+            "equity": (np.array(equity_ts), np.array(equity)),
+            "summary": summary,
+        }
+
+    # ---------------------------
+    # Симуляция сделки
+    # ---------------------------
+    def _open(self, symbol, i, series, balance):
+        ts, o, h, l, c, tp_s, sl_s, long_s = series
+        is_long = bool(long_s[i])
+        tp, sl = float(tp_s[i]), float(sl_s[i])
+
+        # рыночный вход с проскальзыванием против нас
+        entry = float(c[i]) * (1 + self.slippage if is_long else 1 - self.slippage)
+
+        self.orders.balance.set(balance)
+        try:
+            qty = self.orders.calc_qty(entry, sl, symbol)
+        except RuntimeError:
+            return None
+        if qty <= 0:
+            return None
+
+        trade = {
+            "symbol": symbol,
+            "direction": "long" if is_long else "short",
+            "entry_ts": float(ts[i]),
+            "entry": entry,
+            "tp": tp,
+            "sl": sl,
+            "qty": qty,
+            "exit_ts": None,
+            "exit_price": None,
+            "pnl": None,
+            "roi": None,
+            "result": None,
+        }
+
+        j, stopped = _first_exit(h, l, i + 1, tp, sl, is_long)
+        if j is None:
+            return trade
+
+        # гэп за уровень — исполнение по open свечи
+        level = sl if stopped else tp
+        if is_long:
+            price = min(level, float(o[j])) if stopped else max(level, float(o[j]))
+            exit_price = price * (1 - self.slippage)
+            gross = (exit_price - entry) * qty
+        else:
+            price = max(level, float(o[j])) if stopped else min(level, float(o[j]))
+            exit_price = price * (1 + self.slippage)
+            gross = (entry - exit_price) * qty
+
+        fees = (entry + exit_price) * qty * self.fee
+        pnl = gross - fees
+        trade.update(
+            exit_ts=float(ts[j]),
+            exit_price=exit_price,
+            pnl=pnl,
+            roi=pnl / (entry * qty) * 100,
+            result="sl" if stopped else "tp",
+        )
+        return trade
+
+    def _equity_stats(self, equity):
+        curve = np.concatenate(([self.initial_balance], equity))
+        peak = np.maximum.accumulate(curve)
+        drawdown = (peak - curve) / peak * 100
+        return {
+            "initial_balance": self.initial_balance,
+            "final_balance": float(curve[-1]),
+            "return_pct": float((curve[-1] / self.initial_balance - 1) * 100),
+            "max_drawdown_pct": float(drawdown.max()),
+        }
@@ -0,0 +1,124 @@
+# backtest/optimizer.py
+"""
+Подбор параметров стратегии: перебор по сетке или случайный поиск,
+бэктесты выполняются в пуле процессов.
+
+Каждый процесс один раз открывает архив свечей через memmap (страницы
+файлов общие для всех процессов через кэш ОС) и держит кэш рядов
+индикаторов: например, при переборе rsi_buy ряд RSI считается один раз.
+"""
+import itertools
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from backtest.engine import Backtester
+from exchange.instruments import InstrumentsCache
+from storage.candle_store import CandleStore
+
+# Состояние процесса пула (заполняется в _init_worker)
+_WORKER = {}
+
+
+def grid(space):
+    """
+    Все комбинации параметров: space — {параметр: [значения]}.
+    Возвращает список словарей-переопределений настроек.
+    """
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names))]
+
+
+def random_search(space, count, seed=None):
+    """
+    count случайных конфигураций. Значение в space — список (выбор
+    из него) или кортеж (low, high): равномерно в диапазоне, целые
+    числа, если обе границы целые.
+    """
+    rng = random.Random(seed)
+    configs = []
+    for _ in range(count):
+        config = {}
+        for name, values in space.items():
+            if isinstance(values, tuple):
+                low, high = values
+                if isinstance(low, int) and isinstance(high, int):
+                    config[name] = rng.randint(low, high)
+                else:
+                    config[name] = rng.uniform(low, high)
+            else:
+                config[name] = rng.choice(values)
+        configs.append(config)
+    return configs
+
+
+def rank(results, metric="total_pnl", min_trades=0, top=None):
+    """Сортирует результаты по метрике summary (по убыванию)."""
+    ranked = [
+        r for r in results
+        if r["summary"].get("closed_trades", 0) >= min_trades and metric in r["summary"]
+    ]
+    ranked.sort(key=lambda r: r["summary"][metric], reverse=True)
+    return ranked[:top] if top else ranked
+
+
+def _init_worker(root, symbols, interval, start, end, settings, backtest_kwargs):
+    store = CandleStore(root)
+    candles = {}
+    for symbol in symbols:
+        series = store.ohlcv(symbol, interval, start=start, end=end)
+        if len(series[0]):
+            candles[symbol] = series
+
+    instruments = None
+    if settings.get("instruments", True) and settings.get("instruments_file"):
+        instruments = InstrumentsCache(None, path=settings["instruments_file"])
+
+    _WORKER.update(
+        candles=candles,
+        settings=settings,
+        backtest_kwargs=backtest_kwargs,
+        cache={},
+        instruments=instruments,
+    )
+
+
+def _run_config(overrides):
+    settings = {**_WORKER["settings"], **overrides}
+    result = Backtester(
+        settings,
+        cache=_WORKER["cache"],
+        instruments=_WORKER["instruments"],
+        **_WORKER["backtest_kwargs"],
+    ).run(_WORKER["candles"])
+    return {"params": overrides, "summary": result["summary"]}
+
+
+def optimize(
+    settings,
+    configs,
+    symbols,
+    interval,
+    root="data/candles",
+    start=None,
+    end=None,
+    workers=None,
+    **backtest_kwargs,
+):
+    """
+    Прогоняет бэктест для каждой конфигурации (словаря-переопределения
+    settings). backtest_kwargs передаются в Backtester (balance, fee_pct,
+    slippage_pct). Возвращает список {"params", "summary"} в порядке configs.
+    """
+    workers = workers or os.cpu_count() or 1
+    initargs = (root, list(symbols), str(interval), start, end, dict(settings), backtest_kwargs)
+
+    if workers == 1:
+        _init_worker(*initargs)
+        return [_run_config(c) for c in configs]
+
+    chunksize = max(1, len(configs) // (workers * 8))
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=initargs
+    ) as pool:
+        return list(pool.map(_run_config, configs, chunksize=chunksize))
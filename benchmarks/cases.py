@@ -0,0 +1,239 @@
+# benchmarks/cases.py
+"""
+Замеры горячих путей. Каждый замер — функция подготовки, которая
+возвращает вызываемый объект без аргументов; время меряет runner.
+"""
+import itertools
+import os
+import tempfile
+
+import numpy as np
+
+from benchmarks import datasets
+from exchange.kline_cache import KlineCache, parse_klines
+from exchange.mock_exchange import MockExchange
+from exchange.resampler import Resampler, resample
+from indicators.indicators import (
+    calc_atr,
+    calc_ema,
+    calc_rsi,
+    calc_volume_sma,
+    detect_spring,
+    detect_upthrust,
+)
+from indicators.series import atr_series, ema_series, rsi_series
+from indicators.streaming import IndicatorSet
+from orders.order_manager import OrderManager
+from strategy.strategy import Strategy
+from utils.stats_logger import StatsLogger
+
+# имя -> (функция подготовки, вызовов на один замер)
+BENCHMARKS = {}
+
+
+def benchmark(name, number=1):
+    def register(setup):
+        BENCHMARKS[name] = (setup, number)
+        return setup
+    return register
+
+
+def _ohlcv(bars=1000):
+    rows = next(iter(datasets.candles(1, bars).values()))
+    return rows[1], rows[2], rows[3], rows[4], rows[5]
+
+
+def _settings(symbols):
+    from config.bybit_config import BYBIT_CONFIG
+
+    return {
+        **BYBIT_CONFIG,
+        "coins": list(symbols),
+        "candle_store": None,
+        "position_book": False,
+        "instruments_file": None,
+    }
+
+
+def _strategy(candles):
+    """Strategy и OrderManager на MockExchange (без сети), кэш свечей прогрет."""
+    exchange = MockExchange(candles)
+    settings = _settings(candles)
+    orders = OrderManager(exchange, settings)
+    strategy = Strategy(exchange, orders, settings)
+    for symbol in candles:
+        strategy.analyze_symbol(symbol)
+    return strategy
+
+
+# ---------------------------
+# Индикаторы
+# ---------------------------
+@benchmark("indicators.calc_rsi[1000]", number=200)
+def _calc_rsi():
+    _, _, _, c, _ = _ohlcv()
+    return lambda: calc_rsi(c, 14)
+
+
+@benchmark("indicators.calc_ema[1000]", number=200)
+def _calc_ema():
+    _, _, _, c, _ = _ohlcv()
+    return lambda: calc_ema(c, 50)
+
+
+@benchmark("indicators.calc_atr[1000]", number=200)
+def _calc_atr():
+    _, h, l, c, _ = _ohlcv()
+    return lambda: calc_atr(h, l, c, 14)
+
+
+@benchmark("indicators.calc_volume_sma[1000]", number=1000)
+def _calc_volume_sma():
+    *_, v = _ohlcv()
+    return lambda: calc_volume_sma(v, 20)
+
+
+@benchmark("indicators.detect_patterns", number=10000)
+def _detect_patterns():
+    o, h, l, c, _ = (float(x[-1]) for x in _ohlcv())
+    return lambda: (detect_spring(o, h, l, c), detect_upthrust(o, h, l, c))
+
+
+@benchmark("indicators.series[34x35040]", number=1)
+def _series_matrix():
+    rows = datasets.candles(34, 35040)
+    h = np.stack([r[2] for r in rows.values()])
+    l = np.stack([r[3] for r in rows.values()])
+    c = np.stack([r[4] for r in rows.values()])
+    return lambda: (rsi_series(c, 14), ema_series(c, 50), atr_series(h, l, c, 14))
+
+
+@benchmark("indicators.streaming_update", number=1000)
+def _streaming_update():
+    o, h, l, c, v = _ohlcv()
+    indicators = IndicatorSet(14, 50, 14, 20)
+    for i in range(len(c)):
+        indicators.update(h[i], l[i], c[i], v[i])
+    return lambda: indicators.update(h[-1], l[-1], c[-1], v[-1], new_bar=False)
+
+
+# ---------------------------
+# Свечи
+# ---------------------------
+@benchmark("klines.parse[1000]", number=50)
+def _parse_klines():
+    rows = next(iter(datasets.candles(1, 1000).values()))
+    raw = datasets.raw_klines(rows)
+    return lambda: parse_klines(raw)
+
+
+@benchmark("klines.merge[2 bars]", number=1000)
+def _merge_klines():
+    rows = next(iter(datasets.candles(1, 202).values()))
+    cache = KlineCache(None, history=200)
+    cache.merge("BENCH0USDT", "15", rows[:, :200])
+    tail = np.ascontiguousarray(rows[:, 199:201])
+    return lambda: cache.merge("BENCH0USDT", "15", tail)
+
+
+@benchmark("klines.resample[1000 -> 15m]", number=200)
+def _resample():
+    rows = next(iter(datasets.candles(1, 1000, interval="1").values()))
+    return lambda: resample(rows, 15 * 60_000)
+
+
+@benchmark("klines.resampler_sync[4 tf]", number=500)
+def _resampler_sync():
+    # новая минута в ленте + свечи 5/15/60/240 (история уже загружена)
+    rows = next(iter(datasets.candles(1, 1000, interval="1").values()))
+    resampler = Resampler(MockExchange({"BENCH0USDT": rows}, interval="1"))
+    resampler.update("BENCH0USDT")
+    resampler.prepare("BENCH0USDT")
+    minutes = itertools.count(1)
+    last_ts = rows[0, -1]
+
+    def sync():
+        bar = rows[:, -1:].copy()
+        bar[0] = last_ts + next(minutes) * 60_000
+        resampler.feed.merge("BENCH0USDT", "1", bar)
+        for tf in resampler.timeframes:
+            resampler.ohlcv("BENCH0USDT", tf)
+
+    return sync
+
+
+# ---------------------------
+# Стратегия
+# ---------------------------
+@benchmark("strategy.analyze_symbol", number=20)
+def _analyze_symbol():
+    strategy = _strategy(datasets.candles(1, 1000))
+    return lambda: strategy.analyze_symbol("BENCH0USDT")
+
+
+@benchmark("strategy.analyze_symbol[x100]", number=1)
+def _analyze_symbols():
+    candles = datasets.candles(100, 500)
+    strategy = _strategy(candles)
+    return lambda: [strategy.analyze_symbol(s) for s in candles]
+
+
+@benchmark("strategy.analyze_batch[x100]", number=1)
+def _analyze_batch():
+    candles = datasets.candles(100, 500)
+    strategy = _strategy(candles)
+    return lambda: strategy.analyze_batch(list(candles))
+
+
+# свечи уже в кэше (как в цикле бота после параллельной подгрузки) —
+# сравнение самого анализа: batch_scan имеет смысл, пока второй быстрее
+@benchmark("strategy.analyze_symbol[x300,cached]", number=1)
+def _analyze_symbols_cached():
+    candles = datasets.candles(300, 200)
+    strategy = _strategy(candles)
+    return lambda: [strategy.analyze_symbol(s, refresh=False) for s in candles]
+
+
+@benchmark("strategy.analyze_batch[x300,cached]", number=1)
+def _analyze_batch_cached():
+    candles = datasets.candles(300, 200)
+    strategy = _strategy(candles)
+    return lambda: strategy.analyze_batch(list(candles), refresh=False)
+
+
+@benchmark("strategy.analyze_symbol[recorded]", number=20)
+def _analyze_recorded():
+    candles = datasets.recorded_candles(limit=1)
+    if not candles:
+        return None
+    strategy = _strategy(candles)
+    symbol = next(iter(candles))
+    return lambda: strategy.analyze_symbol(symbol, refresh=False)
+
+
+# ---------------------------
+# Ордера и статистика
+# ---------------------------
+@benchmark("orders.calc_qty", number=10000)
+def _calc_qty():
+    orders = OrderManager(None, _settings([]))
+    orders.balance.set(1000.0)
+    return lambda: orders.calc_qty(100.0, 98.5)
+
+
+@benchmark("orders.calc_qty[instrument]", number=10000)
+def _calc_qty_instrument():
+    candles = datasets.candles(1, 10)
+    orders = OrderManager(MockExchange(candles), _settings(candles))
+    orders.balance.set(1000.0)
+    symbol = next(iter(candles))
+    orders.get_instrument(symbol)  # загрузка правил до замера
+    return lambda: orders.calc_qty(100.0, 98.5, symbol)
+
+
+@benchmark("stats.get_summary[100k]", number=1)
+def _get_summary():
+    path = os.path.join(tempfile.mkdtemp(prefix="vetlan-bench-"), "stats.csv")
+    datasets.stats_csv(path, 100_000)
+    stats = StatsLogger(path)
+    return stats.get_summary
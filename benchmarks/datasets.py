@@ -0,0 +1,62 @@
+# benchmarks/datasets.py
+"""
+Фиксированные наборы данных для замеров: синтетические свечи с постоянным
+seed (одинаковы на любой машине) и, если есть, свечи из архива.
+"""
+import csv
+import os
+import random
+
+from exchange.mock_exchange import synthetic_candles
+from storage.candle_store import CandleStore
+
+# Точка отсчёта времени для синтетических свечей (чтобы данные не зависели от даты запуска)
+_END_MS = 1_700_000_000_000
+
+SEED = 42
+
+
+def candles(symbols=1, bars=1000, interval="15"):
+    """{symbol: (6, bars)} синтетических свечей."""
+    names = [f"BENCH{i}USDT" for i in range(symbols)]
+    return synthetic_candles(names, interval, bars=bars, end_ms=_END_MS, seed=SEED)
+
+
+def recorded_candles(root="data/mainnet/candles", interval="15", bars=1000, limit=None):
+    """Свечи из архива (пустой словарь, если архива нет)."""
+    if not os.path.isdir(os.path.join(root, str(interval))):
+        return {}
+    store = CandleStore(root)
+    names = sorted(f[:-4] for f in os.listdir(os.path.join(root, str(interval))) if f.endswith(".bin"))
+    result = {}
+    for symbol in names[:limit]:
+        rows = store.tail(symbol, interval, bars)
+        if rows.shape[1] == bars:
+            result[symbol] = rows
+    return result
+
+
+def raw_klines(rows):
+    """Свечи (6, n) в ответ get_kline Bybit: строки, от новых к старым."""
+    return [
+        [str(int(r[0])), *(repr(float(x)) for x in r[1:6]), "0"]
+        for r in rows.T[::-1]
+    ]
+
+
+def stats_csv(path, trades=100_000):
+    """stats.csv в формате StatsLogger с trades сделками."""
+    rng = random.Random(SEED)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow([
+            "Дата", "Символ", "Направление", "Цена входа", "TP", "SL",
+            "Цена выхода", "PnL (USDT)", "ROI (%)", "Результат",
+        ])
+        for i in range(trades):
+            pnl = rng.gauss(0, 5)
+            writer.writerow([
+                "2024-01-01 00:00:00", f"BENCH{i % 34}USDT", "LONG",
+                "100.000000", "0.000000", "0.000000", "101.000000",
+                f"{pnl:.4f}", f"{pnl:.2f}", "Прибыль" if pnl > 0 else "Убыток",
+            ])
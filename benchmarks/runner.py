@@ -0,0 +1,108 @@
+# benchmarks/runner.py
+"""
+Запуск замеров (timeit), сохранение результатов в JSON и сравнение
+с результатами другого коммита.
+"""
+import json
+import os
+import platform
+import subprocess
+import timeit
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.cases import BENCHMARKS
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(__file__),
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(names=None, repeat=5, log=print):
+    """
+    Выполняет замеры (все или с именем, содержащим одну из подстрок names).
+    Время — секунды на один вызов: min, median и mean по repeat повторам.
+    """
+    results = {}
+    for name, (setup, number) in BENCHMARKS.items():
+        if names and not any(part in name for part in names):
+            continue
+
+        func = setup()
+        if func is None:
+            log(f"  {name:<40} пропущен (нет данных)")
+            continue
+
+        func()  # прогрев
+        times = np.array(timeit.repeat(func, number=number, repeat=repeat)) / number
+        results[name] = {
+            "min": float(times.min()),
+            "median": float(np.median(times)),
+            "mean": float(times.mean()),
+            "repeat": repeat,
+            "number": number,
+        }
+        log(f"  {name:<40} {format_time(results[name]['median']):>12}")
+    return results
+
+
+def save(results, path=None):
+    """Сохраняет результаты в benchmarks/results/<коммит>.json (или в path)."""
+    commit = git_commit()
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{commit}.json")
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "commit": commit,
+                "date": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "machine": platform.machine(),
+                "results": results,
+            },
+            f,
+            ensure_ascii=False,
+            indent=2,
+        )
+    return path
+
+
+def load(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(base, results, threshold=0.1):
+    """
+    Сравнение медиан с базовыми результатами: список
+    (имя, база, сейчас, отношение, признак регрессии).
+    """
+    rows = []
+    for name, current in results.items():
+        previous = base.get("results", {}).get(name)
+        if previous is None:
+            continue
+        ratio = current["median"] / previous["median"] if previous["median"] else float("inf")
+        rows.append((name, previous["median"], current["median"], ratio, ratio > 1 + threshold))
+    return rows
+
+
+def format_time(seconds):
+    for unit, scale in (("с", 1), ("мс", 1e-3), ("мкс", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} нс"
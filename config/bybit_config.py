@@ -1,16 +1,76 @@
 import os
+from urllib.parse import urlparse
+
 from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def _host_dir(rest_url):
+    """Имя папки для своего адреса API: "http://127.0.0.1:8080" -> "127.0.0.1_8080"."""
+    return (urlparse(rest_url).netloc or rest_url).replace(":", "_")
+
+
+def data_dir(environment, rest_url=None):
+    """
+    Папка данных среды: data/<environment> или, со своим адресом API
+    (например, имитация биржи), data/<хост_порт>. Свечи testnet, mainnet
+    и имитации не смешиваются.
+    """
+    if rest_url:
+        return os.path.join("data", _host_dir(rest_url))
+    return os.path.join("data", environment)
+
+
+def logs_dir(rest_url=None):
+    """Папка журнала сделок: logs или, со своим адресом API, logs/<хост_порт>."""
+    if rest_url:
+        return os.path.join("logs", _host_dir(rest_url))
+    return "logs"
+
+
+ENVIRONMENT = os.getenv("BYBIT_ENV", "testnet").lower()
+REST_URL = os.getenv("BYBIT_REST_URL")
+DATA_DIR = data_dir(ENVIRONMENT, REST_URL)
+
 BYBIT_CONFIG = {
     "api_key": os.getenv("BYBIT_API_KEY"),
     "api_secret": os.getenv("BYBIT_API_SECRET"),
 
     # ВАЖНО: выбор среды
-    "environment": os.getenv("BYBIT_ENV", "testnet").lower(),
+    "environment": ENVIRONMENT,
+    # Свои адреса API вместо Bybit (например, локальная имитация биржи run_mock_exchange.py)
+    "rest_url": REST_URL,
+    "ws_public_url": os.getenv("BYBIT_WS_PUBLIC_URL"),
+    "ws_private_url": os.getenv("BYBIT_WS_PRIVATE_URL"),
 
     "interval": "15",
+    "kline_history": 200,  # Сколько свечей держать в кэше (загружаются один раз, дальше только новые)
+    "candle_store": os.path.join(DATA_DIR, "candles"),  # Папка архива закрытых свечей на диске, своя у каждой среды (None — без архива)
+    "resample": False,  # Режим "rest": запрашивать одну минутную ленту, interval и timeframes собирать из неё
+    "resample_base": "1",  # Базовый интервал ленты для resample
+    "timeframes": ["5", "15", "60", "240"],  # Дополнительные таймфреймы для Strategy.indicators(symbol, timeframe)
+    "batch_scan": False,  # Анализировать все монеты одним векторным проходом (Strategy.analyze_batch)
+    "scan_workers": 8,  # Потоков для параллельного опроса монет (1 = последовательно)
+    "max_concurrent_requests": 8,  # Не больше N одновременных запросов к API Bybit
+    "rate_limits": {"order": 10, "position": 50, "account": 50, "market": 100},  # Запросов в секунду по группам эндпоинтов (None — без планировщика)
+    "rate_limit_total": 100,  # Всего запросов в секунду (лимит Bybit — 600 за 5 секунд с IP)
+    "rate_limit_reserve": 0.2,  # Доля общей квоты, которую свечи не трогают (остаётся ордерам)
+    "recv_window": 5000,  # Окно приёма подписанного запроса, мс (подпись — по времени биржи)
+    "time_sync_interval": 600,  # Раз в N секунд сверять часы с биржей (/v5/market/time)
+    "connect_timeout": 3,  # Таймаут установки соединения, сек
+    "request_timeouts": {"order": 10, "position": 5, "account": 5, "market": 5},  # Таймаут ответа по группам эндпоинтов, сек
+    "request_retries": 2,  # Повторов GET-запроса при сетевой ошибке, 5xx или 10016 (ордера не повторяются)
+    "retry_backoff": 0.25,  # Базовая пауза повтора, сек (удваивается, со случайным разбросом)
+    "circuit_threshold": 5,  # Сбоев подряд, после которых запросы к бирже приостанавливаются
+    "circuit_reset": 30,  # На сколько секунд приостанавливать запросы после сбоев
+    "symbol_timeout": 20,  # Таймаут опроса одной монеты в асинхронном режиме (сек)
+    "market_data": "rest",  # Источник свечей: "rest" (опрос) или "ws" (WebSocket-поток)
+    "ws_trigger": "close",  # Режим "ws": анализ на закрытии свечи ("close") или на каждом обновлении ("update")
+    "schedule": "bar_close",  # Режим "rest": анализ сразу после закрытия свечи ("bar_close") или раз в poll_interval ("poll")
+    "bar_close_delay": 0.05,  # Через сколько секунд после закрытия свечи (по часам биржи) начинать анализ
+    "position_check_interval": 30,  # Между закрытиями свечей: сверка открытых позиций раз в N секунд
+    "private_stream": True,  # Позиции, исполнения и баланс из приватного WebSocket (нужны API-ключи)
 
     "coins": [
         # Топовые монеты
@@ -83,6 +143,33 @@ BYBIT_CONFIG = {
     "min_order_usdt": 5,
     "max_position_pct": 10,  # Максимальный размер позиции в % от баланса
 
+    "position_book": True,  # Загружать все позиции одним запросом (settleCoin=USDT) вместо запроса на каждую монету
+    "position_max_age": 5,  # Сколько секунд снимок позиций считается актуальным
+    "balance_ttl": 60,  # Сколько секунд кэшированный баланс считается актуальным
+    "instruments": True,  # Округлять объём и TP/SL по шагам монеты (get_instruments_info)
+    "instruments_file": os.path.join(DATA_DIR, "instruments.json"),  # Файл с правилами монет, свой у каждой среды (None — только в памяти)
+    "instruments_max_age": 6 * 3600,  # Через сколько секунд обновлять правила (в фоне)
+
+    # Бэктест (run_backtest.py)
+    "backtest_fee_pct": 0.055,  # Комиссия тейкера, % от объёма на каждую сторону
+    "backtest_slippage_pct": 0.02,  # Проскальзывание рыночного исполнения, %
+
+    # Состояние бота (сигналы, ордера, позиции с TP/SL) для тёплого перезапуска
+    "state_store": os.path.join(DATA_DIR, "state.sqlite"),  # Путь к базе SQLite, своя у каждой среды (None — не сохранять)
+
+    # Журнал сделок (logs/stats.csv)
+    "stats_file": os.path.join(logs_dir(REST_URL), "stats.csv"),  # с rest_url — logs/<хост_порт>/stats.csv
+    "stats_backend": "csv",  # "csv" или "sqlite" (logs/stats.sqlite — быстрые выборки по истории)
+    "stats_fsync_interval": 5.0,  # fsync журнала не чаще раза в N секунд
+    "stats_max_bytes": 10 * 1024 * 1024,  # Ротация CSV по размеру (None — без ротации)
+    "stats_rotate_daily": False,  # Ротация CSV раз в сутки
+
+    # Метрики: время запросов к бирже, анализа, Telegram
+    "metrics_port": None,  # Порт эндпоинта Prometheus http://127.0.0.1:<порт>/metrics (None — выключен)
+    "metrics_log_interval": 300,  # Раз в N секунд писать сводку метрик в лог (0 — не писать)
+
     "telegram_token": os.getenv("TELEGRAM_TOKEN"),
     "telegram_chat_id": os.getenv("TELEGRAM_CHAT_ID"),
+    "telegram_queue_size": 100,  # Максимум уведомлений в очереди (лишние отбрасываются)
+    "telegram_batch_window": 1.0,  # Уведомления за N секунд склеиваются в одно сообщение
 }
@@ -0,0 +1,49 @@
+"""
+Загрузка истории свечей с Bybit в локальный архив (storage.candle_store)
+и правил монет в instruments_file (для расчёта объёма в бэктесте).
+
+    python download_candles.py --days 365
+    python download_candles.py --days 30 --symbols BTCUSDT ETHUSDT --interval 5
+"""
+import argparse
+import time
+
+from config.bybit_config import BYBIT_CONFIG
+from exchange.bybit_client import BybitClient
+from exchange.instruments import InstrumentsCache
+from storage.candle_store import CandleStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Загрузка истории свечей в архив")
+    parser.add_argument("--days", type=float, default=30, help="Глубина истории в днях")
+    parser.add_argument("--symbols", nargs="*", help="Монеты (по умолчанию — coins из конфига)")
+    parser.add_argument("--interval", default=BYBIT_CONFIG.get("interval", "15"))
+    parser.add_argument("--root", default=BYBIT_CONFIG.get("candle_store") or "data/candles")
+    args = parser.parse_args()
+
+    client = BybitClient(BYBIT_CONFIG)
+    store = CandleStore(args.root)
+    symbols = args.symbols or BYBIT_CONFIG["coins"]
+
+    end = int(time.time() * 1000)
+    start = end - int(args.days * 86_400_000)
+
+    if BYBIT_CONFIG.get("instruments_file"):
+        try:
+            count = InstrumentsCache(client.client, path=BYBIT_CONFIG["instruments_file"]).refresh()
+            print(f"✅ Правила монет: {count} инструментов в {BYBIT_CONFIG['instruments_file']}")
+        except Exception as e:
+            print(f"❌ Правила монет: {e}")
+
+    for symbol in symbols:
+        try:
+            count = store.download(client.client, symbol, args.interval, start, end)
+            total = len(store.read(symbol, args.interval))
+            print(f"✅ {symbol}: загружено {count} свечей, в архиве {total}")
+        except Exception as e:
+            print(f"❌ {symbol}: {e}")
+
+
+if __name__ == "__main__":
+    main()
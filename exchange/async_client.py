@@ -0,0 +1,143 @@
+# exchange/async_client.py
+import json
+from urllib.parse import urlencode
+
+import aiohttp
+
+from exchange.auth import auth_headers, rest_url
+from exchange.scheduler import RATE_LIMIT_CODE, group_for_path
+from exchange.transport import DEFAULT_TIMEOUTS
+from utils.metrics import METRICS
+
+# Имена эндпоинтов в метриках — как у методов pybit
+_ENDPOINT_NAMES = {
+    "/v5/market/kline": "get_kline",
+    "/v5/position/list": "get_positions",
+    "/v5/account/wallet-balance": "get_wallet_balance",
+    "/v5/order/create": "place_order",
+}
+
+
+class BybitAPIError(RuntimeError):
+    def __init__(self, code, message):
+        super().__init__(f"Ошибка Bybit ({code}): {message}")
+        self.code = code
+
+
+class AsyncBybitClient:
+    """
+    Асинхронный REST-клиент Bybit v5 на aiohttp.
+
+    Методы называются и принимают параметры так же, как у pybit HTTP,
+    и возвращают тот же JSON-ответ. Ненулевой retCode поднимает
+    BybitAPIError (как исключения pybit). С scheduler (RequestScheduler)
+    каждый запрос сначала ждёт квоту своей группы, с clock (ServerClock)
+    запросы подписываются по времени биржи.
+    """
+
+    def __init__(self, config, session=None, scheduler=None, clock=None):
+        self.api_key = config.get("api_key") or ""
+        self.api_secret = config.get("api_secret") or ""
+        self.recv_window = config.get("recv_window", 5000)
+        self.base_url = rest_url(config)
+        self.timeout = config.get("request_timeout", 10)
+        self.max_connections = config.get("max_concurrent_requests", 8)
+        self.scheduler = scheduler
+        self.clock = clock
+        self.timeouts = {**DEFAULT_TIMEOUTS, **(config.get("request_timeouts") or {})}
+        self.connect_timeout = config.get("connect_timeout", 3)
+        self._session = session
+        self._own_session = session is None
+
+    async def __aenter__(self):
+        self._ensure_session()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _ensure_session(self):
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                connector=aiohttp.TCPConnector(limit_per_host=self.max_connections),
+            )
+        return self._session
+
+    @property
+    def session(self):
+        return self._ensure_session()
+
+    async def close(self):
+        if self._session is not None and self._own_session:
+            await self._session.close()
+        self._session = None
+
+    # ---------------------------
+    # Эндпоинты
+    # ---------------------------
+    async def get_kline(self, **params):
+        return await self._request("GET", "/v5/market/kline", params)
+
+    async def get_positions(self, **params):
+        return await self._request("GET", "/v5/position/list", params, auth=True)
+
+    async def get_wallet_balance(self, **params):
+        return await self._request("GET", "/v5/account/wallet-balance", params, auth=True)
+
+    async def place_order(self, **params):
+        return await self._request("POST", "/v5/order/create", params, auth=True)
+
+    # ---------------------------
+    # Запрос
+    # ---------------------------
+    async def _request(self, method, path, params, auth=False):
+        group = group_for_path(path)
+        if self.scheduler is not None:
+            await self.scheduler.acquire_async(group)
+        try:
+            with METRICS.timer("bybit_request_seconds", endpoint=_ENDPOINT_NAMES.get(path, path)):
+                return await self._send(method, path, params, auth, group)
+        except BybitAPIError as e:
+            if e.code == RATE_LIMIT_CODE and self.scheduler is not None:
+                self.scheduler.rate_limited(group)
+            raise
+
+    async def _send(self, method, path, params, auth, group=None):
+        session = self._ensure_session()
+        params = {k: v for k, v in params.items() if v is not None}
+
+        if method == "GET":
+            payload = urlencode(params)
+            url = f"{self.base_url}{path}"
+            if payload:
+                url += f"?{payload}"
+            data = None
+        else:
+            payload = json.dumps(params)
+            url = f"{self.base_url}{path}"
+            data = payload
+
+        headers = {"Content-Type": "application/json"}
+        if auth:
+            headers.update(
+                auth_headers(
+                    self.api_key, self.api_secret, payload, self.recv_window,
+                    self.clock.now_ms() if self.clock is not None else None,
+                )
+            )
+
+        timeout = aiohttp.ClientTimeout(
+            total=self.timeouts.get(group, self.timeout), connect=self.connect_timeout
+        )
+        async with session.request(method, url, data=data, headers=headers, timeout=timeout) as response:
+            if response.status != 200:
+                text = await response.text()
+                raise RuntimeError(f"HTTP {response.status} {path}: {text[:200]}")
+            body = await response.json(content_type=None)
+            if self.scheduler is not None:
+                self.scheduler.update_from_headers(group, response.headers)
+
+        if body.get("retCode") != 0:
+            raise BybitAPIError(body.get("retCode"), body.get("retMsg"))
+        return body
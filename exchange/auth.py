@@ -0,0 +1,42 @@
+# exchange/auth.py
+import hashlib
+import hmac
+import time
+
+MAINNET_REST_URL = "https://api.bybit.com"
+TESTNET_REST_URL = "https://api-testnet.bybit.com"
+
+
+def rest_url(config):
+    """Базовый URL REST API: из конфига (rest_url) или по окружению."""
+    if config.get("rest_url"):
+        return config["rest_url"].rstrip("/")
+    if config.get("environment") == "mainnet":
+        return MAINNET_REST_URL
+    return TESTNET_REST_URL
+
+
+def sign(api_secret, payload):
+    return hmac.new(
+        api_secret.encode("utf-8"),
+        payload.encode("utf-8"),
+        hashlib.sha256,
+    ).hexdigest()
+
+
+def auth_headers(api_key, api_secret, payload, recv_window=5000, timestamp=None):
+    """
+    Заголовки подписи Bybit v5: HMAC-SHA256 от
+    timestamp + api_key + recv_window + payload, где payload — строка
+    запроса (GET) или тело JSON (POST).
+    """
+    if timestamp is None:
+        timestamp = int(time.time() * 1000)
+    signature = sign(api_secret, f"{timestamp}{api_key}{recv_window}{payload}")
+    return {
+        "X-BAPI-API-KEY": api_key,
+        "X-BAPI-SIGN": signature,
+        "X-BAPI-SIGN-TYPE": "2",
+        "X-BAPI-TIMESTAMP": str(timestamp),
+        "X-BAPI-RECV-WINDOW": str(recv_window),
+    }
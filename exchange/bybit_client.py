@@ -1,4 +1,6 @@
-from pybit.unified_trading import HTTP
+from exchange.auth import rest_url
+from exchange.kline_cache import parse_klines
+from exchange.transport import BybitHTTP
 import os
 from dotenv import load_dotenv
 
@@ -10,22 +12,22 @@ class BybitClient:
         self.testnet = config["environment"] != "mainnet"
 
 
-        # Основной HTTP-клиент pybit
-        # recv_window увеличен до 20000 мс для избежания ошибок синхронизации времени
-        self.client = HTTP(
+        # Основной HTTP-клиент pybit: пул соединений, повторы, CircuitBreaker
+        # и подпись по времени биржи (см. exchange/transport.py)
+        self.client = BybitHTTP(
+            config,
             testnet=self.testnet,
             api_key=config["api_key"],
             api_secret=config["api_secret"],
-            recv_window=20000
         )
+        self.clock = self.client.clock
 
-        # Отключаем проверку SSL (ТОЛЬКО в учебных целях)
-        try:
-            self.client._session.verify = False
-        except Exception:
-            pass
+        # Свой адрес REST API (например, локальная имитация биржи)
+        if config.get("rest_url"):
+            self.client.endpoint = rest_url(config)
 
     def get_klines(self, symbol, interval="1", limit=200):
+        """Свечи массивом (6, n): ts, open, high, low, close, volume — от старых к новым."""
         try:
             resp = self.client.get_kline(
                 category="linear",
@@ -33,7 +35,7 @@ class BybitClient:
                 interval=interval,
                 limit=limit
             )
-            return resp.get("result", {}).get("list", [])
+            return parse_klines(resp.get("result", {}).get("list", []))
         except Exception as e:
             raise RuntimeError(f"Ошибка загрузки свечей {symbol}: {e}")
 
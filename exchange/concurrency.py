@@ -0,0 +1,50 @@
+# exchange/concurrency.py
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+
+class HostLimiter:
+    """
+    Ограничение числа одновременных запросов к одному хосту.
+    Один экземпляр можно разделить между несколькими клиентами.
+    """
+
+    def __init__(self, max_per_host=8):
+        self.max_per_host = max(1, int(max_per_host))
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, host):
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.max_per_host)
+                self._semaphores[host] = semaphore
+        with semaphore:
+            yield
+
+
+class LimitedClient:
+    """
+    Прокси над pybit HTTP-клиентом: все публичные методы вызываются
+    через HostLimiter, остальные атрибуты отдаются как есть.
+    """
+
+    def __init__(self, client, limiter):
+        self._client = client
+        self.limiter = limiter
+        endpoint = getattr(client, "endpoint", "") or ""
+        self.host = urlparse(endpoint).netloc or "bybit"
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            with self.limiter.slot(self.host):
+                return attr(*args, **kwargs)
+
+        return call
@@ -0,0 +1,241 @@
+# exchange/instruments.py
+import json
+import logging
+import math
+import os
+import threading
+import time
+
+logger = logging.getLogger("vetlan_strategy")
+
+# Bybit отдаёт не больше 1000 инструментов на страницу
+_PAGE_LIMIT = 1000
+
+# Допуск на ошибку представления float при делении на шаг
+_EPS = 1e-9
+
+# После неудачной загрузки — не чаще раза в столько секунд
+_RETRY_AFTER = 60
+
+
+def _decimals(step):
+    """Количество знаков после запятой у шага ("0.001" -> 3)."""
+    text = f"{step:.12f}".rstrip("0")
+    return len(text.split(".")[1]) if "." in text else 0
+
+
+class Instrument:
+    """
+    Правила торговли одной монетой: шаг цены (tick_size), шаг объёма
+    (qty_step), минимальный/максимальный объём и минимальная сумма ордера.
+    Квантование — целое число шагов во float, без Decimal.
+    """
+
+    __slots__ = (
+        "symbol", "tick_size", "qty_step", "min_qty", "max_qty", "min_notional",
+        "_price_decimals", "_qty_decimals",
+    )
+
+    def __init__(self, symbol, tick_size, qty_step, min_qty, max_qty, min_notional=0.0):
+        self.symbol = symbol
+        self.tick_size = float(tick_size)
+        self.qty_step = float(qty_step)
+        self.min_qty = float(min_qty)
+        self.max_qty = float(max_qty)
+        self.min_notional = float(min_notional or 0)
+        self._price_decimals = _decimals(self.tick_size)
+        self._qty_decimals = _decimals(self.qty_step)
+
+    # ---------------------------
+    # Объём
+    # ---------------------------
+    def floor_qty(self, qty):
+        steps = math.floor(qty / self.qty_step + _EPS)
+        return round(steps * self.qty_step, self._qty_decimals)
+
+    def ceil_qty(self, qty):
+        steps = math.ceil(qty / self.qty_step - _EPS)
+        return round(steps * self.qty_step, self._qty_decimals)
+
+    def format_qty(self, qty):
+        return f"{qty:.{self._qty_decimals}f}"
+
+    # ---------------------------
+    # Цена
+    # ---------------------------
+    def round_price(self, price):
+        """Ближайшая цена, кратная tick_size."""
+        steps = math.floor(price / self.tick_size + 0.5)
+        return round(steps * self.tick_size, self._price_decimals)
+
+    def format_price(self, price):
+        return f"{price:.{self._price_decimals}f}"
+
+    # ---------------------------
+    # Сохранение
+    # ---------------------------
+    def to_dict(self):
+        return {
+            "tick_size": self.tick_size,
+            "qty_step": self.qty_step,
+            "min_qty": self.min_qty,
+            "max_qty": self.max_qty,
+            "min_notional": self.min_notional,
+        }
+
+    @classmethod
+    def from_info(cls, info):
+        """Запись из ответа get_instruments_info."""
+        lot = info.get("lotSizeFilter", {})
+        price = info.get("priceFilter", {})
+        # для рыночных ордеров действует свой (меньший) максимум
+        max_qty = lot.get("maxMktOrderQty") or lot.get("maxOrderQty") or "inf"
+        return cls(
+            info["symbol"],
+            price.get("tickSize") or "0.0001",
+            lot.get("qtyStep") or "1",
+            lot.get("minOrderQty") or lot.get("qtyStep") or "1",
+            max_qty,
+            lot.get("minNotionalValue") or 0,
+        )
+
+
+class InstrumentsCache:
+    """
+    Правила торговли всеми монетами linear: загружаются одним постраничным
+    запросом get_instruments_info, сохраняются в path (JSON) и читаются
+    оттуда при следующем запуске. Старше max_age секунд — обновляются
+    в фоновом потоке, пока используется прежний снимок. warm_up()
+    загружает правила при запуске; после неудачной загрузки get()
+    _RETRY_AFTER секунд возвращает None, не обращаясь к бирже.
+    client=None — только снимок из path, без обращений к бирже
+    (бэктест); без файла get() возвращает None.
+    """
+
+    def __init__(self, client, path="data/instruments.json", max_age=6 * 3600, category="linear"):
+        self.client = client
+        self.path = path
+        self.max_age = max_age
+        self.category = category
+
+        self._instruments = None
+        self._updated_at = 0.0  # time.time() загрузки с биржи
+        self._failed_at = None  # time.monotonic() неудачной первой загрузки
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def get(self, symbol):
+        """Instrument по монете или None, если биржа такой не знает."""
+        instruments = self._instruments
+        if instruments is None:
+            instruments = self._load_or_fetch()
+            if instruments is None:
+                return None
+        elif self.client is not None and time.time() - self._updated_at > self.max_age:
+            self._refresh_in_background()
+        return instruments.get(symbol)
+
+    def warm_up(self):
+        """Загружает правила при запуске, чтобы первый сигнал не ждал сеть; False — не удалось."""
+        try:
+            return self._load_or_fetch() is not None
+        except Exception as e:
+            logger.warning("Не удалось загрузить правила инструментов: %s", e)
+            return False
+
+    # ---------------------------
+    # Загрузка
+    # ---------------------------
+    def refresh(self):
+        """Загружает все страницы инструментов (по nextPageCursor) и сохраняет на диск."""
+        instruments = {}
+        cursor = None
+        while True:
+            params = {"category": self.category, "limit": _PAGE_LIMIT}
+            if cursor:
+                params["cursor"] = cursor
+            resp = self.client.get_instruments_info(**params)
+            if resp.get("retCode", 0) != 0:
+                raise RuntimeError(f"Ошибка Bybit ({resp.get('retCode')}): {resp.get('retMsg')}")
+
+            result = resp.get("result", {})
+            for info in result.get("list", []):
+                if info.get("status", "Trading") == "Trading":
+                    instruments[info["symbol"]] = Instrument.from_info(info)
+
+            cursor = result.get("nextPageCursor")
+            if not cursor:
+                break
+
+        self._instruments = instruments
+        self._updated_at = time.time()
+        self._save()
+        return len(instruments)
+
+    def _load_or_fetch(self):
+        """Снимок с диска или с биржи; None — пауза после неудачной загрузки."""
+        with self._lock:
+            if self._instruments is None and not self._load():
+                if self.client is None:
+                    self._instruments = {}
+                    return self._instruments
+                if self._failed_at is not None and time.monotonic() - self._failed_at < _RETRY_AFTER:
+                    return None
+                try:
+                    self.refresh()
+                except Exception:
+                    self._failed_at = time.monotonic()
+                    raise
+            return self._instruments
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning("Не удалось обновить инструменты: %s", e)
+                # следующая попытка — не раньше чем через _RETRY_AFTER секунд
+                self._updated_at = time.time() - self.max_age + _RETRY_AFTER
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name="instruments-refresh", daemon=True).start()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._instruments = {
+                symbol: Instrument(symbol, **fields)
+                for symbol, fields in data.get("instruments", {}).items()
+            }
+            self._updated_at = float(data.get("updated_at", 0))
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning("Не удалось прочитать %s: %s", self.path, e)
+            return False
+        return True
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(
+                    {
+                        "updated_at": self._updated_at,
+                        "instruments": {s: i.to_dict() for s, i in self._instruments.items()},
+                    },
+                    f,
+                )
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning("Не удалось сохранить %s: %s", self.path, e)
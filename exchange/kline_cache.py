@@ -0,0 +1,227 @@
+# exchange/kline_cache.py
+import logging
+import time
+
+import numpy as np
+
+from utils.metrics import METRICS
+
+logger = logging.getLogger("vetlan_strategy")
+
+# Bybit отдаёт не больше 1000 свечей за запрос
+MAX_KLINE_LIMIT = 1000
+
+# Колонки внутреннего хранилища
+TS, OPEN, HIGH, LOW, CLOSE, VOLUME = range(6)
+
+
+def parse_klines(klines):
+    """
+    Список свечей из ответа get_kline (строки [ts, open, high, low, close,
+    volume, turnover], от новых к старым) -> массив float64 формы (6, n)
+    в хронологическом порядке. Вся матрица строк разбирается одним
+    вызовом NumPy; при неверной форме — ValueError.
+    """
+    if len(klines) == 0:
+        return np.empty((6, 0), dtype=float)
+
+    rows = np.array(klines, dtype=float)
+    if rows.ndim != 2 or rows.shape[1] < 6:
+        raise ValueError(f"Некорректный формат свечей: форма {rows.shape}")
+
+    rows = rows[:, :6]
+    ts = rows[:, TS]
+    if len(ts) > 1 and not (ts[1:] > ts[:-1]).all():
+        if (ts[1:] < ts[:-1]).all():
+            # обычный случай: Bybit отдаёт от новых к старым
+            rows = rows[::-1]
+        else:
+            rows = rows[np.argsort(ts, kind="stable")]
+    return np.ascontiguousarray(rows.T)
+
+
+def interval_to_ms(interval):
+    """
+    Длительность свечи в миллисекундах для интервала Bybit.
+    Для месячного интервала ("M") длительность не фиксирована — возвращаем None.
+    """
+    interval = str(interval)
+    if interval.isdigit():
+        return int(interval) * 60_000
+    if interval == "D":
+        return 86_400_000
+    if interval == "W":
+        return 7 * 86_400_000
+    return None
+
+
+class KlineCache:
+    """
+    Локальный кэш свечей по паре (symbol, interval).
+
+    Первый запрос загружает полную историю (history свечей), дальше
+    подгружаются только свечи начиная с последней сохранённой: она
+    перезаписывается (формирующаяся свеча), новые добавляются в конец.
+    Свечи хранятся в хронологическом порядке (от старых к новым).
+
+    С архивом store (storage.candle_store.CandleStore) кэш при первом
+    обращении берёт историю с диска и догружает с биржи только недостающие
+    свечи, а закрытые свечи дописывает в архив.
+
+    clock — ServerClock: сколько свечей догружать, считается по времени
+    биржи (None — по локальным часам).
+    """
+
+    def __init__(self, client, history=200, store=None, clock=None):
+        self.client = client
+        self.history = history
+        self.store = store
+        self.clock = clock
+        # (symbol, interval) -> np.ndarray формы (6, n): ts, open, high, low, close, volume
+        self._store = {}
+
+    # ---------------------------
+    # Публичный интерфейс
+    # ---------------------------
+    def update(self, symbol, interval):
+        """
+        Подтягивает новые свечи с биржи и возвращает кортеж массивов
+        (ts, open, high, low, close, volume).
+        """
+        limit = self.request_limit(symbol, interval)
+        resp = self._fetch(symbol, interval, limit)
+        if not self.apply(symbol, interval, resp, limit):
+            # разрыв в истории — перезагружаем целиком
+            resp = self._fetch(symbol, interval, self.history)
+            self.apply(symbol, interval, resp, self.history)
+
+        return self.ohlcv(symbol, interval)
+
+    def request_limit(self, symbol, interval):
+        """Сколько свечей нужно запросить, чтобы догнать биржу."""
+        data = self._store.get((symbol, str(interval)))
+        if data is None and self.store is not None:
+            data = self._warm_up(symbol, interval)
+        if data is None or data.shape[1] == 0:
+            return self.history
+
+        interval_ms = interval_to_ms(interval)
+        if interval_ms is None:
+            return self.history
+
+        now_ms = self.clock.now_ms() if self.clock is not None else int(time.time() * 1000)
+        behind = max(0, (now_ms - int(data[TS, -1])) // interval_ms)
+        # последняя сохранённая свеча + новые + запас на рассинхрон часов
+        limit = int(behind) + 2
+        if limit >= min(self.history, MAX_KLINE_LIMIT):
+            return self.history
+        return limit
+
+    def apply(self, symbol, interval, resp, limit):
+        """
+        Применяет ответ get_kline, запрошенный с лимитом limit.
+        Возвращает False, если между кэшем и ответом разрыв — тогда кэш
+        по паре очищен и нужно запросить полную историю.
+        """
+        if resp.get("retCode") != 0:
+            raise RuntimeError(
+                f"Ошибка Bybit ({resp.get('retCode')}): {resp.get('retMsg')}"
+            )
+
+        with METRICS.timer("kline_parse_seconds"):
+            rows = parse_klines(resp.get("result", {}).get("list", []))
+        if limit >= self.history:
+            self._store[(symbol, str(interval))] = rows[:, -self.history:]
+            self._persist(symbol, interval)
+            return True
+        return self.merge(symbol, interval, rows)
+
+    def merge(self, symbol, interval, rows):
+        """
+        Вливает свечи rows (форма (6, k), хронологический порядок) в кэш.
+        Свечи с уже известным временем открытия перезаписываются.
+        Возвращает False при разрыве в истории (кэш по паре очищается).
+        """
+        key = (symbol, str(interval))
+        data = self._store.get(key)
+
+        if rows.shape[1] == 0:
+            return True
+        if data is None or data.shape[1] == 0:
+            self._store[key] = rows[:, -self.history:]
+            self._persist(symbol, interval)
+            return True
+
+        first_new = rows[TS, 0]
+        if first_new > data[TS, -1] and not self._is_adjacent(data[TS, -1], first_new, interval):
+            self._store.pop(key, None)
+            return False
+
+        keep = data[:, data[TS] < first_new]
+        self._store[key] = np.concatenate((keep, rows), axis=1)[:, -self.history:]
+        self._persist(symbol, interval)
+        return True
+
+    def ohlcv(self, symbol, interval):
+        data = self._store.get((symbol, str(interval)))
+        if data is None:
+            empty = np.empty(0, dtype=float)
+            return empty, empty, empty, empty, empty, empty
+        return (
+            data[TS],
+            data[OPEN],
+            data[HIGH],
+            data[LOW],
+            data[CLOSE],
+            data[VOLUME],
+        )
+
+    def last_timestamp(self, symbol, interval):
+        data = self._store.get((symbol, str(interval)))
+        if data is None or data.shape[1] == 0:
+            return None
+        return int(data[TS, -1])
+
+    def reset(self, symbol=None):
+        if symbol is None:
+            self._store.clear()
+            return
+        for key in [k for k in self._store if k[0] == symbol]:
+            del self._store[key]
+
+    # ---------------------------
+    # Внутренние методы
+    # ---------------------------
+    def _is_adjacent(self, last_ts, next_ts, interval):
+        interval_ms = interval_to_ms(interval)
+        if interval_ms is None:
+            return True
+        return next_ts - last_ts <= interval_ms
+
+    def _warm_up(self, symbol, interval):
+        """Последние history свечей из архива (None, если архив пуст)."""
+        rows = self.store.tail(symbol, interval, self.history)
+        if rows.shape[1] == 0:
+            return None
+        self._store[(symbol, str(interval))] = rows
+        return rows
+
+    def _persist(self, symbol, interval):
+        """Дописывает в архив закрытые свечи (все, кроме последней — она формируется)."""
+        if self.store is None:
+            return
+        data = self._store.get((symbol, str(interval)))
+        if data is None or data.shape[1] < 2:
+            return
+        try:
+            self.store.append(symbol, interval, data[:, :-1])
+        except OSError as e:
+            logger.warning("[%s] Не удалось записать свечи в архив: %s", symbol, e)
+
+    def _fetch(self, symbol, interval, limit):
+        return self.client.get_kline(
+            category="linear",
+            symbol=symbol,
+            interval=interval,
+            limit=min(limit, MAX_KLINE_LIMIT),
+        )
@@ -0,0 +1,194 @@
+# exchange/market_stream.py
+import logging
+import threading
+import time
+
+import numpy as np
+
+from exchange.ws_connection import WsConnection
+
+logger = logging.getLogger("vetlan_strategy")
+
+MAINNET_WS_PUBLIC = "wss://stream.bybit.com/v5/public/linear"
+TESTNET_WS_PUBLIC = "wss://stream-testnet.bybit.com/v5/public/linear"
+
+# Bybit принимает не больше 10 топиков в одном запросе subscribe
+_SUBSCRIBE_CHUNK = 10
+
+
+def public_ws_url(config):
+    if config.get("ws_public_url"):
+        return config["ws_public_url"]
+    if config.get("environment") == "mainnet":
+        return MAINNET_WS_PUBLIC
+    return TESTNET_WS_PUBLIC
+
+
+class MarketDataStream(WsConnection):
+    """
+    Публичные потоки kline/tickers для списка монет.
+
+    Свечи вливаются в KlineCache стратегии; при разрыве истории (или после
+    переподключения) недостающие свечи догружаются через REST в отдельном
+    потоке — поток приёма WebSocket сетевых запросов не делает.
+    trigger="close" — событие только на закрытии свечи,
+    trigger="update" — на каждом обновлении свечи.
+    """
+
+    def __init__(self, klines, symbols, interval, url, trigger="close", stale_after=60, **kwargs):
+        super().__init__(url, name="market-ws", **kwargs)
+        self.klines = klines
+        self.symbols = list(symbols)
+        self.interval = str(interval)
+        self.trigger = trigger
+        self.stale_after = stale_after
+
+        self._lock = threading.Lock()
+        self._updated = threading.Condition()
+        # монета -> нужно ли событие после догрузки
+        self._backfills = threading.Condition()
+        self._pending = {}
+        self._dirty = set()
+        self._last_seen = {}
+        self._last_price = {}
+
+    def start(self):
+        super().start()
+        thread = threading.Thread(target=self._backfill_loop, name=f"{self.name}-backfill", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        with self._backfills:
+            self._backfills.notify_all()
+        super().stop(timeout)
+
+    # ---------------------------
+    # Для стратегии и основного цикла
+    # ---------------------------
+    def is_live(self, symbol):
+        """Свечи по монете актуальны и обновляются из потока."""
+        seen = self._last_seen.get(symbol)
+        return (
+            self.connected.is_set()
+            and seen is not None
+            and time.monotonic() - seen < self.stale_after
+        )
+
+    def last_price(self, symbol):
+        if not self.is_live(symbol):
+            return None
+        return self._last_price.get(symbol)
+
+    def wait_for_updates(self, timeout):
+        """
+        Ждёт событий по свечам (см. trigger) не дольше timeout секунд.
+        Возвращает множество монет, по которым были события.
+        """
+        with self._updated:
+            self._updated.wait_for(lambda: self._dirty, timeout=timeout)
+            dirty, self._dirty = self._dirty, set()
+        return dirty
+
+    # ---------------------------
+    # WebSocket
+    # ---------------------------
+    def on_connect(self):
+        topics = [f"kline.{self.interval}.{s}" for s in self.symbols]
+        topics += [f"tickers.{s}" for s in self.symbols]
+        for i in range(0, len(topics), _SUBSCRIBE_CHUNK):
+            self.send({"op": "subscribe", "args": topics[i:i + _SUBSCRIBE_CHUNK]})
+
+        # пока не было связи, свечи могли закрыться — догружаем через REST
+        for symbol in self.symbols:
+            self._request_backfill(symbol)
+
+    def on_data(self, message):
+        topic = message.get("topic", "")
+        if topic.startswith("kline."):
+            self._on_kline(topic.rsplit(".", 1)[-1], message.get("data", []))
+        elif topic.startswith("tickers."):
+            data = message.get("data", {})
+            if data.get("lastPrice"):
+                self._last_price[data.get("symbol") or topic.rsplit(".", 1)[-1]] = float(data["lastPrice"])
+
+    def _on_kline(self, symbol, bars):
+        if not bars:
+            return
+
+        rows = np.array(
+            [
+                [b["start"], b["open"], b["high"], b["low"], b["close"], b["volume"]]
+                for b in bars
+            ],
+            dtype=float,
+        )
+        rows = np.ascontiguousarray(rows[np.argsort(rows[:, 0], kind="stable")].T)
+
+        with self._lock:
+            if self.klines.last_timestamp(symbol, self.interval) is None:
+                merged = False
+            else:
+                merged = self.klines.merge(symbol, self.interval, rows)
+
+        self._last_seen[symbol] = time.monotonic()
+
+        closed = any(b.get("confirm") for b in bars)
+        notify = closed or self.trigger == "update"
+        if not merged:
+            # событие — когда история догружена
+            self._request_backfill(symbol, notify)
+        elif notify:
+            self._notify(symbol)
+
+    def _notify(self, symbol):
+        with self._updated:
+            self._dirty.add(symbol)
+            self._updated.notify_all()
+
+    # ---------------------------
+    # Догрузка через REST
+    # ---------------------------
+    def _request_backfill(self, symbol, notify=False):
+        with self._backfills:
+            self._pending[symbol] = self._pending.get(symbol, False) or notify
+            self._backfills.notify_all()
+
+    def _backfill_loop(self):
+        while True:
+            with self._backfills:
+                self._backfills.wait_for(lambda: self._pending or self._stop.is_set())
+                if self._stop.is_set():
+                    return
+                symbol = next(iter(self._pending))
+                notify = self._pending.pop(symbol)
+            if self._backfill(symbol) and notify:
+                self._notify(symbol)
+
+    def _backfill(self, symbol):
+        """
+        Догружает свечи монеты. Запрос к бирже — без блокировки кэша,
+        под блокировкой только расчёт лимита и применение ответа.
+        """
+        klines = self.klines
+        try:
+            with self._lock:
+                limit = klines.request_limit(symbol, self.interval)
+            resp = self._fetch(symbol, limit)
+            with self._lock:
+                applied = klines.apply(symbol, self.interval, resp, limit)
+            if not applied:
+                # разрыв в истории — перезагружаем целиком
+                resp = self._fetch(symbol, klines.history)
+                with self._lock:
+                    klines.apply(symbol, self.interval, resp, klines.history)
+            return True
+        except Exception as e:
+            logger.warning("[%s] Не удалось догрузить свечи через REST: %s", symbol, e)
+            return False
+
+    def _fetch(self, symbol, limit):
+        return self.klines.client.get_kline(
+            category="linear", symbol=symbol, interval=self.interval, limit=limit
+        )
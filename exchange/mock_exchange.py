@@ -0,0 +1,535 @@
+# exchange/mock_exchange.py
+"""
+Локальная имитация Bybit для нагрузочных тестов и замеров без сети.
+
+MockExchange повторяет методы pybit HTTP, которыми пользуется бот
+(get_kline, get_positions, get_wallet_balance, place_order), и может
+подставляться вместо BybitClient.client напрямую. MockHttpServer отдаёт
+те же данные по REST (/v5/...), exchange.mock_ws.MockWsServer — по
+WebSocket.
+
+Свечи проигрываются по часам ReplayClock с ускорением speed (или
+вручную через step()); рыночные ордера исполняются по close текущей
+свечи, TP/SL — по high/low свечей (как в бэктесте). Задержка, ошибки и
+ответы rate limit добавляются параметрами latency, error_rate, rate_limit.
+"""
+import json
+import math
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+from pybit.exceptions import InvalidRequestError
+
+from exchange.kline_cache import CLOSE, HIGH, LOW, OPEN, TS, VOLUME, interval_to_ms
+from exchange.resampler import resample
+
+RATE_LIMIT_CODE = 10006
+SERVICE_ERROR_CODE = 10016
+PARAM_ERROR_CODE = 10001
+
+_POSITIONS_PAGE = 20
+
+
+def synthetic_candles(symbols, interval="15", bars=2000, end_ms=None, seed=0):
+    """
+    Случайное блуждание цены: {symbol: массив формы (6, bars)} в формате
+    KlineCache (ts, open, high, low, close, volume), последняя свеча
+    открывается в end_ms (по умолчанию — текущая свеча).
+    """
+    rng = np.random.default_rng(seed)
+    interval_ms = interval_to_ms(interval)
+    if end_ms is None:
+        end_ms = int(time.time() * 1000)
+    end_ms -= end_ms % interval_ms
+    ts = end_ms - interval_ms * np.arange(bars - 1, -1, -1, dtype=float)
+
+    candles = {}
+    for k, symbol in enumerate(symbols):
+        start_price = 10 ** rng.uniform(-1, 4)
+        close = start_price * np.exp(np.cumsum(rng.normal(0, 0.004, bars)))
+        open_ = np.concatenate(([start_price], close[:-1]))
+        wick = np.abs(rng.normal(0, 0.002, (2, bars)))
+        high = np.maximum(open_, close) * (1 + wick[0])
+        low = np.minimum(open_, close) * (1 - wick[1])
+        volume = rng.uniform(100, 10_000, bars)
+        candles[symbol] = np.array([ts, open_, high, low, close, volume])
+    return candles
+
+
+class ReplayClock:
+    """
+    Время биржи: start_ms плюс прошедшее реальное время, умноженное на
+    speed (speed=0 — время идёт только через advance()).
+    """
+
+    def __init__(self, start_ms, speed=1.0):
+        self.start_ms = start_ms
+        self.speed = speed
+        self._t0 = time.monotonic()
+        self._offset = 0
+
+    def now_ms(self):
+        elapsed = (time.monotonic() - self._t0) * 1000 * self.speed
+        return int(self.start_ms + elapsed + self._offset)
+
+    def advance(self, ms):
+        self._offset += ms
+
+
+class MockExchange:
+    """
+    candles — {symbol: (6, n)} свечей интервала interval (хронологический
+    порядок). По умолчанию часы стоят на последней свече.
+    latency — секунды (или (min, max)) задержки на каждый запрос;
+    error_rate — доля запросов с ошибкой 10016; rate_limit — запросов
+    в секунду, сверх которых отвечаем 10006 (0 — без ограничения).
+    """
+
+    def __init__(
+        self,
+        candles,
+        interval="15",
+        balance=10_000.0,
+        start_ms=None,
+        speed=0.0,
+        latency=0.0,
+        error_rate=0.0,
+        rate_limit=0,
+        fee_pct=0.055,
+        slippage_pct=0.0,
+        seed=0,
+    ):
+        self.interval = str(interval)
+        self.interval_ms = interval_to_ms(interval)
+        self.candles = {s: np.asarray(rows, dtype=float) for s, rows in candles.items()}
+        if start_ms is None:
+            start_ms = max(int(rows[TS, -1]) for rows in self.candles.values())
+        self.clock = ReplayClock(start_ms, speed)
+
+        self.balance = float(balance)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.fee = fee_pct / 100.0
+        self.slippage = slippage_pct / 100.0
+
+        # правила торговли: шаги цены и объёма по уровню цены монеты
+        self.instruments = {
+            s: _instrument_info(s, float(rows[CLOSE, -1]))
+            for s, rows in self.candles.items()
+            if rows.shape[1]
+        }
+
+        self.positions = {}
+        self.orders = []
+        self.executions = []
+        self.request_count = 0
+
+        self._rng = random.Random(seed)
+        self._requests = deque()
+        self._listeners = []
+        self._lock = threading.RLock()
+
+    # ---------------------------
+    # Управление имитацией
+    # ---------------------------
+    def step(self, bars=1):
+        """Сдвигает часы на bars свечей и отрабатывает TP/SL."""
+        self.clock.advance(bars * self.interval_ms)
+        self.process_triggers()
+
+    def subscribe(self, listener):
+        """listener(topic, data) — события приватного потока (order, execution, position, wallet)."""
+        self._listeners.append(listener)
+
+    def visible(self, symbol):
+        """Свечи, открывшиеся к текущему времени часов (последняя формируется)."""
+        rows = self.candles.get(symbol)
+        if rows is None:
+            return np.empty((6, 0))
+        end = np.searchsorted(rows[TS], self.clock.now_ms(), side="right")
+        return rows[:, :end]
+
+    def last_price(self, symbol):
+        rows = self.visible(symbol)
+        if rows.shape[1] == 0:
+            return None
+        return float(rows[CLOSE, -1])
+
+    # ---------------------------
+    # Методы pybit HTTP
+    # ---------------------------
+    def get_kline(self, category="linear", symbol=None, interval=None, limit=200, start=None, end=None, **_):
+        self._before_request("get_kline")
+        rows = self.visible(symbol)
+        interval = str(interval or self.interval)
+        factor = (interval_to_ms(interval) or self.interval_ms) // self.interval_ms
+        if factor > 1:
+            rows = resample(rows, factor * self.interval_ms)
+
+        if start is not None:
+            rows = rows[:, rows[TS] >= int(start)]
+        if end is not None:
+            rows = rows[:, rows[TS] <= int(end)]
+        rows = rows[:, -min(int(limit), 1000):]
+
+        klines = [
+            [str(int(r[TS])), *(_fmt(x) for x in r[OPEN:VOLUME + 1]), _fmt(r[CLOSE] * r[VOLUME])]
+            for r in rows.T[::-1]
+        ]
+        return self._ok({"category": category, "symbol": symbol, "list": klines})
+
+    def get_instruments_info(self, category="linear", symbol=None, limit=500, cursor=None, **_):
+        self._before_request("get_instruments_info")
+        symbols = [symbol] if symbol else sorted(self.instruments)
+        offset = int(cursor or 0)
+        limit = min(int(limit), 1000)
+        page = [self.instruments[s] for s in symbols[offset:offset + limit] if s in self.instruments]
+        next_cursor = str(offset + limit) if offset + limit < len(symbols) else ""
+        return self._ok({"category": category, "list": page, "nextPageCursor": next_cursor})
+
+    def get_positions(self, category="linear", symbol=None, settleCoin=None, limit=_POSITIONS_PAGE, cursor=None, **_):
+        self._before_request("get_positions")
+        with self._lock:
+            self.process_triggers()
+            if symbol is not None:
+                pos = self.positions.get(symbol)
+                return self._ok({"category": category, "list": [self._position_view(symbol, pos)]})
+
+            symbols = sorted(self.positions)
+            offset = int(cursor or 0)
+            limit = int(limit)
+            page = symbols[offset:offset + limit]
+            next_cursor = str(offset + limit) if offset + limit < len(symbols) else ""
+            return self._ok({
+                "category": category,
+                "list": [self._position_view(s, self.positions[s]) for s in page],
+                "nextPageCursor": next_cursor,
+            })
+
+    def get_wallet_balance(self, accountType="UNIFIED", **_):
+        self._before_request("get_wallet_balance")
+        with self._lock:
+            self.process_triggers()
+            return self._ok({"list": [self._wallet_view(accountType)]})
+
+    def place_order(self, category="linear", symbol=None, side=None, orderType="Market", qty=None,
+                    takeProfit=None, stopLoss=None, reduceOnly=False, **_):
+        self._before_request("place_order")
+        if orderType != "Market":
+            self._error(PARAM_ERROR_CODE, "Mock exchange supports Market orders only")
+        price = self.last_price(symbol)
+        if price is None:
+            self._error(PARAM_ERROR_CODE, f"Unknown symbol {symbol}")
+        qty = float(qty)
+        if qty <= 0:
+            self._error(PARAM_ERROR_CODE, "Qty invalid")
+        lot = self.instruments.get(symbol, {}).get("lotSizeFilter")
+        if lot:
+            steps = qty / float(lot["qtyStep"])
+            if abs(steps - round(steps)) > 1e-6:
+                self._error(PARAM_ERROR_CODE, "Order quantity has too many decimals.")
+            if qty < float(lot["minOrderQty"]) or qty > float(lot["maxMktOrderQty"]):
+                self._error(PARAM_ERROR_CODE, "Qty invalid")
+
+        with self._lock:
+            self.process_triggers()
+            fill = price * (1 + self.slippage if side == "Buy" else 1 - self.slippage)
+            order_id = f"mock-{len(self.orders) + 1}"
+            order = {
+                "orderId": order_id,
+                "symbol": symbol,
+                "side": side,
+                "orderType": orderType,
+                "qty": _fmt(qty),
+                "avgPrice": _fmt(fill),
+                "orderStatus": "Filled",
+                "reduceOnly": bool(reduceOnly),
+                "createdTime": str(self.clock.now_ms()),
+            }
+            self.orders.append(order)
+            self._emit("order", [order])
+            self._fill(symbol, side, qty, fill, order_id, takeProfit, stopLoss)
+
+        return self._ok({"orderId": order_id, "orderLinkId": ""})
+
+    # ---------------------------
+    # TP/SL
+    # ---------------------------
+    def process_triggers(self):
+        """Закрывает позиции, у которых к текущему времени задет TP или SL."""
+        with self._lock:
+            for symbol, pos in list(self.positions.items()):
+                rows = self.visible(symbol)
+                rows = rows[:, rows[TS] > pos["_checked_ts"]]
+                if rows.shape[1] == 0:
+                    continue
+
+                is_long = pos["side"] == "Buy"
+                tp, sl = pos["takeProfit"], pos["stopLoss"]
+                for bar in rows.T:
+                    stopped = sl is not None and (bar[LOW] <= sl if is_long else bar[HIGH] >= sl)
+                    taken = tp is not None and (bar[HIGH] >= tp if is_long else bar[LOW] <= tp)
+                    if stopped or taken:
+                        price = sl if stopped else tp
+                        side = "Sell" if is_long else "Buy"
+                        self._fill(symbol, side, pos["size"], price, f"tpsl-{len(self.executions) + 1}")
+                        break
+                else:
+                    # последняя свеча ещё формируется — проверим её снова
+                    pos["_checked_ts"] = rows[TS, -2] if rows.shape[1] > 1 else pos["_checked_ts"]
+
+    # ---------------------------
+    # Внутренние методы
+    # ---------------------------
+    def _fill(self, symbol, side, qty, price, order_id, take_profit=None, stop_loss=None):
+        fee = qty * price * self.fee
+        pos = self.positions.get(symbol)
+        closed_pnl = 0.0
+        closed_size = 0.0  # сколько позиции закрыла сделка (по факту, а не по PnL)
+
+        if pos is None:
+            pos = {
+                "side": side,
+                "size": qty,
+                "avgPrice": price,
+                "takeProfit": float(take_profit) if take_profit else None,
+                "stopLoss": float(stop_loss) if stop_loss else None,
+                "_checked_ts": self.clock.now_ms(),
+            }
+            self.positions[symbol] = pos
+        elif pos["side"] == side:
+            total = pos["size"] + qty
+            pos["avgPrice"] = (pos["avgPrice"] * pos["size"] + price * qty) / total
+            pos["size"] = total
+        else:
+            closed = min(qty, pos["size"])
+            closed_size = closed
+            direction = 1 if pos["side"] == "Buy" else -1
+            closed_pnl = (price - pos["avgPrice"]) * closed * direction
+            pos["size"] -= closed
+            if pos["size"] <= 0:
+                del self.positions[symbol]
+
+        self.balance += closed_pnl - fee
+        execution = {
+            "symbol": symbol,
+            "orderId": order_id,
+            "side": side,
+            "execPrice": _fmt(price),
+            "execQty": _fmt(qty),
+            "execFee": _fmt(fee),
+            "closedSize": _fmt(closed_size),
+            "execPnl": _fmt(closed_pnl),
+            "execTime": str(self.clock.now_ms()),
+        }
+        self.executions.append(execution)
+        self._emit("execution", [execution])
+        self._emit("position", [self._position_view(symbol, self.positions.get(symbol))])
+        self._emit("wallet", [self._wallet_view("UNIFIED")])
+
+    def _position_view(self, symbol, pos):
+        if pos is None:
+            return {"symbol": symbol, "side": "", "size": "0", "avgPrice": "0", "entryPrice": "0"}
+        return {
+            "symbol": symbol,
+            "side": pos["side"],
+            "size": _fmt(pos["size"]),
+            "avgPrice": _fmt(pos["avgPrice"]),
+            "entryPrice": _fmt(pos["avgPrice"]),
+            "takeProfit": _fmt(pos["takeProfit"] or 0),
+            "stopLoss": _fmt(pos["stopLoss"] or 0),
+            "positionIdx": 0,
+        }
+
+    def _wallet_view(self, account_type):
+        return {
+            "accountType": account_type,
+            "coin": [{"coin": "USDT", "walletBalance": _fmt(self.balance)}],
+        }
+
+    def _emit(self, topic, data):
+        for listener in list(self._listeners):
+            try:
+                listener(topic, data)
+            except Exception:
+                pass
+
+    def _before_request(self, name):
+        """Задержка, rate limit и случайные ошибки — до обработки запроса."""
+        self.request_count += 1
+        latency = self.latency
+        if isinstance(latency, (tuple, list)):
+            latency = self._rng.uniform(*latency)
+        if latency:
+            time.sleep(latency)
+
+        if self.rate_limit:
+            now = time.monotonic()
+            with self._lock:
+                while self._requests and now - self._requests[0] >= 1:
+                    self._requests.popleft()
+                limited = len(self._requests) >= self.rate_limit
+                if not limited:
+                    self._requests.append(now)
+            if limited:
+                self._error(RATE_LIMIT_CODE, "Too many visits!", name)
+
+        if self.error_rate and self._rng.random() < self.error_rate:
+            self._error(SERVICE_ERROR_CODE, "Internal System Error.", name)
+
+    def limit_headers(self):
+        """Заголовки X-Bapi-Limit-* как у Bybit (только при rate_limit)."""
+        if not self.rate_limit:
+            return {}
+        now = time.monotonic()
+        with self._lock:
+            used = sum(1 for t in self._requests if now - t < 1)
+            oldest = self._requests[0] if self._requests else now
+        reset = time.time() + max(0.0, 1 - (now - oldest))
+        return {
+            "X-Bapi-Limit": str(self.rate_limit),
+            "X-Bapi-Limit-Status": str(max(0, self.rate_limit - used)),
+            "X-Bapi-Limit-Reset-Timestamp": str(int(reset * 1000)),
+        }
+
+    def _ok(self, result):
+        return {
+            "retCode": 0,
+            "retMsg": "OK",
+            "result": result,
+            "retExtInfo": {},
+            "time": self.clock.now_ms(),
+        }
+
+    @staticmethod
+    def _error(code, message, request=""):
+        raise InvalidRequestError(
+            request=request,
+            message=message,
+            status_code=code,
+            time=datetime.now(timezone.utc).strftime("%H:%M:%S"),
+            resp_headers=None,
+        )
+
+
+def _fmt(value):
+    return f"{float(value):.10g}"
+
+
+def _instrument_info(symbol, price):
+    """Правила торговли в формате get_instruments_info: ~5 значащих цифр цены, шаг объёма ~50 USDT."""
+    tick = 10.0 ** (math.floor(math.log10(price)) - 4)
+    step = 10.0 ** min(0, math.floor(math.log10(50 / price)))
+    return {
+        "symbol": symbol,
+        "status": "Trading",
+        "priceFilter": {"tickSize": _fmt_step(tick)},
+        "lotSizeFilter": {
+            "qtyStep": _fmt_step(step),
+            "minOrderQty": _fmt_step(step),
+            "maxOrderQty": _fmt_step(step * 1e6),
+            "maxMktOrderQty": _fmt_step(step * 1e5),
+            "minNotionalValue": "5",
+        },
+    }
+
+
+def _fmt_step(value):
+    return f"{value:.10f}".rstrip("0").rstrip(".")
+
+
+# ---------------------------
+# REST-сервер
+# ---------------------------
+_ROUTES = {
+    ("GET", "/v5/market/kline"): "get_kline",
+    ("GET", "/v5/market/instruments-info"): "get_instruments_info",
+    ("GET", "/v5/position/list"): "get_positions",
+    ("GET", "/v5/account/wallet-balance"): "get_wallet_balance",
+    ("POST", "/v5/order/create"): "place_order",
+}
+
+
+class MockHttpServer:
+    """
+    REST API Bybit v5 поверх MockExchange на http://host:port
+    (подпись запросов не проверяется). Запускается в фоновом потоке.
+    """
+
+    def __init__(self, exchange, host="127.0.0.1", port=0):
+        self.exchange = exchange
+        handler = type("Handler", (_Handler,), {"exchange": exchange})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="mock-http", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    exchange = None
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _dispatch(self, method):
+        url = urlsplit(self.path)
+        if method == "GET" and url.path == "/v5/market/time":
+            now = self.exchange.clock.now_ms()
+            self._reply(200, self.exchange._ok({"timeSecond": str(now // 1000), "timeNano": str(now * 10**6)}))
+            return
+
+        name = _ROUTES.get((method, url.path))
+        if name is None:
+            self._reply(404, {"retCode": 404, "retMsg": "Not Found"})
+            return
+
+        if method == "GET":
+            params = dict(parse_qsl(url.query))
+        else:
+            length = int(self.headers.get("Content-Length") or 0)
+            params = json.loads(self.rfile.read(length) or b"{}")
+
+        try:
+            body = getattr(self.exchange, name)(**params)
+        except InvalidRequestError as e:
+            body = {"retCode": e.status_code, "retMsg": e.message, "result": {}, "retExtInfo": {}}
+        except (TypeError, ValueError) as e:
+            body = {"retCode": PARAM_ERROR_CODE, "retMsg": str(e), "result": {}, "retExtInfo": {}}
+        self._reply(200, body, self.exchange.limit_headers())
+
+    def _reply(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
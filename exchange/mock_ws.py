@@ -0,0 +1,279 @@
+# exchange/mock_ws.py
+"""
+WebSocket-потоки Bybit v5 поверх MockExchange (только стандартная библиотека).
+
+/v5/public/linear — топики kline.{interval}.{symbol} и tickers.{symbol};
+/v5/private — order, execution, position, wallet (op=auth принимается
+с любыми ключами).
+"""
+import base64
+import hashlib
+import json
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+from exchange.kline_cache import CLOSE, HIGH, LOW, OPEN, TS, VOLUME
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+_PRIVATE_TOPICS = ("order", "execution", "position", "wallet")
+
+
+class MockWsServer:
+    """
+    Запускается в фоновом потоке; каждые tick секунд рассылает
+    подписчикам обновления свечей и цен по часам MockExchange.
+    """
+
+    def __init__(self, exchange, host="127.0.0.1", port=0, tick=0.5):
+        self.exchange = exchange
+        self.tick = tick
+        self.clients = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+        handler = type("Handler", (_WsHandler,), {"owner": self})
+        self.server = socketserver.ThreadingTCPServer((host, port), handler, bind_and_activate=False)
+        self.server.daemon_threads = True
+        self.server.allow_reuse_address = True
+        self.server.server_bind()
+        self.server.server_activate()
+
+        exchange.subscribe(self._on_private)
+
+    @property
+    def public_url(self):
+        host, port = self.server.server_address[:2]
+        return f"ws://{host}:{port}/v5/public/linear"
+
+    @property
+    def private_url(self):
+        host, port = self.server.server_address[:2]
+        return f"ws://{host}:{port}/v5/private"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name="mock-ws", daemon=True).start()
+        threading.Thread(target=self._publish_loop, name="mock-ws-publish", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self.server.shutdown()
+        self.server.server_close()
+        with self._lock:
+            clients = list(self.clients)
+        for client in clients:
+            client.close()
+
+    # ---------------------------
+    # Рассылка
+    # ---------------------------
+    def _publish_loop(self):
+        while not self._stop.wait(self.tick):
+            self.exchange.process_triggers()
+            with self._lock:
+                clients = [c for c in self.clients if not c.private]
+            for client in clients:
+                for topic in list(client.topics):
+                    message = self._public_message(client, topic)
+                    if message is not None:
+                        client.send(message)
+
+    def _public_message(self, client, topic):
+        parts = topic.split(".")
+        now = int(time.time() * 1000)
+        if parts[0] == "kline" and len(parts) == 3:
+            rows = self.exchange.visible(parts[2])
+            if rows.shape[1] == 0:
+                return None
+            last_sent = client.sent.get(topic)
+            new = rows[:, rows[TS] >= last_sent] if last_sent is not None else rows[:, -1:]
+            client.sent[topic] = rows[TS, -1]
+            interval_ms = self.exchange.interval_ms
+            data = []
+            for i, bar in enumerate(new.T):
+                data.append({
+                    "start": int(bar[TS]),
+                    "end": int(bar[TS]) + interval_ms - 1,
+                    "interval": parts[1],
+                    "open": str(bar[OPEN]),
+                    "close": str(bar[CLOSE]),
+                    "high": str(bar[HIGH]),
+                    "low": str(bar[LOW]),
+                    "volume": str(bar[VOLUME]),
+                    "turnover": str(bar[CLOSE] * bar[VOLUME]),
+                    # закрыты все свечи, кроме последней
+                    "confirm": i < new.shape[1] - 1,
+                    "timestamp": now,
+                })
+            return {"topic": topic, "type": "snapshot", "ts": now, "data": data}
+
+        if parts[0] == "tickers" and len(parts) == 2:
+            price = self.exchange.last_price(parts[1])
+            if price is None:
+                return None
+            return {
+                "topic": topic,
+                "type": "snapshot",
+                "ts": now,
+                "data": {"symbol": parts[1], "lastPrice": str(price)},
+            }
+        return None
+
+    def _on_private(self, topic, data):
+        message = {
+            "topic": topic,
+            "id": f"mock-{time.monotonic_ns()}",
+            "creationTime": int(time.time() * 1000),
+            "data": data,
+        }
+        with self._lock:
+            clients = [c for c in self.clients if c.private and c.authorized and topic in c.topics]
+        for client in clients:
+            client.send(message)
+
+
+class _WsHandler(socketserver.BaseRequestHandler):
+    owner = None
+
+    def setup(self):
+        self.topics = set()
+        self.sent = {}
+        self.private = False
+        self.authorized = False
+        self._send_lock = threading.Lock()
+        self._closed = False
+
+    def handle(self):
+        if not self._handshake():
+            return
+        with self.owner._lock:
+            self.owner.clients.add(self)
+        try:
+            while not self._closed:
+                frame = self._read_frame()
+                if frame is None:
+                    break
+                opcode, payload = frame
+                if opcode == 0x8:
+                    break
+                if opcode == 0x9:
+                    self._send_frame(0xA, payload)
+                elif opcode == 0x1:
+                    self._on_message(payload)
+        finally:
+            with self.owner._lock:
+                self.owner.clients.discard(self)
+
+    def send(self, message):
+        try:
+            self._send_frame(0x1, json.dumps(message).encode("utf-8"))
+        except OSError:
+            self.close()
+
+    def close(self):
+        self._closed = True
+        try:
+            self.request.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    # ---------------------------
+    # Протокол Bybit
+    # ---------------------------
+    def _on_message(self, payload):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            return
+
+        op = message.get("op")
+        args = message.get("args") or []
+        if op == "ping":
+            self.send({"success": True, "ret_msg": "pong", "op": "ping"})
+        elif op == "auth":
+            self.authorized = True
+            self.send({"success": True, "ret_msg": "", "op": "auth"})
+        elif op == "subscribe":
+            if self.private and not self.authorized:
+                self.send({"success": False, "ret_msg": "Request not authorized", "op": op})
+                return
+            self.topics.update(args)
+            self.send({"success": True, "ret_msg": "", "op": op})
+        elif op == "unsubscribe":
+            self.topics.difference_update(args)
+            self.send({"success": True, "ret_msg": "", "op": op})
+
+    # ---------------------------
+    # WebSocket (RFC 6455)
+    # ---------------------------
+    def _handshake(self):
+        data = b""
+        while b"\r\n\r\n" not in data:
+            chunk = self.request.recv(4096)
+            if not chunk:
+                return False
+            data += chunk
+
+        lines = data.split(b"\r\n\r\n", 1)[0].decode("latin-1").split("\r\n")
+        path = lines[0].split(" ")[1] if len(lines[0].split(" ")) > 1 else "/"
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        key = headers.get("sec-websocket-key")
+        if not key:
+            return False
+        self.private = path.startswith("/v5/private")
+        accept = base64.b64encode(hashlib.sha1((key + _WS_GUID).encode()).digest()).decode()
+        self.request.sendall(
+            (
+                "HTTP/1.1 101 Switching Protocols\r\n"
+                "Upgrade: websocket\r\n"
+                "Connection: Upgrade\r\n"
+                f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+            ).encode()
+        )
+        return True
+
+    def _recv_exact(self, size):
+        data = b""
+        while len(data) < size:
+            chunk = self.request.recv(size - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return data
+
+    def _read_frame(self):
+        header = self._recv_exact(2)
+        if header is None:
+            return None
+        opcode = header[0] & 0x0F
+        masked = header[1] & 0x80
+        length = header[1] & 0x7F
+        if length == 126:
+            length = struct.unpack(">H", self._recv_exact(2))[0]
+        elif length == 127:
+            length = struct.unpack(">Q", self._recv_exact(8))[0]
+        mask = self._recv_exact(4) if masked else None
+        payload = self._recv_exact(length) if length else b""
+        if payload is None:
+            return None
+        if mask:
+            payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        return opcode, payload
+
+    def _send_frame(self, opcode, payload):
+        length = len(payload)
+        if length < 126:
+            header = struct.pack(">BB", 0x80 | opcode, length)
+        elif length < 1 << 16:
+            header = struct.pack(">BBH", 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack(">BBQ", 0x80 | opcode, 127, length)
+        with self._send_lock:
+            self.request.sendall(header + payload)
@@ -0,0 +1,191 @@
+# exchange/private_stream.py
+import logging
+import queue
+import threading
+import time
+
+from exchange.auth import sign
+from exchange.ws_connection import WsConnection
+
+logger = logging.getLogger("vetlan_strategy")
+
+MAINNET_WS_PRIVATE = "wss://stream.bybit.com/v5/private"
+TESTNET_WS_PRIVATE = "wss://stream-testnet.bybit.com/v5/private"
+
+TOPICS = ("order", "execution", "position", "wallet")
+
+
+def private_ws_url(config):
+    if config.get("ws_private_url"):
+        return config["ws_private_url"]
+    if config.get("environment") == "mainnet":
+        return MAINNET_WS_PRIVATE
+    return TESTNET_WS_PRIVATE
+
+
+class PrivateStream(WsConnection):
+    """
+    Приватные потоки order/execution/position/wallet.
+
+    Позиции и баланс OrderManager обновляются в момент события: pending
+    снимается сразу после исполнения, PositionBook и BalanceCache не
+    требуют опроса. Исполнения пишутся в StateStore (fills). Когда позиция
+    закрывается (TP, SL или вручную), в очередь closes кладётся
+    (symbol, exit_price, fee, position): exit_price — средняя цена
+    закрывающих исполнений, fee — комиссии за вход и выход, position —
+    последняя открытая позиция из потока. Закрытие завершается, когда
+    closedSize исполнений покрыл весь объём позиции (закрытие может
+    исполниться частями). Очередь разбирает основной цикл; on_close с теми
+    же аргументами вызывается в потоке WebSocket.
+
+    clock — ServerClock: срок действия подписи авторизации считается по
+    времени биржи, как и у REST-запросов.
+
+    После (пере)подключения позиции сверяются через REST; до этого
+    is_live() возвращает False и бот опрашивает позиции как обычно.
+    """
+
+    def __init__(self, api_key, api_secret, orders, url, state=None, on_close=None, clock=None, **kwargs):
+        super().__init__(url, name="private-ws", **kwargs)
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.orders = orders
+        self.state = state
+        self.on_close = on_close
+        self.clock = clock
+
+        self._synced = threading.Event()
+        self._lock = threading.Lock()
+        # symbol -> комиссии и закрывающие исполнения текущей позиции
+        self._fills = {}
+        # позиция закрыта, ждём оставшиеся закрывающие исполнения
+        self._closing = set()
+        # symbol -> позиция до закрытия (для записи о сделке)
+        self._closed = {}
+        self.closes = queue.SimpleQueue()
+
+    def is_live(self):
+        """Поток подключён, авторизован и позиции сверены."""
+        return self.connected.is_set() and self._synced.is_set()
+
+    # ---------------------------
+    # WebSocket
+    # ---------------------------
+    def on_connect(self):
+        self._synced.clear()
+        now_ms = self.clock.now_ms() if self.clock is not None else time.time() * 1000
+        expires = int(now_ms + 10_000)
+        signature = sign(self.api_secret, f"GET/realtime{expires}")
+        self.send({"op": "auth", "args": [self.api_key, expires, signature]})
+
+    def on_response(self, message):
+        if message.get("op") != "auth":
+            return
+        if not message.get("success"):
+            logger.warning("[%s] Авторизация не прошла: %s", self.name, message.get("ret_msg"))
+            return
+        self.send({"op": "subscribe", "args": list(TOPICS)})
+        # пока не было связи, позиции могли измениться — сверяемся через REST
+        threading.Thread(target=self._resync, name="private-ws-resync", daemon=True).start()
+
+    def on_data(self, message):
+        topic = message.get("topic", "")
+        data = message.get("data", [])
+        if topic == "order":
+            for order in data:
+                self.orders.apply_order_update(order)
+        elif topic == "execution":
+            for execution in data:
+                self._on_execution(execution)
+        elif topic == "position":
+            for position in data:
+                self._on_position(position)
+        elif topic == "wallet":
+            self.orders.balance.apply_wallet_update(data)
+
+    # ---------------------------
+    # Обработка событий
+    # ---------------------------
+    def _on_execution(self, execution):
+        symbol = execution.get("symbol")
+        price = float(execution.get("execPrice") or 0)
+        qty = float(execution.get("execQty") or 0)
+        fee = float(execution.get("execFee") or 0)
+        closed = float(execution.get("closedSize") or 0)
+
+        if self.state is not None:
+            self.state.record_fill(
+                symbol, execution.get("side"), price, qty, fee,
+                order_id=execution.get("orderId"),
+                exec_id=execution.get("execId"),
+                ts=int(execution.get("execTime") or 0) or None,
+            )
+
+        # финансирование и прочие не торговые исполнения в сделку не входят
+        if execution.get("execType", "Trade") != "Trade":
+            return
+
+        with self._lock:
+            fills = self._fills.setdefault(symbol, {"fee": 0.0, "exit_qty": 0.0, "exit_value": 0.0})
+            fills["fee"] += fee
+            if closed > 0:
+                fills["exit_qty"] += closed
+                fills["exit_value"] += price * closed
+            finished = symbol in self._closing and self._fully_closed(symbol)
+        if finished:
+            self._finish(symbol)
+
+    def _on_position(self, position):
+        symbol = position.get("symbol")
+        previous = self.orders.position_cache.get(symbol)
+        self.orders.apply_position_update(position)
+
+        if float(position.get("size", 0) or 0) > 0:
+            return
+        if not previous or previous.get("pending"):
+            return
+
+        with self._lock:
+            self._closed[symbol] = previous
+            finished = self._fully_closed(symbol)
+            if not finished:
+                self._closing.add(symbol)
+        if finished:
+            self._finish(symbol)
+
+    def _fully_closed(self, symbol):
+        """Закрывающие исполнения покрыли объём закрытой позиции (вызывать под self._lock)."""
+        fills = self._fills.get(symbol)
+        if fills is None or fills["exit_qty"] <= 0:
+            return False
+        size = float((self._closed.get(symbol) or {}).get("size") or 0)
+        return fills["exit_qty"] >= size * (1 - 1e-9)
+
+    def _finish(self, symbol):
+        with self._lock:
+            self._closing.discard(symbol)
+            fills = self._fills.pop(symbol, None)
+            position = self._closed.pop(symbol, None)
+        if fills is None:
+            return
+        event = (symbol, fills["exit_value"] / fills["exit_qty"], fills["fee"], position)
+        self.closes.put(event)
+        if self.on_close is None:
+            return
+        try:
+            self.on_close(*event)
+        except Exception as e:
+            logger.warning("[%s] Ошибка обработки закрытия позиции: %s", symbol, e)
+
+    def _resync(self):
+        orders = self.orders
+        try:
+            if orders.positions is not None:
+                orders.positions.refresh()
+            for symbol in list(orders.position_cache):
+                orders.refresh_position(symbol)
+        except Exception as e:
+            logger.warning("[%s] Не удалось сверить позиции: %s", self.name, e)
+            return
+        self._synced.set()
+        logger.info("[%s] Позиции и исполнения — из приватного потока", self.name)
@@ -0,0 +1,197 @@
+# exchange/resampler.py
+import threading
+
+import numpy as np
+
+from exchange.kline_cache import (
+    CLOSE, HIGH, LOW, MAX_KLINE_LIMIT, OPEN, TS, VOLUME,
+    KlineCache, interval_to_ms, parse_klines,
+)
+
+_EMPTY = np.empty((6, 0))
+
+
+def resample(rows, interval_ms, offset_ms=0):
+    """
+    Свечи (6, n) в свечи большего интервала interval_ms одним векторным
+    проходом (reduceat по границам корзин). Порядок — хронологический.
+    """
+    if rows.shape[1] == 0:
+        return rows
+    bucket = ((rows[TS] - offset_ms) // interval_ms).astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], rows.shape[1]] - 1
+    return np.array([
+        bucket[starts] * float(interval_ms) + offset_ms,
+        rows[OPEN, starts],
+        np.maximum.reduceat(rows[HIGH], starts),
+        np.minimum.reduceat(rows[LOW], starts),
+        rows[CLOSE, ends],
+        np.add.reduceat(rows[VOLUME], starts),
+    ])
+
+
+def _fold(bars, agg, history):
+    """Дописывает к bars свечи agg; первая из них может продолжать последнюю свечу bars."""
+    if agg.shape[1] == 0:
+        return bars
+    if bars.shape[1] and bars[TS, -1] == agg[TS, 0]:
+        last = bars[:, -1].copy()
+        last[HIGH] = max(last[HIGH], agg[HIGH, 0])
+        last[LOW] = min(last[LOW], agg[LOW, 0])
+        last[CLOSE] = agg[CLOSE, 0]
+        last[VOLUME] += agg[VOLUME, 0]
+        bars = np.concatenate([bars[:, :-1], last[:, None], agg[:, 1:]], axis=1)
+    else:
+        bars = np.concatenate([bars, agg], axis=1)
+    return bars[:, -history:]
+
+
+class _Timeframe:
+    """Свечи одного таймфрейма монеты: закрытые минуты уже свёрнуты в bars."""
+
+    __slots__ = ("bars", "folded_ts")
+
+    def __init__(self, bars, folded_ts):
+        self.bars = bars
+        # ts последней базовой свечи, учтённой в bars
+        self.folded_ts = folded_ts
+
+
+class Resampler:
+    """
+    Мультитаймфрейм из одной ленты: на монету хранится одна минутная
+    лента (base), свечи 5/15/60/240 строятся из неё локально — один
+    get_kline на монету за цикл вместо запроса на каждый таймфрейм.
+
+    История старшего таймфрейма загружается с биржи один раз, при первом
+    обращении; дальше в него сворачиваются только новые закрытые минуты
+    (векторно), а формирующаяся минута накладывается на последнюю свечу
+    при чтении. Базовая лента держит не меньше минут, чем в самом старшем
+    таймфрейме из timeframes, чтобы текущая свеча собиралась целиком.
+
+    feed — готовый KlineCache для базовой ленты (иначе создаётся свой).
+    """
+
+    def __init__(self, client, base="1", timeframes=("5", "15", "60", "240"), history=200, store=None,
+                 feed=None):
+        self.base = str(base)
+        self.base_ms = interval_to_ms(self.base)
+        if self.base_ms is None:
+            raise ValueError(f"Базовый интервал {base} не поддерживается")
+        self.history = history
+        self.timeframes = list(dict.fromkeys(str(tf) for tf in timeframes if str(tf) != self.base))
+
+        widest = 1
+        for tf in self.timeframes:
+            bars = self._check(tf)
+            if bars + 2 > MAX_KLINE_LIMIT:
+                raise ValueError(f"Таймфрейм {tf} длиннее {MAX_KLINE_LIMIT - 2} базовых свечей")
+            widest = max(widest, bars)
+        self.feed = feed or KlineCache(client, history=history, store=store)
+        self.feed.history = max(self.feed.history, widest + 2)
+        self._state = {}
+        # свой замок на (symbol, timeframe): загрузка истории одной пары
+        # не держит остальные; общий замок — только для словаря замков
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        return self.feed.client
+
+    def _check(self, timeframe):
+        """Сколько базовых свечей в одной свече timeframe (ValueError, если не кратно)."""
+        tf_ms = interval_to_ms(timeframe)
+        # недельные свечи Bybit начинаются с понедельника, а не с эпохи — не собираем
+        if tf_ms is None or str(timeframe) == "W" or tf_ms % self.base_ms:
+            raise ValueError(f"Таймфрейм {timeframe} не кратен базовому {self.base}")
+        return tf_ms // self.base_ms
+
+    # ---------------------------
+    # Публичный интерфейс
+    # ---------------------------
+    def update(self, symbol, timeframe=None):
+        """Подтягивает новые минуты с биржи; со timeframe — возвращает его свечи."""
+        self.feed.update(symbol, self.base)
+        if timeframe is not None:
+            return self.ohlcv(symbol, timeframe)
+        return None
+
+    def ohlcv(self, symbol, timeframe):
+        """Свечи timeframe кортежем (ts, open, high, low, close, volume) без запроса к бирже."""
+        timeframe = str(timeframe)
+        base = self.feed._store.get((symbol, self.base))
+        if timeframe == self.base:
+            rows = base if base is not None else _EMPTY
+            return tuple(rows)
+        if base is None or base.shape[1] == 0:
+            return tuple(_EMPTY)
+
+        tf_ms = self._check(timeframe) * self.base_ms
+        with self._key_lock((symbol, timeframe)):
+            state = self._sync(symbol, timeframe, tf_ms, base)
+            bars = state.bars
+        # последняя (формирующаяся) минута — поверх свёрнутых свечей
+        forming = resample(base[:, -1:], tf_ms) if base[TS, -1] > state.folded_ts else _EMPTY
+        return tuple(_fold(bars, forming, self.history))
+
+    def ready(self, symbol):
+        """История всех таймфреймов монеты уже загружена."""
+        return all((symbol, tf) in self._state for tf in self.timeframes)
+
+    def prepare(self, symbol):
+        """Загружает историю всех таймфреймов монеты (по запросу на таймфрейм, один раз)."""
+        for tf in self.timeframes:
+            self.ohlcv(symbol, tf)
+
+    def reset(self, symbol=None):
+        with self._lock:
+            for key in [k for k in self._state if symbol is None or k[0] == symbol]:
+                del self._state[key]
+        self.feed.reset(symbol)
+
+    # ---------------------------
+    # Свёртка минут
+    # ---------------------------
+    def _key_lock(self, key):
+        lock = self._locks.get(key)
+        if lock is None:
+            with self._lock:
+                lock = self._locks.setdefault(key, threading.Lock())
+        return lock
+
+    def _sync(self, symbol, timeframe, tf_ms, base):
+        """Сворачивает в свечи timeframe все закрытые минуты, которых там ещё нет."""
+        key = (symbol, timeframe)
+        state = self._state.get(key)
+        closed = base[:, :-1]  # последняя минута базовой ленты может ещё формироваться
+        if state is None or (closed.shape[1] and closed[TS, 0] > state.folded_ts + self.base_ms):
+            # первое обращение или разрыв в минутной ленте — история с биржи
+            state = self._state[key] = self._seed(symbol, timeframe, tf_ms, base)
+
+        new = closed[:, closed[TS] > state.folded_ts] if closed.shape[1] else closed
+        if new.shape[1]:
+            state.bars = _fold(state.bars, resample(new, tf_ms), self.history)
+            state.folded_ts = new[TS, -1]
+        return state
+
+    def _seed(self, symbol, timeframe, tf_ms, base):
+        """
+        Закрытые свечи timeframe с биржи (один запрос) + текущая свеча,
+        собранная из минутной ленты.
+        """
+        resp = self.feed.client.get_kline(
+            category="linear", symbol=symbol, interval=timeframe, limit=self.history + 1
+        )
+        if resp.get("retCode") != 0:
+            raise RuntimeError(f"Ошибка Bybit ({resp.get('retCode')}): {resp.get('retMsg')}")
+        bars = parse_klines(resp.get("result", {}).get("list", []))
+
+        # текущую свечу собираем из минут: начало корзины первой минуты,
+        # которую точно покрывает лента
+        start = (base[TS, 0] // tf_ms + 1) * tf_ms
+        if bars.shape[1]:
+            start = max(start, bars[TS, -1])
+        bars = bars[:, bars[TS] < start]
+        return _Timeframe(bars[:, -self.history:], start - self.base_ms)
@@ -0,0 +1,245 @@
+# exchange/scheduler.py
+import asyncio
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+
+from pybit.exceptions import InvalidRequestError
+
+from utils.metrics import METRICS
+
+logger = logging.getLogger("vetlan_strategy")
+
+RATE_LIMIT_CODE = 10006
+
+# Группа лимита Bybit по имени метода pybit
+ENDPOINT_GROUPS = {
+    "place_order": "order",
+    "amend_order": "order",
+    "cancel_order": "order",
+    "cancel_all_orders": "order",
+    "set_trading_stop": "order",
+    "get_positions": "position",
+    "get_open_orders": "position",
+    "get_executions": "position",
+    "get_wallet_balance": "account",
+    "get_kline": "market",
+    "get_tickers": "market",
+    "get_instruments_info": "market",
+    "get_server_time": "market",
+}
+
+# ... и по пути REST (для заголовков ответа и асинхронного клиента)
+_PATH_GROUPS = (
+    ("/v5/order/", "order"),
+    ("/v5/position/", "position"),
+    ("/v5/execution/", "position"),
+    ("/v5/account/", "account"),
+    ("/v5/market/", "market"),
+)
+
+# Приоритет: меньше — раньше (см. reserve в RequestScheduler)
+PRIORITIES = {"order": 0, "position": 1, "account": 1, "market": 2}
+
+# Запросов в секунду на группу (лимиты Bybit v5 на UID, для market — на IP)
+DEFAULT_LIMITS = {"order": 10, "position": 50, "account": 50, "market": 100}
+
+
+def group_for_path(path):
+    for prefix, group in _PATH_GROUPS:
+        if path.startswith(prefix):
+            return group
+    return None
+
+
+class TokenBucket:
+    """rate токенов в секунду, не больше capacity; blocked_until — пауза после 10006."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated", "blocked_until")
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def refill(self, now):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, now, reserve=0.0):
+        """Сколько ждать, пока в корзине будет 1 токен сверх reserve."""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        missing = 1.0 + reserve - self.tokens
+        return missing / self.rate if missing > 0 else 0.0
+
+
+class RequestScheduler:
+    """
+    Очередь запросов к Bybit с учётом лимитов.
+
+    На каждую группу эндпоинтов (order, position, account, market) своя
+    корзина токенов, плюс общая корзина на все запросы (total в секунду).
+    Когда общая квота на исходе, первыми ждут market-данные: им недоступны
+    последние reserve * total токенов, позициям и балансу — половина
+    этого резерва, ордерам — вся квота. Остаток квоты из заголовков
+    X-Bapi-Limit-Status и ответ 10006 уменьшают корзину группы до
+    сброса лимита. Время ожидания — в гистограмму bybit_throttle_seconds.
+    """
+
+    def __init__(self, limits=None, total=100, reserve=0.2):
+        limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self.buckets = {group: TokenBucket(rate) for group, rate in limits.items() if rate}
+        self.total = TokenBucket(total) if total else None
+        # сколько токенов общей корзины не отдаём запросам этого приоритета
+        self.reserves = {
+            priority: (self.total.capacity * reserve * priority / 2 if self.total else 0.0)
+            for priority in set(PRIORITIES.values())
+        }
+
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            limits=config.get("rate_limits"),
+            total=config.get("rate_limit_total", 100),
+            reserve=config.get("rate_limit_reserve", 0.2),
+        )
+
+    # ---------------------------
+    # Очередь
+    # ---------------------------
+    def acquire(self, group):
+        """Ждёт квоту для запроса группы group (в потоке)."""
+        started = time.monotonic()
+        while True:
+            wait = self._take(group)
+            if wait <= 0:
+                break
+            time.sleep(wait)
+        self._observe(group, started)
+
+    async def acquire_async(self, group):
+        """То же, что acquire, для asyncio."""
+        started = time.monotonic()
+        while True:
+            wait = self._take(group)
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+        self._observe(group, started)
+
+    def _take(self, group):
+        """Забирает токены и возвращает 0 или сколько ещё ждать."""
+        now = time.monotonic()
+        bucket = self.buckets.get(group)
+        with self._lock:
+            wait = 0.0
+            if bucket is not None:
+                bucket.refill(now)
+                wait = bucket.wait_time(now)
+            if self.total is not None:
+                self.total.refill(now)
+                reserve = self.reserves[PRIORITIES.get(group, 1)]
+                wait = max(wait, self.total.wait_time(now, reserve))
+            if wait > 0:
+                return wait
+
+            if bucket is not None:
+                bucket.tokens -= 1
+            if self.total is not None:
+                self.total.tokens -= 1
+            return 0.0
+
+    @staticmethod
+    def _observe(group, started):
+        waited = time.monotonic() - started
+        if waited > 0.001:
+            METRICS.observe("bybit_throttle_seconds", waited, group=group)
+
+    # ---------------------------
+    # Ответы биржи
+    # ---------------------------
+    def update_from_headers(self, group, headers):
+        """Остаток квоты группы из заголовков X-Bapi-Limit-Status / -Reset-Timestamp."""
+        bucket = self.buckets.get(group)
+        remaining = headers.get("X-Bapi-Limit-Status") if headers else None
+        if bucket is None or remaining is None:
+            return
+        try:
+            remaining = float(remaining)
+            reset_ms = float(headers.get("X-Bapi-Limit-Reset-Timestamp") or 0)
+        except ValueError:
+            return
+        with self._lock:
+            bucket.refill(time.monotonic())
+            bucket.tokens = min(bucket.tokens, remaining)
+            if remaining <= 0 and reset_ms:
+                self._block(bucket, reset_ms)
+
+    def rate_limited(self, group, headers=None):
+        """Ответ 10006: группа ждёт сброса лимита (или секунду)."""
+        bucket = self.buckets.get(group)
+        METRICS.inc("bybit_rate_limited_total", group=group)
+        if bucket is None:
+            return
+        reset_ms = 0.0
+        if headers:
+            try:
+                reset_ms = float(headers.get("X-Bapi-Limit-Reset-Timestamp") or 0)
+            except ValueError:
+                pass
+        with self._lock:
+            self._block(bucket, reset_ms or (time.time() + 1) * 1000)
+        logger.warning("Лимит запросов Bybit (%s), пауза до сброса", group)
+
+    @staticmethod
+    def _block(bucket, reset_ms):
+        delay = min(max(0.0, reset_ms / 1000 - time.time()), 60.0)
+        bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + delay)
+        # после сброса квота набирается заново, без залпа накопленных токенов
+        bucket.tokens = 0.0
+        bucket.updated = bucket.blocked_until
+
+    def watch(self, session):
+        """Читает заголовки лимитов из всех ответов requests.Session (pybit HTTP.client)."""
+
+        def hook(response, *args, **kwargs):
+            group = group_for_path(urlsplit(response.url).path)
+            if group is not None:
+                self.update_from_headers(group, response.headers)
+
+        session.hooks["response"].append(hook)
+
+
+class ScheduledClient:
+    """
+    Прокси над pybit HTTP-клиентом: каждый публичный метод сначала
+    получает квоту у RequestScheduler, остальные атрибуты — как есть.
+    """
+
+    def __init__(self, client, scheduler):
+        self._client = client
+        self.scheduler = scheduler
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        group = ENDPOINT_GROUPS.get(name, "market" if name.startswith("get_") else "order")
+
+        def call(*args, **kwargs):
+            self.scheduler.acquire(group)
+            try:
+                return attr(*args, **kwargs)
+            except InvalidRequestError as e:
+                if e.status_code == RATE_LIMIT_CODE:
+                    self.scheduler.rate_limited(group, e.resp_headers)
+                raise
+
+        return call
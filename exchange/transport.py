@@ -0,0 +1,280 @@
+# exchange/transport.py
+import inspect
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+import pybit
+import requests
+from pybit.exceptions import FailedRequestError, InvalidRequestError
+from pybit.unified_trading import HTTP
+from requests.adapters import HTTPAdapter
+
+from exchange.auth import auth_headers
+from exchange.scheduler import group_for_path
+from utils.metrics import METRICS
+
+logger = logging.getLogger("vetlan_strategy")
+
+# Коды Bybit: расхождение времени и внутренняя ошибка сервиса
+TIMESTAMP_ERROR_CODE = 10002
+SERVICE_ERROR_CODE = 10016
+
+# Таймаут чтения по группе эндпоинтов, сек
+DEFAULT_TIMEOUTS = {"order": 10, "position": 5, "account": 5, "market": 5}
+
+# Внутренние методы pybit, на которые опирается BybitHTTP (проверено на pybit 5.17.0)
+_PYBIT_HOOKS = {
+    "_submit_request": ("self", "method", "path", "query", "auth"),
+    "_clean_query": ("self", "query"),
+    "prepare_payload": ("method", "parameters"),
+}
+
+
+def _check_pybit():
+    """
+    Падает при импорте, если в pybit нет переопределяемых методов или
+    у них другие аргументы: иначе после обновления pybit запросы молча
+    пошли бы мимо повторов и CircuitBreaker.
+    """
+    for name, params in _PYBIT_HOOKS.items():
+        method = getattr(HTTP, name, None)
+        if method is None or tuple(inspect.signature(method).parameters) != params:
+            raise RuntimeError(
+                f"pybit {getattr(pybit, 'VERSION', '?')}: HTTP.{name} отсутствует или изменился, "
+                "BybitHTTP проверен на pybit==5.17.0 (см. requirements.txt)"
+            )
+
+
+_check_pybit()
+
+
+class CircuitOpenError(RuntimeError):
+    """Запрос не отправлен: биржа недоступна, запросы временно приостановлены."""
+
+
+class CircuitBreaker:
+    """
+    После threshold сбоев подряд (сеть, 5xx, 10016) цепь размыкается:
+    запросы reset_timeout секунд сразу падают с CircuitOpenError.
+    Затем проходит один пробный запрос — успех замыкает цепь, сбой
+    размыкает её снова.
+    """
+
+    def __init__(self, threshold=5, reset_timeout=30.0, name="bybit"):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.name = name
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        if self._opened_at is None:
+            return
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self.reset_timeout - (time.monotonic() - self._opened_at)
+            if remaining > 0 or self._trial:
+                raise CircuitOpenError(
+                    f"Биржа недоступна ({self.name}), запросы приостановлены ещё на {max(remaining, 0):.0f} с"
+                )
+            self._trial = True
+
+    def success(self):
+        if self._failures == 0 and self._opened_at is None:
+            return
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("[%s] Связь с биржей восстановлена", self.name)
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial or (self._opened_at is None and self._failures >= self.threshold):
+                self._opened_at = time.monotonic()
+                self._trial = False
+                METRICS.inc("bybit_circuit_open_total")
+                logger.warning(
+                    "[%s] %d сбоев подряд, запросы приостановлены на %.0f с",
+                    self.name, self._failures, self.reset_timeout,
+                )
+
+
+class ServerClock:
+    """
+    Смещение часов биржи относительно локальных (мс): время сервера
+    минус середина интервала запроса. Подпись запросов идёт по времени
+    биржи, поэтому хватает обычного recv_window. Смещение обновляется
+    раз в sync_interval секунд в фоне и сразу после ошибки 10002.
+    """
+
+    def __init__(self, fetch_ms, sync_interval=600):
+        self.fetch_ms = fetch_ms
+        self.sync_interval = sync_interval
+        self.offset_ms = 0.0
+        self._synced_at = None
+        self._lock = threading.Lock()
+
+    def now_ms(self):
+        if self._synced_at is None:
+            self.sync()
+        elif self.sync_interval and time.monotonic() - self._synced_at > self.sync_interval:
+            self._synced_at = time.monotonic()
+            threading.Thread(target=self.sync, name="server-clock", daemon=True).start()
+        return int(time.time() * 1000 + self.offset_ms)
+
+    def sync(self):
+        # одновременно синхронизирует один поток, остальные берут прежнее смещение
+        if not self._lock.acquire(blocking=False):
+            return self.offset_ms
+        try:
+            started = time.time()
+            server_ms = self.fetch_ms()
+            finished = time.time()
+            self.offset_ms = server_ms - (started + finished) * 500
+            logger.debug("Смещение часов биржи: %.0f мс", self.offset_ms)
+        except Exception as e:
+            logger.warning("Не удалось получить время биржи: %s", e)
+        finally:
+            self._synced_at = time.monotonic()
+            self._lock.release()
+        return self.offset_ms
+
+
+class BybitHTTP(HTTP):
+    """
+    pybit HTTP со своей отправкой запросов:
+
+    - пул keep-alive соединений по числу одновременных запросов;
+    - таймаут по группе эндпоинтов (connect_timeout, request_timeouts);
+    - повторы с экспоненциальной паузой и джиттером только для GET
+      (и для любого запроса, если соединение не установилось): ордер
+      не уйдёт дважды;
+    - CircuitBreaker на время сбоев биржи;
+    - подпись по времени биржи (ServerClock);
+    - с scheduler (RequestScheduler) каждый повтор сначала получает квоту:
+      первую попытку оплачивает ScheduledClient, повторы — транспорт.
+
+    Ошибки — те же исключения pybit (InvalidRequestError, FailedRequestError)
+    и CircuitOpenError.
+    """
+
+    def __init__(self, config=None, **kwargs):
+        config = config or {}
+        kwargs.setdefault("recv_window", config.get("recv_window", 5000))
+        super().__init__(**kwargs)
+
+        self.connect_timeout = config.get("connect_timeout", 3)
+        self.timeouts = {**DEFAULT_TIMEOUTS, **(config.get("request_timeouts") or {})}
+        self.retries = config.get("request_retries", 2)
+        self.backoff = config.get("retry_backoff", 0.25)
+        self.breaker = CircuitBreaker(
+            config.get("circuit_threshold", 5),
+            config.get("circuit_reset", 30),
+        )
+        self.clock = ServerClock(self._server_time_ms, config.get("time_sync_interval", 600))
+        self.scheduler = None
+
+        # +2 соединения на фоновые запросы (инструменты, сверка позиций)
+        pool_size = config.get("max_concurrent_requests", 8) + 2
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=0)
+        self.client.mount("https://", adapter)
+        self.client.mount("http://", adapter)
+
+    def _submit_request(self, method=None, path=None, query=None, auth=False):
+        query = self._clean_query(query)
+        group = group_for_path(urlsplit(path).path)
+        timeout = (self.connect_timeout, self.timeouts.get(group, self.timeout))
+
+        attempt = 0
+        while True:
+            if attempt and self.scheduler is not None:
+                self.scheduler.acquire(group)
+            self.breaker.before_call()
+            try:
+                body = self._send(method, path, query, auth, timeout)
+            except Exception as e:
+                retry = self._on_error(e, method)
+                if not retry or attempt >= self.retries:
+                    raise
+                attempt += 1
+                METRICS.inc("bybit_retries_total", group=group)
+                time.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+                continue
+            self.breaker.success()
+            return body
+
+    def _on_error(self, error, method):
+        """Учитывает ошибку в CircuitBreaker; True — запрос можно повторить."""
+        if isinstance(error, InvalidRequestError):
+            if error.status_code == TIMESTAMP_ERROR_CODE:
+                # запрос отклонён до исполнения — пересинхронизируем часы и повторяем
+                self.breaker.success()
+                self.clock.sync()
+                return True
+            if error.status_code == SERVICE_ERROR_CODE:
+                self.breaker.failure()
+                return method == "GET"
+            self.breaker.success()
+            return False
+
+        if isinstance(error, FailedRequestError) and error.status_code < 500:
+            self.breaker.success()
+            return False
+        if isinstance(error, (requests.RequestException, FailedRequestError, ValueError)):
+            self.breaker.failure()
+            # соединение не установлено — запрос не дошёл до биржи
+            return method == "GET" or isinstance(error, requests.ConnectTimeout)
+        return False
+
+    def _send(self, method, path, query, auth, timeout):
+        payload = self.prepare_payload(method, dict(query))
+        headers = {"Content-Type": "application/json"}
+        if auth:
+            headers.update(
+                auth_headers(self.api_key, self.api_secret, payload, self.recv_window, self.clock.now_ms())
+            )
+
+        if method == "GET":
+            url, data = (f"{path}?{payload}" if payload else path), None
+        else:
+            url, data = path, payload
+        response = self.client.request(method, url, data=data, headers=headers, timeout=timeout)
+
+        if response.status_code != 200:
+            raise FailedRequestError(
+                request=f"{method} {path}: {payload}",
+                message=f"HTTP {response.status_code}",
+                status_code=response.status_code,
+                time=_now_text(),
+                resp_headers=response.headers,
+            )
+        body = response.json()
+        code = body.get("retCode", body.get("ret_code"))
+        if code:
+            raise InvalidRequestError(
+                request=f"{method} {path}: {payload}",
+                message=body.get("retMsg", body.get("ret_msg")),
+                status_code=code,
+                time=_now_text(),
+                resp_headers=response.headers,
+            )
+        return body
+
+    def _server_time_ms(self):
+        response = self.client.get(f"{self.endpoint}/v5/market/time", timeout=(self.connect_timeout, 5))
+        result = response.json()["result"]
+        return int(result["timeNano"]) / 1e6
+
+
+def _now_text():
+    return datetime.now(timezone.utc).strftime("%H:%M:%S")
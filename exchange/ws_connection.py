@@ -0,0 +1,137 @@
+# exchange/ws_connection.py
+import json
+import logging
+import threading
+
+import websocket
+
+logger = logging.getLogger("vetlan_strategy")
+
+
+class WsConnection:
+    """
+    WebSocket-подключение к Bybit в фоновом потоке: автоматическое
+    переподключение, ping каждые ping_interval секунд, разбор JSON.
+
+    Наследники переопределяют on_connect() (подписки, авторизация),
+    on_data(message) (сообщения с данными) и при необходимости
+    on_response(message) (ответы на auth/subscribe).
+    """
+
+    def __init__(self, url, ping_interval=20, reconnect_delay=5, name="ws"):
+        self.url = url
+        self.ping_interval = ping_interval
+        self.reconnect_delay = reconnect_delay
+        self.name = name
+
+        self.connected = threading.Event()
+        self._stop = threading.Event()
+        self._ws = None
+        self._threads = []
+
+    # ---------------------------
+    # Управление
+    # ---------------------------
+    def start(self):
+        self._stop.clear()
+        for target, suffix in ((self._run, ""), (self._ping_loop, "-ping")):
+            thread = threading.Thread(target=target, name=f"{self.name}{suffix}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        ws = self._ws
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def send(self, payload):
+        ws = self._ws
+        if ws is None or not self.connected.is_set():
+            return False
+        try:
+            ws.send(json.dumps(payload))
+            return True
+        except Exception as e:
+            logger.warning("[%s] Ошибка отправки в WebSocket: %s", self.name, e)
+            return False
+
+    # ---------------------------
+    # Хуки для наследников
+    # ---------------------------
+    def on_connect(self):
+        pass
+
+    def on_data(self, message):
+        pass
+
+    def on_response(self, message):
+        pass
+
+    # ---------------------------
+    # Внутренняя кухня
+    # ---------------------------
+    def _run(self):
+        while not self._stop.is_set():
+            self._ws = websocket.WebSocketApp(
+                self.url,
+                on_open=self._on_open,
+                on_message=self._on_message,
+                on_error=self._on_error,
+                on_close=self._on_close,
+            )
+            try:
+                self._ws.run_forever()
+            except Exception as e:
+                logger.warning("[%s] WebSocket упал: %s", self.name, e)
+            self.connected.clear()
+
+            if self._stop.wait(self.reconnect_delay):
+                break
+            logger.info("[%s] Переподключение к %s", self.name, self.url)
+
+    def _ping_loop(self):
+        while not self._stop.wait(self.ping_interval):
+            self.send({"op": "ping"})
+
+    def _on_open(self, ws):
+        self.connected.set()
+        logger.info("[%s] WebSocket подключён: %s", self.name, self.url)
+        try:
+            self.on_connect()
+        except Exception as e:
+            logger.warning("[%s] Ошибка при подключении: %s", self.name, e)
+
+    def _on_message(self, ws, raw):
+        try:
+            message = json.loads(raw)
+        except ValueError:
+            return
+
+        if "op" in message and "topic" not in message:
+            # ответы на ping/subscribe/auth
+            if message.get("success") is False:
+                logger.warning("[%s] Ошибка операции %s: %s", self.name, message.get("op"), message.get("ret_msg"))
+            try:
+                self.on_response(message)
+            except Exception as e:
+                logger.warning("[%s] Ошибка обработки ответа: %s", self.name, e)
+            return
+
+        try:
+            self.on_data(message)
+        except Exception as e:
+            logger.warning("[%s] Ошибка обработки сообщения: %s", self.name, e)
+
+    def _on_error(self, ws, error):
+        if not self._stop.is_set():
+            logger.warning("[%s] Ошибка WebSocket: %s", self.name, error)
+
+    def _on_close(self, ws, status_code, message):
+        self.connected.clear()
@@ -0,0 +1,247 @@
+# indicators/series.py
+"""
+Векторные версии индикаторов: возвращают весь ряд значений за один вызов.
+
+Все функции работают вдоль последней оси, поэтому принимают как один ряд
+(bars,), так и матрицу (symbols, bars). Там, где индикатор ещё не определён
+(недостаточно истории), стоит NaN. Значение в позиции t совпадает
+(с точностью до округления float) с calc_* из indicators.indicators,
+вызванной на данных [0..t].
+"""
+from functools import lru_cache
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Ограничение роста множителей a^-k внутри блока рекурсии (e^16 ≈ 9e6)
+_BLOCK_LOG = 16.0
+
+
+def _linear_recurrence(x, a, b, y0):
+    """
+    БИХ-фильтр первого порядка вдоль последней оси:
+        y[0] = y0,  y[t] = a * y[t-1] + b * x[t]
+
+    Внутри блока рекурсия разворачивается в накопленную сумму
+    x[t] / a^t, блоки ограничены так, чтобы a^-t не переполнялось.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.empty_like(x)
+    n = x.shape[-1]
+    if n == 0:
+        return y
+
+    y[..., 0] = y0
+    if a == 0:
+        y[..., 1:] = b * x[..., 1:]
+        return y
+
+    block = max(1, int(_BLOCK_LOG / -np.log(a)))
+    prev = y[..., 0]
+    t = 1
+    while t < n:
+        end = min(n, t + block)
+        powers = a ** np.arange(1, end - t + 1)
+        scaled = np.cumsum(x[..., t:end] / powers, axis=-1)
+        y[..., t:end] = powers * (prev[..., None] + b * scaled)
+        prev = y[..., end - 1]
+        t = end
+    return y
+
+
+def _nan_like(x):
+    return np.full(np.shape(x), np.nan, dtype=float)
+
+
+def _rolling_mean(x, period):
+    """Скользящее среднее; результат длины n - period + 1."""
+    return sliding_window_view(x, period, axis=-1).mean(axis=-1)
+
+
+# ---------------------------
+#   RSI
+# ---------------------------
+def rsi_series(close, period=14):
+    close = np.asarray(close, dtype=float)
+    out = _nan_like(close)
+    n = close.shape[-1]
+    if n < period + 1:
+        return out
+
+    deltas = np.diff(close, axis=-1)
+    ups = np.maximum(deltas, 0)
+    downs = np.maximum(-deltas, 0)
+
+    a = (period - 1) / period
+    b = 1 / period
+    avg_gain = _linear_recurrence(
+        ups[..., period - 1:], a, b, ups[..., :period].mean(axis=-1)
+    )
+    avg_loss = _linear_recurrence(
+        downs[..., period - 1:], a, b, downs[..., :period].mean(axis=-1)
+    )
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+    out[..., period:] = np.where(avg_loss == 0, 100.0, rsi)
+    return out
+
+
+# ---------------------------
+#   EMA
+# ---------------------------
+def ema_series(close, period=50):
+    close = np.asarray(close, dtype=float)
+    out = _nan_like(close)
+    if close.shape[-1] < period:
+        return out
+
+    k = 2 / (period + 1)
+    ema = _linear_recurrence(close, 1 - k, k, close[..., 0])
+    out[..., period - 1:] = ema[..., period - 1:]
+    return out
+
+
+# ---------------------------
+#   ATR (Volatility)
+# ---------------------------
+def true_range_series(high, low, close):
+    """True Range; первая позиция не определена (нет предыдущего close)."""
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    close = np.asarray(close, dtype=float)
+
+    out = _nan_like(close)
+    prev_close = close[..., :-1]
+    out[..., 1:] = np.maximum(
+        high[..., 1:] - low[..., 1:],
+        np.maximum(
+            np.abs(high[..., 1:] - prev_close),
+            np.abs(low[..., 1:] - prev_close),
+        ),
+    )
+    return out
+
+
+def atr_series(high, low, close, period=14):
+    close = np.asarray(close, dtype=float)
+    out = _nan_like(close)
+    if close.shape[-1] < period + 1:
+        return out
+
+    tr = true_range_series(high, low, close)
+    out[..., period:] = _rolling_mean(tr[..., 1:], period)
+    return out
+
+
+# ---------------------------
+#   Volume SMA
+# ---------------------------
+def volume_sma_series(volumes, period=20):
+    volumes = np.asarray(volumes, dtype=float)
+    out = _nan_like(volumes)
+    if volumes.shape[-1] < period:
+        return out
+
+    out[..., period - 1:] = _rolling_mean(volumes, period)
+    return out
+
+
+# ---------------------------
+#   Значения на последней свече
+# ---------------------------
+# Пакетный анализ читает только последнюю свечу: рекурсия EMA/RSI
+# раскрывается в скалярное произведение ряда на заранее посчитанные веса,
+# ATR и SMA берут только хвост окна. Результат имеет форму ряда без
+# последней оси и совпадает с [..., -1] соответствующего *_series.
+
+@lru_cache(maxsize=64)
+def _recurrence_weights(a, b, n):
+    """Веса w: y[n-1] = w[0] * y0 + sum(w[t] * x[t]) для y[t] = a * y[t-1] + b * x[t]."""
+    with np.errstate(under="ignore"):
+        w = b * a ** np.arange(n - 1, -1, -1, dtype=float)
+        w[0] = a ** (n - 1)
+    w.setflags(write=False)
+    return w
+
+
+def _nan_last(x):
+    return np.full(np.shape(x)[:-1], np.nan, dtype=float)
+
+
+def rsi_last(close, period=14):
+    close = np.asarray(close, dtype=float)
+    n = close.shape[-1]
+    if n < period + 1:
+        return _nan_last(close)
+
+    deltas = np.diff(close, axis=-1)
+    ups = np.maximum(deltas, 0)
+    downs = np.maximum(-deltas, 0)
+
+    w = _recurrence_weights((period - 1) / period, 1 / period, n - period)
+    avg_gain = ups[..., period:] @ w[1:] + ups[..., :period].mean(axis=-1) * w[0]
+    avg_loss = downs[..., period:] @ w[1:] + downs[..., :period].mean(axis=-1) * w[0]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+    return np.where(avg_loss == 0, 100.0, rsi)
+
+
+def ema_last(close, period=50):
+    close = np.asarray(close, dtype=float)
+    n = close.shape[-1]
+    if n < period:
+        return _nan_last(close)
+
+    k = 2 / (period + 1)
+    w = _recurrence_weights(1 - k, k, n)
+    return close[..., 1:] @ w[1:] + close[..., 0] * w[0]
+
+
+def atr_last(high, low, close, period=14):
+    close = np.asarray(close, dtype=float)
+    if close.shape[-1] < period + 1:
+        return _nan_last(close)
+
+    tail = slice(-(period + 1), None)
+    tr = true_range_series(
+        np.asarray(high, dtype=float)[..., tail],
+        np.asarray(low, dtype=float)[..., tail],
+        close[..., tail],
+    )
+    return tr[..., 1:].mean(axis=-1)
+
+
+def volume_sma_last(volumes, period=20):
+    volumes = np.asarray(volumes, dtype=float)
+    if volumes.shape[-1] < period:
+        return _nan_last(volumes)
+    return volumes[..., -period:].mean(axis=-1)
+
+
+# ---------------------------
+#   SPRING / UPTHRUST по всем свечам
+# ---------------------------
+def spring_series(o, h, l, c):
+    o, h, l, c = (np.asarray(x, dtype=float) for x in (o, h, l, c))
+    candle_range = h - l
+    lower_shadow = np.minimum(o, c) - l
+    return (
+        (candle_range != 0)
+        & (lower_shadow > candle_range * 0.45)
+        & (c > o)
+        & (c > (o + c) / 2)
+    )
+
+
+def upthrust_series(o, h, l, c):
+    o, h, l, c = (np.asarray(x, dtype=float) for x in (o, h, l, c))
+    candle_range = h - l
+    upper_shadow = h - np.maximum(o, c)
+    return (
+        (candle_range != 0)
+        & (upper_shadow > candle_range * 0.45)
+        & (c < o)
+        & (c < (o + c) / 2)
+    )
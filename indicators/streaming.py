@@ -0,0 +1,300 @@
+# indicators/streaming.py
+"""
+Потоковые (инкрементальные) индикаторы.
+
+Каждый индикатор хранит своё состояние и принимает по одной свече:
+new_bar=True — закрылась старая свеча и пришла новая,
+new_bar=False — обновилась текущая (ещё формирующаяся) свеча.
+Стоимость обновления не зависит от длины истории, а значения совпадают
+с функциями из indicators.indicators на тех же данных.
+"""
+from collections import deque
+from itertools import islice
+
+import numpy as np
+
+
+# Раз в столько обновлений сумма окна пересчитывается заново,
+# чтобы не накапливалась ошибка округления
+_RESUM_EVERY = 1024
+
+
+def _slide(total, added, evicted, window, count):
+    """Сумма скользящего окна после добавления added и вытеснения evicted — O(1)."""
+    if count % _RESUM_EVERY == _RESUM_EVERY - 1:
+        return float(sum(window))
+    total += added
+    if evicted is not None:
+        total -= evicted
+    return total
+
+
+# ---------------------------
+#   RSI (Wilder)
+# ---------------------------
+class StreamingRSI:
+    def __init__(self, period=14):
+        self.period = period
+        self._prev_close = None
+        self._seed = []          # первые period изменений цены
+        self._avg_gain = None
+        self._avg_loss = None
+        self._undo = None        # состояние до последней свечи
+
+    def update(self, close, new_bar=True):
+        if not new_bar and self._undo is not None:
+            self._prev_close, self._seed, self._avg_gain, self._avg_loss = self._undo
+
+        self._undo = (self._prev_close, list(self._seed), self._avg_gain, self._avg_loss)
+
+        if self._prev_close is not None:
+            delta = close - self._prev_close
+            if self._avg_gain is None:
+                self._seed.append(delta)
+                if len(self._seed) == self.period:
+                    deltas = np.array(self._seed, dtype=float)
+                    self._avg_gain = np.mean(deltas.clip(min=0))
+                    self._avg_loss = np.mean(-deltas.clip(max=0))
+                    self._seed = []
+            else:
+                up = max(delta, 0.0)
+                down = -min(delta, 0.0)
+                p = self.period
+                self._avg_gain = (self._avg_gain * (p - 1) + up) / p
+                self._avg_loss = (self._avg_loss * (p - 1) + down) / p
+
+        self._prev_close = close
+        return self.value
+
+    @property
+    def value(self):
+        if self._avg_gain is None:
+            return None
+        return _rsi_value(self._avg_gain, self._avg_loss)
+
+
+def _rsi_value(avg_gain, avg_loss):
+    if avg_loss == 0:
+        return 100.0
+    rs = avg_gain / avg_loss
+    return float(100 - (100 / (1 + rs)))
+
+
+# ---------------------------
+#   EMA
+# ---------------------------
+class StreamingEMA:
+    def __init__(self, period=50):
+        self.period = period
+        self.k = 2 / (period + 1)
+        self._count = 0
+        self._ema = None
+        self._undo = None
+
+    def update(self, close, new_bar=True):
+        if not new_bar and self._undo is not None:
+            self._count, self._ema = self._undo
+
+        self._undo = (self._count, self._ema)
+
+        if self._ema is None:
+            self._ema = close
+        else:
+            self._ema = close * self.k + self._ema * (1 - self.k)
+        self._count += 1
+        return self.value
+
+    @property
+    def value(self):
+        if self._count < self.period:
+            return None
+        return float(self._ema)
+
+
+# ---------------------------
+#   ATR (скользящее окно True Range)
+# ---------------------------
+class StreamingATR:
+    def __init__(self, period=14):
+        self.period = period
+        self._window = deque(maxlen=period)
+        self._sum = 0.0          # сумма True Range в окне
+        self._count = 0          # сколько свечей получено
+        self._prev_close = None
+        self._undo = None
+
+    def update(self, high, low, close, new_bar=True):
+        if not new_bar and self._undo is not None:
+            self._count, self._prev_close, self._sum, pushed, evicted = self._undo
+            if pushed:
+                self._window.pop()
+                if evicted is not None:
+                    self._window.appendleft(evicted)
+
+        pushed = self._prev_close is not None
+        evicted = self._window[0] if pushed and len(self._window) == self.period else None
+        self._undo = (self._count, self._prev_close, self._sum, pushed, evicted)
+        if pushed:
+            tr = max(
+                high - low,
+                abs(high - self._prev_close),
+                abs(low - self._prev_close),
+            )
+            self._window.append(tr)
+            self._sum = _slide(self._sum, tr, evicted, self._window, self._count)
+
+        self._count += 1
+        self._prev_close = close
+        return self.value
+
+    @property
+    def value(self):
+        if self._count < self.period + 1:
+            return None
+        return float(self._sum / self.period)
+
+
+# ---------------------------
+#   Volume SMA (кольцевой буфер)
+# ---------------------------
+class StreamingSMA:
+    def __init__(self, period=20):
+        self.period = period
+        self._window = deque(maxlen=period)
+        self._sum = 0.0
+        self._count = 0
+        self._undo = None
+
+    def update(self, value, new_bar=True):
+        if not new_bar and self._undo is not None:
+            self._count, self._sum, evicted = self._undo
+            self._window.pop()
+            if evicted is not None:
+                self._window.appendleft(evicted)
+
+        evicted = self._window[0] if len(self._window) == self.period else None
+        self._undo = (self._count, self._sum, evicted)
+        self._window.append(value)
+        self._sum = _slide(self._sum, value, evicted, self._window, self._count)
+        self._count += 1
+        return self.value
+
+    @property
+    def value(self):
+        if len(self._window) < self.period:
+            return None
+        return float(self._sum / self.period)
+
+
+# ---------------------------
+#   Набор индикаторов стратегии для одной монеты
+# ---------------------------
+class IndicatorSet:
+    """
+    RSI, EMA, ATR и SMA объёма для одной монеты.
+    sync() сам определяет, какие свечи новые, а какая обновилась.
+
+    Значения совпадают с calc_* на массивах последнего sync(), даже когда
+    окно кэша сдвинулось и старые свечи из него ушли. RSI и EMA считаются
+    по всей полученной истории, а вклад свечей до начала окна вычитается:
+    разница между рекурсией по всей истории и по окну затухает как a^m,
+    так что хватает значений на первых свечах окна (_bars).
+    """
+
+    def __init__(self, rsi_period=14, ema_period=50, atr_period=14, vol_sma_period=20):
+        self.periods = (rsi_period, ema_period, atr_period, vol_sma_period)
+        self.reset()
+
+    def reset(self):
+        rsi_period, ema_period, atr_period, vol_sma_period = self.periods
+        self._rsi = StreamingRSI(rsi_period)
+        self._ema = StreamingEMA(ema_period)
+        self._atr = StreamingATR(atr_period)
+        self._vol_sma = StreamingSMA(vol_sma_period)
+        # по свече окна: (close, ema, avg_gain, avg_loss, рост, падение)
+        self._bars = deque()
+        self._count = 0          # свечей с последнего reset
+        self.last_ts = None
+
+    def update(self, high, low, close, volume, new_bar=True):
+        if not new_bar and self._bars:
+            self._bars.pop()
+            self._count -= 1
+
+        self._rsi.update(close, new_bar)
+        self._ema.update(close, new_bar)
+        self._atr.update(high, low, close, new_bar)
+        self._vol_sma.update(volume, new_bar)
+
+        delta = close - self._bars[-1][0] if self._bars else 0.0
+        self._bars.append((close, self._ema._ema, self._rsi._avg_gain, self._rsi._avg_loss,
+                           max(delta, 0.0), -min(delta, 0.0)))
+        self._count += 1
+
+    def sync(self, ts, high, low, close, volume):
+        """
+        Догоняет массивы свечей (хронологический порядок): последняя
+        известная свеча пересчитывается, более новые добавляются.
+        Если последней известной свечи в массиве нет или окно стало
+        длиннее сохранённого — пересчёт с нуля.
+        """
+        if len(ts) == 0:
+            return
+
+        start = 0
+        if self.last_ts is not None:
+            idx = int(np.searchsorted(ts, self.last_ts))
+            if idx < len(ts) and ts[idx] == self.last_ts and idx < len(self._bars):
+                self.update(high[idx], low[idx], close[idx], volume[idx], new_bar=False)
+                start = idx + 1
+            else:
+                self.reset()
+
+        for i in range(start, len(ts)):
+            self.update(high[i], low[i], close[i], volume[i])
+
+        while len(self._bars) > len(ts):
+            self._bars.popleft()
+        self.last_ts = ts[-1]
+
+    @property
+    def rsi(self):
+        period = self._rsi.period
+        window = len(self._bars)
+        if window < period + 1:
+            return None
+        if self._count == window:
+            return self._rsi.value
+
+        # затравка окна — среднее первых period изменений внутри окна
+        seed = list(islice(self._bars, 1, period + 1))
+        _, _, gain, loss, _, _ = seed[-1]
+        decay = ((period - 1) / period) ** (window - 1 - period)
+        avg_gain = self._rsi._avg_gain - decay * (gain - np.mean([bar[4] for bar in seed]))
+        avg_loss = self._rsi._avg_loss - decay * (loss - np.mean([bar[5] for bar in seed]))
+        return _rsi_value(avg_gain, avg_loss)
+
+    @property
+    def ema(self):
+        window = len(self._bars)
+        if window < self._ema.period:
+            return None
+        if self._count == window:
+            return self._ema.value
+
+        # EMA окна начинается с первой цены окна
+        close, ema = self._bars[0][:2]
+        decay = (1 - self._ema.k) ** (window - 1)
+        return float(self._ema._ema - decay * (ema - close))
+
+    @property
+    def atr(self):
+        if len(self._bars) < self._atr.period + 1:
+            return None
+        return self._atr.value
+
+    @property
+    def vol_sma(self):
+        if len(self._bars) < self._vol_sma.period:
+            return None
+        return self._vol_sma.value
@@ -19,7 +19,7 @@ if exist "requirements.txt" (
 ) else (
     echo [!] Файл requirements.txt не найден
     echo [*] Установка базовых зависимостей...
-    pip install pybit pandas ta python-dotenv colorama requests
+    pip install pybit==5.17.0 pandas ta python-dotenv colorama requests
 )
 
 if errorlevel 1 (
@@ -0,0 +1,87 @@
+# orders/balance_cache.py
+import logging
+import threading
+import time
+
+logger = logging.getLogger("vetlan_strategy")
+
+
+def parse_usdt_balance(resp, coin="USDT"):
+    """Баланс монеты из ответа get_wallet_balance (0, если не найден)."""
+    wallets = resp.get("result", {}).get("list", [])
+    if not wallets:
+        return 0
+
+    for c in wallets[0].get("coin", []):
+        if c["coin"] == coin:
+            return float(c["walletBalance"])
+    return 0
+
+
+class BalanceCache:
+    """
+    Кэш баланса кошелька с TTL.
+
+    get() отдаёт сохранённое значение, пока оно моложе ttl секунд. При ошибке
+    API возвращается последнее успешно полученное значение (с его возрастом
+    в age), исключение поднимается, только если значения ещё не было.
+    invalidate() — после входа в позицию или закрытия позиции.
+    """
+
+    def __init__(self, client, ttl=60, coin="USDT"):
+        self.client = client
+        self.ttl = ttl
+        self.coin = coin
+
+        self._value = None
+        self._updated_at = None
+        self._stale = True
+        self._lock = threading.Lock()
+
+    @property
+    def age(self):
+        """Возраст последнего успешного значения в секундах (None — значения нет)."""
+        if self._updated_at is None:
+            return None
+        return time.monotonic() - self._updated_at
+
+    def is_fresh(self):
+        return not self._stale and self.age is not None and self.age < self.ttl
+
+    def get(self):
+        if self.is_fresh():
+            return self._value
+
+        with self._lock:
+            if self.is_fresh():
+                return self._value
+            try:
+                resp = self.client.get_wallet_balance(accountType="UNIFIED")
+                self.set(parse_usdt_balance(resp, self.coin))
+            except Exception as e:
+                if self._value is None:
+                    raise
+                logger.warning(
+                    "Ошибка получения баланса (%s), используем значение %.0f с назад",
+                    e, self.age,
+                )
+        return self._value
+
+    def set(self, value):
+        self._value = float(value)
+        self._updated_at = time.monotonic()
+        self._stale = False
+
+    def invalidate(self):
+        self._stale = True
+
+    def apply_wallet_update(self, data):
+        """
+        Обновление из приватного потока wallet: список аккаунтов
+        [{"accountType": ..., "coin": [{"coin": "USDT", "walletBalance": ...}]}].
+        """
+        for account in data:
+            for c in account.get("coin", []):
+                if c.get("coin") == self.coin and c.get("walletBalance") not in (None, ""):
+                    self.set(c["walletBalance"])
+                    return
@@ -1,11 +1,32 @@
+import logging
 import math
 
+from exchange.instruments import InstrumentsCache
+from exchange.transport import CircuitOpenError
+from orders.balance_cache import BalanceCache
+from orders.position_book import PositionBook
+
+# Статусы ордера, после которых позиции по нему не будет
+_FAILED_ORDER_STATUSES = ("Rejected", "Cancelled", "Deactivated")
+
+logger = logging.getLogger("vetlan_strategy")
+
+
+def _log_refresh_error(symbol, error):
+    """Позиция остаётся прежней; о разомкнутой цепи CircuitBreaker уже сообщил."""
+    if not isinstance(error, CircuitOpenError):
+        logger.warning("[%s] Не удалось обновить позицию: %s", symbol, error)
+
 
 class OrderManager:
-    def __init__(self, client, cfg, notifier=None):
+    def __init__(self, client, cfg, notifier=None, state=None):
         self.client = client
         self.cfg = cfg
         self.notifier = notifier
+        # StateStore: ордера и позиции с направлением и TP/SL (может быть None)
+        self.state = state
+        # PrivateStream: пока поток жив, позиции берутся из кэша без REST
+        self.stream = None
 
         self.risk_pct = cfg["risk_pct"] / 100.0  # из процентов в доли
         self.position_cache = {}
@@ -13,10 +34,30 @@ class OrderManager:
         self.min_order_usdt = cfg.get("min_order_usdt", 5)
         self.max_position_pct = cfg.get("max_position_pct", 10) / 100.0  # из процентов в доли
 
+        # Баланс с TTL: расчёт объёма не ходит в сеть на каждом сигнале
+        self.balance = BalanceCache(client, ttl=cfg.get("balance_ttl", 60))
+
+        # Шаги цены и объёма по монетам: ордера сразу проходят проверки биржи;
+        # без клиента (бэктест) — только из сохранённого instruments_file
+        self.instruments = None
+        if cfg.get("instruments", True) and (client is not None or cfg.get("instruments_file")):
+            self.instruments = InstrumentsCache(
+                client,
+                path=cfg.get("instruments_file", "data/instruments.json"),
+                max_age=cfg.get("instruments_max_age", 6 * 3600),
+            )
+
+        # Снимок всех позиций одним запросом вместо get_positions на каждую монету
+        self.positions = None
+        if cfg.get("position_book", True):
+            self.positions = PositionBook(
+                client, max_age=cfg.get("position_max_age", 5)
+            )
+
     # ---------------------------
     # Расчёт размера позиции
     # ---------------------------
-    def calc_qty(self, entry, sl):
+    def calc_qty(self, entry, sl, symbol=None):
         balance = self._get_usdt_balance()
         if balance <= 0:
             raise RuntimeError("Не найден баланс для расчёта позиции")
@@ -31,7 +72,11 @@ class OrderManager:
         if qty <= 0:
             return 0
 
-        # Округляем до целого числа
+        instrument = self.get_instrument(symbol)
+        if instrument is not None:
+            return self._quantize_qty(instrument, qty, entry, balance)
+
+        # Правила монеты неизвестны — округляем до целого числа
         qty = math.floor(qty)
         if qty < 1:
             return 0
@@ -50,38 +95,89 @@ class OrderManager:
 
         return float(qty)
 
+    def _quantize_qty(self, instrument, qty, entry, balance):
+        """calc_qty по шагу объёма, минимальному объёму и сумме ордера монеты."""
+        qty = instrument.floor_qty(qty)
+        if qty < instrument.min_qty:
+            return 0
+
+        # Проверка минимального размера ордера
+        min_notional = max(self.min_order_usdt, instrument.min_notional)
+        if entry * qty < min_notional:
+            qty = instrument.ceil_qty(min_notional / entry)
+
+        # Ограничение максимального размера позиции
+        max_qty = min(balance * self.max_position_pct / entry, instrument.max_qty)
+        if qty > max_qty:
+            qty = instrument.floor_qty(max_qty)
+            if qty < instrument.min_qty:
+                return 0
+
+        return qty
+
+    def get_instrument(self, symbol):
+        """Правила торговли монетой (Instrument) или None."""
+        if self.instruments is None or symbol is None:
+            return None
+        try:
+            return self.instruments.get(symbol)
+        except Exception as e:
+            logger.warning("[%s] Не удалось загрузить правила инструмента: %s", symbol, e)
+            return None
+
     # ---------------------------
     # Получение баланса
     # ---------------------------
     def _get_usdt_balance(self):
         try:
-            resp = self.client.get_wallet_balance(accountType="UNIFIED")
-            wallets = resp.get("result", {}).get("list", [])
-            if not wallets:
-                return 0
-
-            for c in wallets[0].get("coin", []):
-                if c["coin"] == "USDT":
-                    return float(c["walletBalance"])
-            return 0
-
+            return self.balance.get()
         except Exception:
             return 0
 
     def get_usdt_balance(self):
         return self._get_usdt_balance()
 
+    def position_is_streamed(self, symbol):
+        """Кэш позиции актуален: его обновляет приватный поток (pending — нет)."""
+        return (
+            self.stream is not None
+            and self.stream.is_live()
+            and symbol in self.position_cache
+            and not (self.position_cache[symbol] or {}).get("pending")
+        )
+
     def refresh_position(self, symbol):
         previous_state = self.position_cache.get(symbol)
 
+        if self.position_is_streamed(symbol):
+            return previous_state
+
+        if self.positions is not None:
+            try:
+                pos = self.positions.get(symbol)
+            except Exception as e:
+                _log_refresh_error(symbol, e)
+                return previous_state
+            return self.update_position(symbol, {"result": {"list": [pos] if pos else []}})
+
         try:
             resp = self.client.get_positions(
                 category="linear",
                 symbol=symbol
             )
-        except Exception:
+        except Exception as e:
+            _log_refresh_error(symbol, e)
             return previous_state
 
+        return self.update_position(symbol, resp)
+
+    def update_position(self, symbol, resp):
+        """
+        Обновляет кэш позиции по уже полученному ответу get_positions
+        (например, из асинхронного цикла).
+        """
+        previous_state = self.position_cache.get(symbol)
+
         pos_list = resp.get("result", {}).get("list", [])
         open_pos = None
         for p in pos_list:
@@ -99,6 +195,26 @@ class OrderManager:
         self.position_cache[symbol] = None
         return None
 
+    # ---------------------------
+    # Обновления из приватного потока
+    # ---------------------------
+    def apply_position_update(self, position):
+        """Позиция из потока position: кэш и снимок обновляются сразу, pending снимается."""
+        symbol = position.get("symbol")
+        if self.positions is not None:
+            self.positions.update(position)
+        if float(position.get("size", 0) or 0) > 0:
+            self.position_cache[symbol] = position
+        else:
+            self.position_cache[symbol] = None
+
+    def apply_order_update(self, order):
+        """Ордер из потока order: отклонённый вход снимает pending."""
+        symbol = order.get("symbol")
+        cached = self.position_cache.get(symbol)
+        if cached and cached.get("pending") and order.get("orderStatus") in _FAILED_ORDER_STATUSES:
+            self.position_cache[symbol] = None
+
     def list_open_positions(self, symbols):
         positions = []
         for symbol in symbols:
@@ -140,17 +256,27 @@ class OrderManager:
         if self.has_open_position(symbol):
             return False
 
-        qty = self.calc_qty(entry, sl)
+        qty = self.calc_qty(entry, sl, symbol)
         if qty <= 0:
             return False
 
         side = "Buy" if signal == "long" else "Sell"
 
+        # объём и TP/SL — по шагам монеты, чтобы биржа не отклонила ордер
+        instrument = self.get_instrument(symbol)
+        if instrument is not None:
+            tp = instrument.round_price(tp)
+            sl = instrument.round_price(sl)
+            qty_text = instrument.format_qty(qty)
+            tp_text, sl_text = instrument.format_price(tp), instrument.format_price(sl)
+        else:
+            qty_text, tp_text, sl_text = str(qty), str(tp), str(sl)
+
         order_kwargs = {}
         if self.enable_tp_sl:
             order_kwargs = {
-                "takeProfit": str(tp),
-                "stopLoss": str(sl),
+                "takeProfit": tp_text,
+                "stopLoss": sl_text,
                 "tpTriggerBy": "LastPrice",
                 "slTriggerBy": "LastPrice",
             }
@@ -161,15 +287,27 @@ class OrderManager:
                 symbol=symbol,
                 side=side,
                 orderType="Market",
-                qty=str(qty),
+                qty=qty_text,
                 **order_kwargs,
             )
         except Exception:
             self.position_cache.pop(symbol, None)
             raise
 
+        # снимок позиций и баланс больше не актуальны
+        if self.positions is not None:
+            self.positions.invalidate()
+        self.balance.invalidate()
+
         # блокируем повторный вход до прояснения статуса
-        self.position_cache[symbol] = {"pending": True, "symbol": symbol}
+        # (если приватный поток уже принёс позицию, она остаётся в кэше)
+        if not self.position_cache.get(symbol):
+            self.position_cache[symbol] = {"pending": True, "symbol": symbol}
+
+        if self.state is not None:
+            order_id = (resp or {}).get("result", {}).get("orderId")
+            self.state.record_order(symbol, side, qty, entry, tp, sl, order_id=order_id)
+            self.state.open_position(symbol, signal, qty, entry, tp, sl)
 
         if self.notifier:
             self.notifier.send(
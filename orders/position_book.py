@@ -0,0 +1,122 @@
+# orders/position_book.py
+import logging
+import threading
+import time
+
+logger = logging.getLogger("vetlan_strategy")
+
+# Bybit отдаёт не больше 200 позиций на страницу
+_PAGE_LIMIT = 200
+
+# Больше страниц не бывает (лимит позиций на аккаунт) — защита от зацикливания
+_MAX_PAGES = 50
+
+
+class PositionBook:
+    """
+    Снимок всех позиций linear одним запросом по расчётной монете
+    (settleCoin) вместо get_positions на каждую монету.
+
+    Снимок считается свежим max_age секунд; get() при устаревшем снимке
+    сам перезагружает его (одна загрузка на все потоки).
+    """
+
+    def __init__(self, client, settle_coin="USDT", max_age=5):
+        self.client = client
+        self.settle_coin = settle_coin
+        self.max_age = max_age
+
+        self._positions = {}
+        self._updated_at = None
+        self._lock = threading.Lock()
+
+    # ---------------------------
+    # Загрузка снимка
+    # ---------------------------
+    def refresh(self):
+        """Загружает все страницы позиций (по nextPageCursor)."""
+        pages = []
+        cursor = None
+        while True:
+            pages.append(self.client.get_positions(**self.page_params(cursor)))
+            cursor = self.next_cursor(pages)
+            if cursor is None:
+                break
+        self.apply_pages(pages)
+
+    def page_params(self, cursor=None):
+        """Параметры get_positions для страницы cursor (общие для sync и async загрузки)."""
+        params = {
+            "category": "linear",
+            "settleCoin": self.settle_coin,
+            "limit": _PAGE_LIMIT,
+        }
+        if cursor:
+            params["cursor"] = cursor
+        return params
+
+    def next_cursor(self, pages):
+        """
+        Курсор следующей страницы после уже полученных pages или None.
+        Останавливается на пустой странице, повторном курсоре и после
+        _MAX_PAGES страниц — ответ биржи не зациклит загрузку.
+        """
+        result = pages[-1].get("result", {})
+        cursor = result.get("nextPageCursor") or None
+        if cursor is None:
+            return None
+        seen = [page.get("result", {}).get("nextPageCursor") for page in pages[:-1]]
+        if not result.get("list") or cursor in seen or len(pages) >= _MAX_PAGES:
+            logger.warning(
+                "Позиции: загрузка остановлена на странице %d (курсор %s)", len(pages), cursor
+            )
+            return None
+        return cursor
+
+    def apply_pages(self, pages):
+        """Заменяет снимок позициями из всех страниц ответа get_positions."""
+        positions = []
+        for resp in pages:
+            positions.extend(resp.get("result", {}).get("list", []))
+        self.replace(positions)
+
+    def replace(self, positions):
+        """Заменяет снимок списком позиций."""
+        book = {}
+        for p in positions:
+            if float(p.get("size", 0) or 0) > 0:
+                book[p.get("symbol")] = p
+        self._positions = book
+        self._updated_at = time.monotonic()
+
+    def update(self, position):
+        """Обновление одной позиции (из приватного потока)."""
+        positions = dict(self._positions)
+        if float(position.get("size", 0) or 0) > 0:
+            positions[position.get("symbol")] = position
+        else:
+            positions.pop(position.get("symbol"), None)
+        self._positions = positions
+
+    def invalidate(self):
+        self._updated_at = None
+
+    # ---------------------------
+    # Чтение
+    # ---------------------------
+    def is_fresh(self):
+        return (
+            self._updated_at is not None
+            and time.monotonic() - self._updated_at < self.max_age
+        )
+
+    def get(self, symbol):
+        """Открытая позиция по монете (dict Bybit) или None."""
+        if not self.is_fresh():
+            with self._lock:
+                if not self.is_fresh():
+                    self.refresh()
+        return self._positions.get(symbol)
+
+    def symbols(self):
+        return list(self._positions)
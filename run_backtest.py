@@ -0,0 +1,68 @@
+"""
+Бэктест текущих настроек config/bybit_config.py на архиве свечей.
+
+    python download_candles.py --days 365
+    python run_backtest.py --days 365 --balance 1000
+"""
+import argparse
+import time
+
+from backtest.engine import Backtester
+from config.bybit_config import BYBIT_CONFIG
+from storage.candle_store import CandleStore
+
+
+def print_summary(summary):
+    print("\n" + "=" * 60)
+    print(" " * 20 + "РЕЗУЛЬТАТ БЭКТЕСТА")
+    print("=" * 60)
+    print(f"Сделок: {summary['total_trades']} (закрыто {summary['closed_trades']}, открыто {summary['open_trades']})")
+    if summary["closed_trades"]:
+        print(f"Прибыльных: {summary['wins']}, убыточных: {summary['losses']}")
+        print(f"Win rate: {summary['win_rate']:.1f}%")
+        print(f"PnL: {summary['total_pnl']:.2f} USDT")
+        print(f"Средняя прибыль: {summary['avg_win']:.2f}, средний убыток: {summary['avg_loss']:.2f}")
+        print(f"Profit factor: {summary['profit_factor']:.2f}")
+    print(f"Баланс: {summary['initial_balance']:.2f} -> {summary['final_balance']:.2f} USDT ({summary['return_pct']:+.2f}%)")
+    print(f"Макс. просадка: {summary['max_drawdown_pct']:.2f}%")
+    print("=" * 60 + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бэктест стратегии на архиве свечей")
+    parser.add_argument("--days", type=float, default=None, help="Последние N дней (по умолчанию — весь архив)")
+    parser.add_argument("--symbols", nargs="*", help="Монеты (по умолчанию — coins из конфига)")
+    parser.add_argument("--interval", default=BYBIT_CONFIG.get("interval", "15"))
+    parser.add_argument("--root", default=BYBIT_CONFIG.get("candle_store") or "data/candles")
+    parser.add_argument("--balance", type=float, default=1000.0)
+    parser.add_argument("--fee", type=float, default=BYBIT_CONFIG.get("backtest_fee_pct", 0.055))
+    parser.add_argument("--slippage", type=float, default=BYBIT_CONFIG.get("backtest_slippage_pct", 0.02))
+    args = parser.parse_args()
+
+    store = CandleStore(args.root)
+    symbols = args.symbols or BYBIT_CONFIG["coins"]
+    start = None
+    if args.days is not None:
+        start = int(time.time() * 1000) - int(args.days * 86_400_000)
+
+    candles = {}
+    for symbol in symbols:
+        series = store.ohlcv(symbol, args.interval, start=start)
+        if len(series[0]) == 0:
+            print(f"⚠️  {symbol}: нет свечей в архиве (python download_candles.py)")
+            continue
+        candles[symbol] = series
+
+    started = time.perf_counter()
+    result = Backtester(
+        BYBIT_CONFIG, balance=args.balance, fee_pct=args.fee, slippage_pct=args.slippage
+    ).run(candles)
+    elapsed = time.perf_counter() - started
+
+    bars = sum(len(s[0]) for s in candles.values())
+    print(f"Монет: {len(candles)}, свечей: {bars}, время: {elapsed:.2f} с")
+    print_summary(result["summary"])
+
+
+if __name__ == "__main__":
+    main()
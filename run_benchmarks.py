@@ -0,0 +1,41 @@
+"""
+Замеры производительности горячих путей (без сети).
+
+    python run_benchmarks.py                              # все замеры, результат в benchmarks/results/<коммит>.json
+    python run_benchmarks.py --filter indicators strategy
+    python run_benchmarks.py --compare benchmarks/results/abc1234.json
+"""
+import argparse
+
+from benchmarks.runner import compare, format_time, load, run, save
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замеры производительности")
+    parser.add_argument("--filter", nargs="*", help="Только замеры, имя которых содержит подстроку")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", help="Файл результатов (по умолчанию benchmarks/results/<коммит>.json)")
+    parser.add_argument("--compare", help="Сравнить с результатами из файла")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Замедление, считающееся регрессией (0.1 = 10%%)")
+    args = parser.parse_args()
+
+    print("⏱️  Замеры (медиана на вызов):")
+    results = run(args.filter, repeat=args.repeat)
+    path = save(results, args.out)
+    print(f"\nРезультаты сохранены в {path}")
+
+    if args.compare:
+        rows = compare(load(args.compare), results, args.threshold)
+        regressions = 0
+        print(f"\nСравнение с {args.compare}:")
+        for name, before, after, ratio, regression in rows:
+            mark = "🔴" if regression else ("🟢" if ratio < 1 - args.threshold else "  ")
+            regressions += regression
+            print(f"{mark} {name:<40} {format_time(before):>12} -> {format_time(after):>12}  x{ratio:.2f}")
+        if regressions:
+            print(f"\n⚠️  Регрессий: {regressions}")
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Локальная имитация Bybit (REST + WebSocket) для тестов без сети.
+
+    python run_mock_exchange.py --symbols 300 --speed 60 --latency 0.05
+    python run_mock_exchange.py --store data/mainnet/candles --speed 900
+
+Затем запустить бота с переменными окружения, которые выведет скрипт
+(BYBIT_REST_URL, BYBIT_WS_PUBLIC_URL, BYBIT_WS_PRIVATE_URL). С BYBIT_REST_URL
+свечи, состояние, правила монет и журнал сделок бота пишутся в отдельные
+папки data/<хост_порт> и logs/<хост_порт> (скрипт их выводит), а не в
+файлы настоящей биржи.
+"""
+import argparse
+import time
+
+from config.bybit_config import BYBIT_CONFIG, data_dir, logs_dir
+from exchange.kline_cache import interval_to_ms
+from exchange.mock_exchange import MockExchange, MockHttpServer, synthetic_candles
+from exchange.mock_ws import MockWsServer
+from storage.candle_store import CandleStore
+
+
+def load_candles(args):
+    if args.store:
+        store = CandleStore(args.store)
+        candles = {}
+        for symbol in BYBIT_CONFIG["coins"]:
+            rows = store.tail(symbol, args.interval, args.bars)
+            if rows.shape[1]:
+                candles[symbol] = rows
+        return candles
+
+    symbols = list(BYBIT_CONFIG["coins"])
+    if args.symbols > len(symbols):
+        symbols += [f"MOCK{i}USDT" for i in range(args.symbols - len(symbols))]
+    return synthetic_candles(symbols[:args.symbols], args.interval, bars=args.bars, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальная имитация Bybit")
+    parser.add_argument("--symbols", type=int, default=len(BYBIT_CONFIG["coins"]), help="Число монет (синтетические свечи)")
+    parser.add_argument("--store", help="Проигрывать свечи из архива вместо синтетических")
+    parser.add_argument("--interval", default=BYBIT_CONFIG.get("interval", "15"))
+    parser.add_argument("--bars", type=int, default=2000, help="Свечей на монету")
+    parser.add_argument("--speed", type=float, default=1.0, help="Ускорение времени биржи")
+    parser.add_argument("--replay", type=int, default=0, help="Начать проигрывание за N свечей до конца истории")
+    parser.add_argument("--balance", type=float, default=10_000.0)
+    parser.add_argument("--latency", type=float, default=0.0, help="Задержка ответа, с")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Доля запросов с ошибкой")
+    parser.add_argument("--rate-limit", type=int, default=0, help="Запросов в секунду (0 — без ограничения)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--ws-port", type=int, default=8081)
+    args = parser.parse_args()
+
+    candles = load_candles(args)
+    if not candles:
+        parser.error("нет свечей (python download_candles.py или без --store)")
+
+    last = max(int(rows[0, -1]) for rows in candles.values())
+    exchange = MockExchange(
+        candles,
+        interval=args.interval,
+        balance=args.balance,
+        start_ms=last - args.replay * interval_to_ms(args.interval),
+        speed=args.speed,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        seed=args.seed,
+    )
+    http = MockHttpServer(exchange, args.host, args.port).start()
+    ws = MockWsServer(exchange, args.host, args.ws_port).start()
+
+    print(f"🧪 Имитация биржи: {len(candles)} монет, интервал {args.interval}, ускорение x{args.speed}")
+    print(f"BYBIT_REST_URL={http.url}")
+    print(f"BYBIT_WS_PUBLIC_URL={ws.public_url}")
+    print(f"BYBIT_WS_PRIVATE_URL={ws.private_url}")
+    print(f"Данные бота: {data_dir(BYBIT_CONFIG['environment'], http.url)}, журнал: {logs_dir(http.url)}")
+    print("Остановка: Ctrl+C")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ws.stop()
+        http.stop()
+
+
+if __name__ == "__main__":
+    main()
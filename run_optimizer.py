@@ -0,0 +1,102 @@
+"""
+Подбор параметров стратегии на архиве свечей.
+
+    python run_optimizer.py --param rsi_buy=20,25,30 --param volume_mult=1.0,1.5 --days 365
+    python run_optimizer.py --range rsi_buy=15:35 --range tp_long_atr=1.5:4.0 --random 500
+"""
+import argparse
+import json
+import time
+
+from backtest.optimizer import grid, optimize, random_search, rank
+from config.bybit_config import BYBIT_CONFIG
+
+
+def _parse_value(text):
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    if text in ("True", "False"):
+        return text == "True"
+    return text
+
+
+def _parse_space(params, ranges):
+    space = {}
+    for item in params or []:
+        name, values = item.split("=", 1)
+        space[name] = [_parse_value(v) for v in values.split(",")]
+    for item in ranges or []:
+        name, bounds = item.split("=", 1)
+        low, high = bounds.split(":")
+        space[name] = (_parse_value(low), _parse_value(high))
+    return space
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Подбор параметров стратегии")
+    parser.add_argument("--param", action="append", help="Сетка значений: имя=v1,v2,...")
+    parser.add_argument("--range", action="append", help="Диапазон для случайного поиска: имя=low:high")
+    parser.add_argument("--random", type=int, default=0, help="Число случайных конфигураций (0 — полная сетка)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--days", type=float, default=None, help="Последние N дней (по умолчанию — весь архив)")
+    parser.add_argument("--symbols", nargs="*", help="Монеты (по умолчанию — coins из конфига)")
+    parser.add_argument("--interval", default=BYBIT_CONFIG.get("interval", "15"))
+    parser.add_argument("--root", default=BYBIT_CONFIG.get("candle_store") or "data/candles")
+    parser.add_argument("--balance", type=float, default=1000.0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--metric", default="total_pnl", help="Метрика для сортировки (ключ summary)")
+    parser.add_argument("--min-trades", type=int, default=10)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--out", help="Сохранить все результаты в JSON")
+    args = parser.parse_args()
+
+    space = _parse_space(args.param, args.range)
+    if not space:
+        parser.error("нужен хотя бы один --param или --range")
+    if args.random:
+        configs = random_search(space, args.random, seed=args.seed)
+    elif any(isinstance(v, tuple) for v in space.values()):
+        parser.error("--range работает только вместе с --random")
+    else:
+        configs = grid(space)
+
+    start = None
+    if args.days is not None:
+        start = int(time.time() * 1000) - int(args.days * 86_400_000)
+
+    print(f"Конфигураций: {len(configs)}")
+    started = time.perf_counter()
+    results = optimize(
+        BYBIT_CONFIG,
+        configs,
+        args.symbols or BYBIT_CONFIG["coins"],
+        args.interval,
+        root=args.root,
+        start=start,
+        workers=args.workers,
+        balance=args.balance,
+        fee_pct=BYBIT_CONFIG.get("backtest_fee_pct", 0.055),
+        slippage_pct=BYBIT_CONFIG.get("backtest_slippage_pct", 0.02),
+    )
+    print(f"Время: {time.perf_counter() - started:.1f} с\n")
+
+    for i, r in enumerate(rank(results, args.metric, args.min_trades, args.top), 1):
+        s = r["summary"]
+        print(
+            f"{i:>3}. {args.metric}={s[args.metric]:.4f} | "
+            f"сделок {s['closed_trades']}, win rate {s.get('win_rate', 0):.1f}%, "
+            f"PnL {s.get('total_pnl', 0):.2f}, просадка {s['max_drawdown_pct']:.2f}% | "
+            f"{r['params']}"
+        )
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\nРезультаты сохранены в {args.out}")
+
+
+if __name__ == "__main__":
+    main()
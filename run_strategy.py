@@ -1,9 +1,19 @@
+import queue
 import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from exchange.bybit_client import BybitClient
+from exchange.concurrency import HostLimiter, LimitedClient
+from exchange.scheduler import RequestScheduler, ScheduledClient
+from exchange.kline_cache import CLOSE, interval_to_ms, parse_klines
+from exchange.market_stream import MarketDataStream, public_ws_url
+from exchange.private_stream import PrivateStream, private_ws_url
 from strategy.strategy import Strategy
 from orders.order_manager import OrderManager
+from storage.state_store import StateStore
 from utils.notifier import TelegramNotifier
+from utils.bar_schedule import BarSchedule
+from utils.metrics import METRICS, InstrumentedClient, start_metrics
 from utils.stats_logger import StatsLogger
 from config.bybit_config import BYBIT_CONFIG
 
@@ -28,6 +38,9 @@ def print_config_summary(config):
     env_icon = "🔴" if env == "MAINNET" else "🟡"
     print(f"\n{env_icon} Окружение: {env}")
     print(f"📊 Таймфрейм: {config.get('interval', '15')} минут")
+    if config.get("resample", False) and config.get("market_data", "rest") == "rest":
+        timeframes = ", ".join(str(tf) for tf in config.get("timeframes", []))
+        print(f"🧩 Свечи из ленты {config.get('resample_base', '1')} мин (таймфреймы: {timeframes or '—'})")
     print(f"📈 Монет в мониторинге: {len(config.get('coins', []))}")
     
     # Торговые настройки
@@ -96,42 +109,396 @@ def format_positions_report(positions):
     return "\n".join(lines)
 
 
+def track_position(symbol, position, known=None):
+    """
+    Запись tracked_positions по позиции Bybit. Направление берётся из side,
+    TP/SL — из позиции, а если там пусто — из known (запись StateStore
+    или прежняя запись).
+    """
+    known = known or {}
+    direction = {"Buy": "long", "Sell": "short"}.get(position.get("side")) or known.get("direction")
+    tp = float(position.get("takeProfit") or 0) or known.get("tp")
+    sl = float(position.get("stopLoss") or 0) or known.get("sl")
+    return {
+        "symbol": symbol,
+        "size": float(position.get("size", 0)),
+        "entryPrice": float(position.get("entryPrice", 0)),
+        "direction": direction,
+        "tp": tp,
+        "sl": sl,
+    }
+
+
+def handle_decision(symbol, signal, decision, orders, notifier, stats_logger, tracked_positions):
+    """
+    Логирует решение стратегии по монете и при наличии сигнала открывает позицию.
+    """
+    decision = decision or {}
+
+    message = decision.get("message", "Нет комментария")
+    indicators = decision.get("indicators", [])
+    details = " | ".join(indicators) if indicators else ""
+
+    log_line = f"[{symbol}] {message}"
+    if details:
+        log_line += f" | {details}"
+    logger.info(log_line)
+
+    if not signal:
+        return
+
+    log_line = f"[{symbol}] СИГНАЛ: {signal.upper()} — {message}"
+    if details:
+        log_line += f" | {details}"
+    logger.info(log_line)
+
+    state = orders.state
+    if state is not None:
+        state.record_signal(symbol, signal, decision)
+
+    entry = decision.get("entry")
+    tp = decision.get("tp")
+    sl = decision.get("sl")
+
+    if entry is None or tp is None or sl is None:
+        logger.warning(
+            "[%s] Сигнал без уровней (entry/tp/sl). Пропуск.",
+            symbol,
+        )
+        return
+
+    success = False
+    try:
+        success = orders.enter_position(
+            symbol=symbol,
+            signal=signal,
+            entry=entry,
+            tp=tp,
+            sl=sl,
+        )
+    except Exception as exc:
+        logger.warning("[%s] Ошибка открытия позиции: %s", symbol, exc)
+        return
+
+    if success:
+        new_position = orders.refresh_position(symbol)
+        if new_position and not new_position.get("pending"):
+            tracked_positions[symbol] = track_position(
+                symbol, new_position, {"direction": signal, "tp": tp, "sl": sl}
+            )
+            if state is not None:
+                state.save_position(tracked_positions[symbol])
+
+            # Логируем открытие позиции
+            stats_logger.log_trade(
+                symbol=symbol,
+                direction=signal,
+                entry=entry,
+                tp=tp,
+                sl=sl,
+            )
+
+        if notifier:
+            notifier.send(
+                f"🟢 Открыт ордер\n"
+                f"{log_line}\n"
+                f"Entry: {entry:.6f}\nTP: {tp:.6f}\nSL: {sl:.6f}"
+            )
+    else:
+        logger.warning("[%s] Не удалось открыть позицию", symbol)
+
+
+def fetch_exit_price(http, symbol):
+    """Текущая цена (close последней минутной свечи) как цена выхода."""
+    klines_resp = http.get_kline(
+        category="linear",
+        symbol=symbol,
+        interval="1",
+        limit=1
+    )
+    if klines_resp.get("retCode") != 0:
+        return None
+    rows = parse_klines(klines_resp.get("result", {}).get("list", []))
+    if rows.shape[1] == 0:
+        return None
+    return float(rows[CLOSE, -1])  # close последней свечи
+
+
+def scan_symbol(symbol, prev_position, orders, strategy, http, batch_scan=False, analyze=True):
+    """
+    Сетевая часть обработки монеты: позиция, цена выхода при закрытии, анализ.
+    Может выполняться в пуле потоков — общее состояние бота здесь не меняется.
+    В режиме batch_scan только подгружаются свечи, decision остаётся None
+    (кроме ошибок загрузки). analyze=False — только позиция (сверка между
+    закрытиями свечей).
+    """
+    result = {
+        "position": None, "exit_price": None, "exit_error": None, "decision": None,
+        "tracked": prev_position,
+    }
+
+    position = orders.refresh_position(symbol)
+    result["position"] = position
+
+    if not position and prev_position and not prev_position.get("pending"):
+        stream = strategy.stream
+        try:
+            if stream is not None:
+                result["exit_price"] = stream.last_price(symbol)
+            if result["exit_price"] is None:
+                result["exit_price"] = fetch_exit_price(http, symbol)
+        except Exception as e:
+            result["exit_error"] = e
+
+    if not analyze or (position and position.get("pending")):
+        return result
+
+    if batch_scan:
+        _, error = strategy._load_klines(symbol)
+        result["decision"] = error
+    else:
+        result["decision"] = strategy.analyze_symbol(symbol)
+    return result
+
+
+def apply_position_scan(symbol, result, tracked_positions, stats_logger, notifier, balance=None,
+                        state=None):
+    """
+    Обновляет tracked_positions по результату scan_symbol и логирует закрытия.
+    При закрытии позиции сбрасывает кэш баланса (balance), если он передан.
+    Позиции сохраняются в StateStore (state), если он передан.
+    Возвращает False, если монету в этом цикле анализировать не нужно.
+    """
+    prev_position = tracked_positions.get(symbol)
+    current_position = result["position"]
+
+    if prev_position is None and result.get("tracked") is not None:
+        # позицию закрыл приватный поток, пока шёл опрос, — данные опроса устарели
+        return False
+
+    if current_position:
+        if current_position.get("pending"):
+            tracked_positions[symbol] = {"pending": True}
+            return False
+
+        known = (state.position(symbol) if state is not None else None) or prev_position
+        tracked_positions[symbol] = track_position(symbol, current_position, known)
+        if state is not None:
+            state.save_position(tracked_positions[symbol])
+    elif prev_position:
+        if prev_position.get("pending"):
+            tracked_positions.pop(symbol, None)
+            if state is not None:
+                # ордер не привёл к позиции
+                state.close_position(symbol)
+        elif tracked_positions.pop(symbol, None) is not None:
+            # Позиция закрыта - логируем (если её ещё не закрыл приватный поток)
+            if result["exit_error"] is not None:
+                logger.warning("[%s] Ошибка при логировании закрытия: %s", symbol, result["exit_error"])
+            close_tracked_position(
+                symbol, prev_position, result["exit_price"], stats_logger, notifier, balance, state
+            )
+
+    return True
+
+
+def close_tracked_position(symbol, prev_position, exit_price, stats_logger, notifier, balance=None,
+                           state=None, fee=None):
+    """
+    Логирует закрытие позиции prev_position (запись tracked_positions, уже
+    удалённая оттуда вызывающим кодом). fee — комиссии за сделку, если
+    известны (из приватного потока); PnL тогда считается за их вычетом.
+    """
+    entry_price = prev_position.get("entryPrice", 0)
+    size = prev_position.get("size", 0)
+    pnl = None
+
+    if exit_price is not None:
+        try:
+            direction = prev_position.get("direction")
+            if direction is None:
+                # позиция неизвестного происхождения: направление по разнице цен
+                direction = "long" if exit_price > entry_price else "short"
+
+            # Расчёт PnL
+            if direction == "long":
+                pnl = (exit_price - entry_price) * size
+            else:
+                pnl = (entry_price - exit_price) * size
+            if fee:
+                pnl -= fee
+
+            roi = (pnl / (entry_price * size)) * 100 if entry_price * size > 0 else 0
+
+            stats_logger.log_trade(
+                symbol=symbol,
+                direction=direction,
+                entry=entry_price,
+                tp=prev_position.get("tp") or 0,
+                sl=prev_position.get("sl") or 0,
+                exit_price=exit_price,
+                pnl=pnl,
+                roi=roi,
+                fee=fee,
+            )
+        except Exception as e:
+            logger.warning("[%s] Ошибка при логировании закрытия: %s", symbol, e)
+
+    if state is not None:
+        state.close_position(symbol, exit_price, pnl)
+    if balance is not None:
+        balance.invalidate()
+    if notifier:
+        notifier.send(
+            "📤 Позиция закрыта\n"
+            f"Символ: {symbol}\n"
+            f"Размер: {size:.4f}\n"
+            f"Цена входа: {entry_price:.4f}"
+        )
+
+
+def start_private_stream(config, orders, state=None, clock=None):
+    """
+    Запускает приватный поток (private_stream, нужны API-ключи): позиции,
+    исполнения и баланс приходят событиями, закрытия попадают в очередь
+    stream.closes (её разбирает apply_private_closes). clock — ServerClock
+    для подписи авторизации. Возвращает PrivateStream или None.
+    """
+    if not config.get("private_stream", True) or not config.get("api_key"):
+        return None
+
+    stream = PrivateStream(
+        config["api_key"],
+        config["api_secret"],
+        orders,
+        url=private_ws_url(config),
+        state=state,
+        clock=clock,
+    )
+    orders.stream = stream
+    stream.start()
+    return stream
+
+
+def apply_private_closes(private, tracked_positions, stats_logger, notifier, state=None):
+    """
+    Логирует закрытия из очереди приватного потока. Вызывается из основного
+    цикла, поэтому tracked_positions, журнал и StateStore меняются
+    последовательно, как и при опросе.
+    """
+    if private is None:
+        return
+    while True:
+        try:
+            symbol, exit_price, fee, position = private.closes.get_nowait()
+        except queue.Empty:
+            return
+
+        prev_position = tracked_positions.pop(symbol, None)
+        if (prev_position is None or prev_position.get("pending")) and state is not None:
+            # позиция открылась и закрылась между циклами или до подтверждения
+            prev_position = state.position(symbol) or prev_position
+        if prev_position is None:
+            # закрытие уже залогировал опрос позиций
+            continue
+        if prev_position.get("pending"):
+            # ордер исполнился и позиция закрылась до подтверждения — данные из потока
+            position = position or {}
+            prev_position = track_position(
+                symbol,
+                {**position, "entryPrice": position.get("entryPrice") or position.get("avgPrice") or 0},
+            )
+        close_tracked_position(
+            symbol, prev_position, exit_price, stats_logger, notifier, None, state, fee
+        )
+
+
+def bar_schedule_enabled(config, interval):
+    """Анализ по закрытию свечи (schedule="bar_close") возможен для интервала."""
+    return config.get("schedule", "bar_close") == "bar_close" and interval_to_ms(interval) is not None
+
+
+def format_schedule(config, interval, poll_interval):
+    """Строка о расписании анализа для вывода при запуске."""
+    if config.get("market_data", "rest") == "rest" and bar_schedule_enabled(config, interval):
+        check = config.get("position_check_interval", poll_interval)
+        return f"Анализ на закрытии свечи {interval}, сверка позиций раз в {check} секунд"
+    return f"Интервал проверки: {poll_interval} секунд"
+
+
 def run_strategy(poll_interval: int = 30):
     """
     Запускает основной цикл проверки сигналов по списку монет.
     """
     client = BybitClient(BYBIT_CONFIG)
 
+    scan_workers = BYBIT_CONFIG.get("scan_workers", 1)
+    # время каждого запроса к бирже — в метрики
+    http = InstrumentedClient(client.client)
+    if scan_workers > 1:
+        http = LimitedClient(
+            http,
+            HostLimiter(BYBIT_CONFIG.get("max_concurrent_requests", 8)),
+        )
+    # лимиты Bybit: ордера идут раньше свечей и позиций
+    if BYBIT_CONFIG.get("rate_limits") is not None:
+        scheduler = RequestScheduler.from_config(BYBIT_CONFIG)
+        scheduler.watch(client.client.client)
+        # повторы запросов внутри транспорта — тоже по квоте
+        client.client.scheduler = scheduler
+        http = ScheduledClient(http, scheduler)
+    stop_metrics = start_metrics(BYBIT_CONFIG)
+
     notifier = TelegramNotifier(
         BYBIT_CONFIG.get("telegram_token"),
         BYBIT_CONFIG.get("telegram_chat_id"),
+        queue_size=BYBIT_CONFIG.get("telegram_queue_size", 100),
+        batch_window=BYBIT_CONFIG.get("telegram_batch_window", 1.0),
     )
 
+    state = StateStore(BYBIT_CONFIG["state_store"]) if BYBIT_CONFIG.get("state_store") else None
+
     orders = OrderManager(
-        client=client.client,
+        client=http,
         cfg=BYBIT_CONFIG,
         notifier=notifier,
+        state=state,
     )
 
+    # правила монет — при запуске, а не на первом сигнале
+    if orders.instruments is not None:
+        orders.instruments.warm_up()
+
     strategy = Strategy(
-        client=client.client,
+        client=http,
         orders=orders,
         settings=BYBIT_CONFIG,
     )
-
-    stats_logger = StatsLogger()
+    # сколько свечей догружать — по часам биржи
+    strategy.klines.clock = client.clock
+
+    stats_logger = StatsLogger(
+        file_path=BYBIT_CONFIG.get("stats_file", "logs/stats.csv"),
+        backend=BYBIT_CONFIG.get("stats_backend", "csv"),
+        fsync_interval=BYBIT_CONFIG.get("stats_fsync_interval", 5.0),
+        max_bytes=BYBIT_CONFIG.get("stats_max_bytes"),
+        rotate_daily=BYBIT_CONFIG.get("stats_rotate_daily", False),
+    )
 
     coins = BYBIT_CONFIG["coins"]
+    batch_scan = BYBIT_CONFIG.get("batch_scan", False)
     
     # ВЫВОД НАСТРОЕК ПЕРЕД ЗАПУСКОМ
     print_config_summary(BYBIT_CONFIG)
     
     logger.info("Запущена стратегия. Монеты: %s", ", ".join(coins))
 
-    tracked_positions = {}
+    # Тёплый старт: направление и TP/SL открытых позиций — из StateStore.
+    # Позиции, закрытые пока бот не работал, закроются в первом цикле.
+    tracked_positions = state.open_positions() if state is not None else {}
     initial_positions = orders.list_open_positions(coins)
     for pos in initial_positions:
-        tracked_positions[pos["symbol"]] = pos
+        tracked_positions[pos["symbol"]] = {**tracked_positions.get(pos["symbol"], {}), **pos}
 
     # Получаем баланс для вывода
     balance = orders.get_usdt_balance()
@@ -141,7 +508,7 @@ def run_strategy(poll_interval: int = 30):
         print("   Открытые позиции:")
         for pos in initial_positions:
             print(f"   - {pos['symbol']}: {pos['size']:.4f} @ {pos['entryPrice']:.4f}")
-    print(f"\n⏱️  Интервал проверки: {poll_interval} секунд")
+    print(f"\n⏱️  {format_schedule(BYBIT_CONFIG, strategy.interval, poll_interval)}")
     print("🚀 Бот запущен. Ожидание сигналов...\n")
     print("-" * 60 + "\n")
 
@@ -152,154 +519,154 @@ def run_strategy(poll_interval: int = 30):
             f"{format_positions_report(initial_positions)}"
         )
 
+    private = start_private_stream(BYBIT_CONFIG, orders, state, client.clock)
+
+    def apply_closes():
+        # закрытия из приватного потока — здесь, а не в потоке WebSocket
+        apply_private_closes(private, tracked_positions, stats_logger, notifier, state)
+
+    # Сетевая часть (позиции, свечи) идёт в пуле потоков,
+    # ордера и tracked_positions обновляются строго последовательно
+    pool = ThreadPoolExecutor(max_workers=scan_workers) if scan_workers > 1 else None
+
+    # Свечи по WebSocket: стратегия запускается по событиям потока,
+    # полный проход по всем монетам — не реже poll_interval
+    stream = None
+    if BYBIT_CONFIG.get("market_data", "rest") == "ws":
+        stream = MarketDataStream(
+            strategy.klines,
+            coins,
+            strategy.interval,
+            url=public_ws_url(BYBIT_CONFIG),
+            trigger=BYBIT_CONFIG.get("ws_trigger", "close"),
+        )
+        strategy.stream = stream
+        stream.start()
+
+    def refresh_positions():
+        # один запрос позиций на весь цикл (если их не приносит приватный поток)
+        if orders.positions is not None and not (private and private.is_live()):
+            try:
+                orders.positions.refresh()
+            except Exception as e:
+                logger.warning("Ошибка загрузки позиций: %s", e)
+
+    def refresh_balance():
+        # баланс обновляем заранее, чтобы расчёт объёма при сигнале не ждал сеть
+        try:
+            orders.balance.get()
+        except Exception as e:
+            logger.warning("Ошибка получения баланса: %s", e)
+
+    def reconcile_positions():
+        """Между закрытиями свечей: только закрытия отслеживаемых позиций, без анализа."""
+        apply_closes()
+        if private and private.is_live():
+            return
+        symbols = list(tracked_positions)
+        if not symbols:
+            return
+        refresh_positions()
+        snapshot = dict(tracked_positions)
+        for symbol in symbols:
+            result = scan_symbol(
+                symbol, snapshot.get(symbol), orders, strategy, http, analyze=False
+            )
+            apply_position_scan(
+                symbol, result, tracked_positions, stats_logger, notifier, orders.balance, state
+            )
+
+    # REST-режим: анализ сразу после закрытия свечи, между закрытиями —
+    # сверка позиций и баланс со своими периодами
+    schedule = None
+    if stream is None and bar_schedule_enabled(BYBIT_CONFIG, strategy.interval):
+        schedule = BarSchedule(
+            strategy.interval,
+            delay=BYBIT_CONFIG.get("bar_close_delay", 0.05),
+            clock=client.clock,
+        )
+        schedule.every(BYBIT_CONFIG.get("position_check_interval", poll_interval), reconcile_positions)
+        schedule.every(BYBIT_CONFIG.get("balance_ttl", 60) / 2, refresh_balance)
+        strategy.closed_only = True
+        strategy.clock = client.clock
+
+    symbols = coins
+    last_full_pass = time.monotonic()
+    bar_close_ms = None
+
     try:
         while True:
-            for symbol in coins:
-                prev_position = tracked_positions.get(symbol)
-                current_position = orders.refresh_position(symbol)
-
-                if current_position:
-                    if current_position.get("pending"):
-                        tracked_positions[symbol] = {"pending": True}
-                        continue
-
-                    tracked_positions[symbol] = {
-                        "symbol": symbol,
-                        "size": float(current_position.get("size", 0)),
-                        "entryPrice": float(current_position.get("entryPrice", 0)),
-                    }
-                elif prev_position:
-                    if prev_position.get("pending"):
-                        tracked_positions.pop(symbol, None)
-                    else:
-                        # Позиция закрыта - логируем
-                        entry_price = prev_position.get("entryPrice", 0)
-                        size = prev_position.get("size", 0)
-                        
-                        # Получаем текущую цену как цену выхода
-                        try:
-                            klines_resp = client.client.get_kline(
-                                category="linear",
-                                symbol=symbol,
-                                interval="1",
-                                limit=1
-                            )
-                            if klines_resp.get("retCode") == 0:
-                                klines = klines_resp.get("result", {}).get("list", [])
-                                if klines:
-                                    exit_price = float(klines[0][4])  # close price
-                                    
-                                    # Определяем направление позиции (нужно получить из истории или использовать сигнал)
-                                    # Для упрощения используем разницу цен
-                                    direction = "long" if exit_price > entry_price else "short"
-                                    
-                                    # Расчёт PnL
-                                    if direction == "long":
-                                        pnl = (exit_price - entry_price) * size
-                                    else:
-                                        pnl = (entry_price - exit_price) * size
-                                    
-                                    roi = (pnl / (entry_price * size)) * 100 if entry_price * size > 0 else 0
-                                    
-                                    stats_logger.log_trade(
-                                        symbol=symbol,
-                                        direction=direction,
-                                        entry=entry_price,
-                                        tp=0,  # Не знаем TP/SL при закрытии
-                                        sl=0,
-                                        exit_price=exit_price,
-                                        pnl=pnl,
-                                        roi=roi,
-                                    )
-                        except Exception as e:
-                            logger.warning("[%s] Ошибка при логировании закрытия: %s", symbol, e)
-                        
-                        tracked_positions.pop(symbol, None)
-                        if notifier:
-                            notifier.send(
-                                "📤 Позиция закрыта\n"
-                                f"Символ: {symbol}\n"
-                                f"Размер: {size:.4f}\n"
-                                f"Цена входа: {entry_price:.4f}"
-                            )
-
-                name, signal, decision = strategy.analyze_symbol(symbol)
-                decision = decision or {}
-
-                message = decision.get("message", "Нет комментария")
-                indicators = decision.get("indicators", [])
-                details = " | ".join(indicators) if indicators else ""
-
-                log_line = f"[{symbol}] {message}"
-                if details:
-                    log_line += f" | {details}"
-                logger.info(log_line)
-
-                if not signal:
+            apply_closes()
+            snapshot = dict(tracked_positions)
+            refresh_positions()
+            refresh_balance()
+
+            def scan(symbol):
+                return scan_symbol(
+                    symbol, snapshot.get(symbol), orders, strategy, http, batch_scan
+                )
+
+            scans = list(pool.map(scan, symbols)) if pool else [scan(symbol) for symbol in symbols]
+            apply_closes()
+
+            batch = []
+            for symbol, result in zip(symbols, scans):
+                if not apply_position_scan(
+                    symbol, result, tracked_positions, stats_logger, notifier, orders.balance, state
+                ):
                     continue
 
-                log_line = f"[{symbol}] СИГНАЛ: {signal.upper()} — {message}"
-                if details:
-                    log_line += f" | {details}"
-                logger.info(log_line)
+                if result["decision"] is None:
+                    batch.append(symbol)
+                    continue
 
-                entry = decision.get("entry")
-                tp = decision.get("tp")
-                sl = decision.get("sl")
+                _, signal, decision = result["decision"]
+                handle_decision(
+                    symbol, signal, decision, orders, notifier, stats_logger, tracked_positions
+                )
 
-                if entry is None or tp is None or sl is None:
-                    logger.warning(
-                        "[%s] Сигнал без уровней (entry/tp/sl). Пропуск.",
-                        symbol,
+            if batch:
+                for symbol, signal, decision in strategy.analyze_batch(batch, refresh=False):
+                    handle_decision(
+                        symbol, signal, decision, orders, notifier, stats_logger, tracked_positions
                     )
-                    continue
 
-                success = False
-                try:
-                    success = orders.enter_position(
-                        symbol=symbol,
-                        signal=signal,
-                        entry=entry,
-                        tp=tp,
-                        sl=sl,
+            if schedule is not None:
+                if bar_close_ms is not None:
+                    METRICS.observe(
+                        "bar_close_to_decision_seconds", (schedule.now_ms() - bar_close_ms) / 1000
                     )
-                except Exception as exc:
-                    logger.warning("[%s] Ошибка открытия позиции: %s", symbol, exc)
-                    continue
-
-                if success:
-                    new_position = orders.refresh_position(symbol)
-                    if new_position and not new_position.get("pending"):
-                        tracked_positions[symbol] = {
-                            "symbol": symbol,
-                            "size": float(new_position.get("size", 0)),
-                            "entryPrice": float(new_position.get("entryPrice", 0)),
-                        }
-                        
-                        # Логируем открытие позиции
-                        stats_logger.log_trade(
-                            symbol=symbol,
-                            direction=signal,
-                            entry=entry,
-                            tp=tp,
-                            sl=sl,
-                        )
-
-                    if notifier:
-                        notifier.send(
-                            f"🟢 Открыт ордер\n"
-                            f"{log_line}\n"
-                            f"Entry: {entry:.6f}\nTP: {tp:.6f}\nSL: {sl:.6f}"
-                        )
-                else:
-                    logger.warning("[%s] Не удалось открыть позицию", symbol)
-
-            time.sleep(max(1, poll_interval))
+                bar_close_ms = schedule.wait()
+                continue
+
+            if stream is None:
+                time.sleep(max(1, poll_interval))
+                continue
+
+            wait = max(0.1, poll_interval - (time.monotonic() - last_full_pass))
+            updated = stream.wait_for_updates(timeout=wait)
+            if updated and time.monotonic() - last_full_pass < poll_interval:
+                symbols = [symbol for symbol in coins if symbol in updated]
+            else:
+                symbols = coins
+                last_full_pass = time.monotonic()
     except KeyboardInterrupt:
         logger.info("Остановка бота по запросу пользователя.")
     finally:
+        if stream:
+            stream.stop()
+        if private:
+            private.stop()
+        if pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+        stop_metrics()
+        stats_logger.close()
+        if state is not None:
+            state.close()
         if notifier:
             notifier.send("⏹️ Бот остановлен.")
+            # дожидаемся отправки очереди уведомлений
+            notifier.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,430 @@
+import asyncio
+import signal
+
+from exchange.async_client import AsyncBybitClient
+from exchange.bybit_client import BybitClient
+from exchange.kline_cache import CLOSE, parse_klines
+from exchange.scheduler import RequestScheduler, ScheduledClient
+from strategy.strategy import Strategy
+from orders.balance_cache import parse_usdt_balance
+from orders.order_manager import OrderManager
+from storage.state_store import StateStore
+from utils.bar_schedule import BarSchedule
+from utils.metrics import METRICS, InstrumentedClient, start_metrics
+from utils.notifier import TelegramNotifier
+from utils.stats_logger import StatsLogger
+from config.bybit_config import BYBIT_CONFIG
+from run_strategy import (
+    logger,
+    print_config_summary,
+    format_positions_report,
+    apply_position_scan,
+    apply_private_closes,
+    bar_schedule_enabled,
+    format_schedule,
+    handle_decision,
+    start_private_stream,
+    track_position,
+)
+
+
+async def fetch_exit_price_async(aclient, symbol):
+    """Текущая цена (close последней минутной свечи) как цена выхода."""
+    resp = await aclient.get_kline(
+        category="linear",
+        symbol=symbol,
+        interval="1",
+        limit=1,
+    )
+    rows = parse_klines(resp.get("result", {}).get("list", []))
+    if rows.shape[1] == 0:
+        return None
+    return float(rows[CLOSE, -1])
+
+
+async def refresh_klines_async(strategy, aclient, symbol):
+    """
+    Подтягивает новые свечи в кэш стратегии.
+    Возвращает None или готовый ответ стратегии с ошибкой.
+    """
+    klines = strategy.klines
+    interval = strategy.feed_interval
+    try:
+        limit = klines.request_limit(symbol, interval)
+        resp = await aclient.get_kline(
+            category="linear", symbol=symbol, interval=interval, limit=limit
+        )
+        if not klines.apply(symbol, interval, resp, limit):
+            resp = await aclient.get_kline(
+                category="linear", symbol=symbol, interval=interval, limit=klines.history
+            )
+            klines.apply(symbol, interval, resp, klines.history)
+
+        resampler = strategy.resampler
+        if resampler is not None and not resampler.ready(symbol):
+            # история старших таймфреймов — один раз, синхронным клиентом в потоке
+            await asyncio.to_thread(resampler.prepare, symbol)
+    except (ValueError, TypeError, IndexError, RuntimeError) as exc:
+        return strategy.kline_error(symbol, exc)
+    return None
+
+
+async def refresh_positions_async(orders, aclient):
+    """Асинхронная загрузка снимка всех позиций (страницы разбирает PositionBook)."""
+    book = orders.positions
+    pages = []
+    cursor = None
+    while True:
+        pages.append(await aclient.get_positions(**book.page_params(cursor)))
+        cursor = book.next_cursor(pages)
+        if cursor is None:
+            break
+    book.apply_pages(pages)
+
+
+def position_unknown(orders, symbols):
+    """
+    Позиции какой-то из монет нет в кэше: has_open_position(use_cache=True)
+    в анализе сходит в REST синхронным клиентом — такой анализ идёт в потоке.
+    """
+    return any(symbol not in orders.position_cache for symbol in symbols)
+
+
+async def refresh_balance_async(orders, aclient):
+    """Асинхронное обновление кэша баланса, если он устарел."""
+    cache = orders.balance
+    if cache.is_fresh():
+        return cache.get()
+    resp = await aclient.get_wallet_balance(accountType="UNIFIED")
+    cache.set(parse_usdt_balance(resp, cache.coin))
+    return cache.get()
+
+
+async def refresh_position_async(orders, aclient, symbol):
+    """Асинхронный аналог OrderManager.refresh_position."""
+    if orders.position_is_streamed(symbol) or (
+        orders.positions is not None and orders.positions.is_fresh()
+    ):
+        return orders.refresh_position(symbol)
+
+    try:
+        resp = await aclient.get_positions(category="linear", symbol=symbol)
+    except Exception:
+        return orders.position_cache.get(symbol)
+    return orders.update_position(symbol, resp)
+
+
+async def scan_symbol_async(symbol, prev_position, orders, strategy, aclient, batch_scan=False,
+                            analyze=True):
+    """Асинхронный аналог run_strategy.scan_symbol."""
+    result = {
+        "position": None, "exit_price": None, "exit_error": None, "decision": None,
+        "tracked": prev_position,
+    }
+
+    position = await refresh_position_async(orders, aclient, symbol)
+    result["position"] = position
+
+    if not position and prev_position and not prev_position.get("pending"):
+        try:
+            result["exit_price"] = await fetch_exit_price_async(aclient, symbol)
+        except Exception as e:
+            result["exit_error"] = e
+
+    if not analyze or (position and position.get("pending")):
+        return result
+
+    error = await refresh_klines_async(strategy, aclient, symbol)
+    if error or batch_scan:
+        result["decision"] = error
+    elif position_unknown(orders, [symbol]):
+        result["decision"] = await asyncio.to_thread(strategy.analyze_symbol, symbol, False)
+    else:
+        result["decision"] = strategy.analyze_symbol(symbol, refresh=False)
+    return result
+
+
+async def scan_symbols_async(symbols, snapshot, orders, strategy, aclient, batch_scan, timeout):
+    """
+    scan_symbol_async по всем монетам параллельно, в порядке symbols.
+    Монета, не уложившаяся в timeout, отменяется — на её месте
+    asyncio.TimeoutError; на месте прочих ошибок — само исключение.
+    """
+    return await asyncio.gather(
+        *(
+            asyncio.wait_for(
+                scan_symbol_async(symbol, snapshot.get(symbol), orders, strategy, aclient, batch_scan),
+                timeout=timeout,
+            )
+            for symbol in symbols
+        ),
+        return_exceptions=True,
+    )
+
+
+async def run_strategy_async(poll_interval: int = 30):
+    """
+    Основной цикл на asyncio: позиции, свечи и баланс запрашиваются
+    параллельно, каждая монета ограничена таймаутом symbol_timeout.
+    Размещение ордеров (редкая операция) выполняется синхронным pybit-клиентом
+    в отдельном потоке, строго по очереди.
+    """
+    coins = BYBIT_CONFIG["coins"]
+    batch_scan = BYBIT_CONFIG.get("batch_scan", False)
+    symbol_timeout = BYBIT_CONFIG.get("symbol_timeout", 20)
+
+    # общие лимиты Bybit для aiohttp-запросов и ордеров через pybit
+    scheduler = None
+    if BYBIT_CONFIG.get("rate_limits") is not None:
+        scheduler = RequestScheduler.from_config(BYBIT_CONFIG)
+
+    async with AsyncBybitClient(BYBIT_CONFIG, scheduler=scheduler) as aclient:
+        client = BybitClient(BYBIT_CONFIG)
+        # подпись aiohttp-запросов — тоже по времени биржи
+        aclient.clock = client.clock
+        await asyncio.to_thread(client.clock.sync)
+        http = InstrumentedClient(client.client)
+        if scheduler is not None:
+            scheduler.watch(client.client.client)
+            # повторы запросов внутри транспорта — тоже по квоте
+            client.client.scheduler = scheduler
+            http = ScheduledClient(http, scheduler)
+        stop_metrics = start_metrics(BYBIT_CONFIG)
+
+        notifier = TelegramNotifier(
+            BYBIT_CONFIG.get("telegram_token"),
+            BYBIT_CONFIG.get("telegram_chat_id"),
+            queue_size=BYBIT_CONFIG.get("telegram_queue_size", 100),
+            batch_window=BYBIT_CONFIG.get("telegram_batch_window", 1.0),
+        )
+
+        state = StateStore(BYBIT_CONFIG["state_store"]) if BYBIT_CONFIG.get("state_store") else None
+
+        orders = OrderManager(
+            client=http,
+            cfg=BYBIT_CONFIG,
+            notifier=notifier,
+            state=state,
+        )
+
+        # правила монет — при запуске, а не на первом сигнале
+        if orders.instruments is not None:
+            await asyncio.to_thread(orders.instruments.warm_up)
+
+        strategy = Strategy(
+            client=http,
+            orders=orders,
+            settings=BYBIT_CONFIG,
+        )
+        # сколько свечей догружать — по часам биржи
+        strategy.klines.clock = client.clock
+
+        stats_logger = StatsLogger(
+            file_path=BYBIT_CONFIG.get("stats_file", "logs/stats.csv"),
+            backend=BYBIT_CONFIG.get("stats_backend", "csv"),
+            fsync_interval=BYBIT_CONFIG.get("stats_fsync_interval", 5.0),
+            max_bytes=BYBIT_CONFIG.get("stats_max_bytes"),
+            rotate_daily=BYBIT_CONFIG.get("stats_rotate_daily", False),
+        )
+
+        print_config_summary(BYBIT_CONFIG)
+        logger.info("Запущена стратегия (asyncio). Монеты: %s", ", ".join(coins))
+
+        # Стартовые позиции и баланс — одновременно
+        if orders.positions is not None:
+            try:
+                await refresh_positions_async(orders, aclient)
+            except Exception as e:
+                logger.warning("Ошибка загрузки позиций: %s", e)
+
+        positions, balance = await asyncio.gather(
+            asyncio.gather(*(refresh_position_async(orders, aclient, s) for s in coins)),
+            refresh_balance_async(orders, aclient),
+            return_exceptions=True,
+        )
+        if isinstance(positions, BaseException):
+            positions = [None] * len(coins)
+        balance = 0 if isinstance(balance, BaseException) else balance
+
+        # тёплый старт: направление и TP/SL — из StateStore
+        tracked_positions = state.open_positions() if state is not None else {}
+        initial_positions = []
+        for symbol, pos in zip(coins, positions):
+            if not pos or pos.get("pending"):
+                continue
+            entry = track_position(symbol, pos, tracked_positions.get(symbol))
+            tracked_positions[symbol] = entry
+            initial_positions.append(entry)
+
+        print(f"💰 Баланс: {balance:.2f} USDT")
+        print(f"📊 Открытых позиций: {len(initial_positions)}")
+        print(f"\n⏱️  {format_schedule(BYBIT_CONFIG, strategy.interval, poll_interval)}")
+        print("🚀 Бот запущен (asyncio). Ожидание сигналов...\n")
+        print("-" * 60 + "\n")
+
+        notifier.send(
+            "🤖 Бот запущен\n"
+            f"Баланс: {balance:.2f} USDT\n"
+            f"{format_positions_report(initial_positions)}"
+        )
+
+        private = start_private_stream(BYBIT_CONFIG, orders, state, client.clock)
+
+        def apply_closes():
+            # закрытия из приватного потока — в цикле событий, а не в потоке WebSocket
+            apply_private_closes(private, tracked_positions, stats_logger, notifier, state)
+
+        async def process(symbol, signal, decision):
+            if signal:
+                # вход в позицию — сетевые вызовы pybit, уводим из цикла событий
+                await asyncio.to_thread(
+                    handle_decision,
+                    symbol, signal, decision, orders, notifier, stats_logger, tracked_positions,
+                )
+            else:
+                handle_decision(
+                    symbol, signal, decision, orders, notifier, stats_logger, tracked_positions
+                )
+
+        async def refresh_positions():
+            # один запрос позиций на весь цикл (если их не приносит приватный поток)
+            if orders.positions is not None and not (private and private.is_live()):
+                try:
+                    await asyncio.wait_for(
+                        refresh_positions_async(orders, aclient), timeout=symbol_timeout
+                    )
+                except Exception as e:
+                    logger.warning("Ошибка загрузки позиций: %s", e)
+
+        async def refresh_balance():
+            # баланс обновляем заранее, чтобы расчёт объёма при сигнале не ждал сеть
+            try:
+                await asyncio.wait_for(
+                    refresh_balance_async(orders, aclient), timeout=symbol_timeout
+                )
+            except Exception as e:
+                logger.warning("Ошибка получения баланса: %s", e)
+
+        async def reconcile_positions():
+            """Между закрытиями свечей: только закрытия отслеживаемых позиций, без анализа."""
+            apply_closes()
+            if private and private.is_live():
+                return
+            symbols = list(tracked_positions)
+            if not symbols:
+                return
+            await refresh_positions()
+            snapshot = dict(tracked_positions)
+            scans = await asyncio.gather(
+                *(
+                    asyncio.wait_for(
+                        scan_symbol_async(
+                            symbol, snapshot.get(symbol), orders, strategy, aclient, analyze=False
+                        ),
+                        timeout=symbol_timeout,
+                    )
+                    for symbol in symbols
+                ),
+                return_exceptions=True,
+            )
+            for symbol, result in zip(symbols, scans):
+                if not isinstance(result, BaseException):
+                    apply_position_scan(
+                        symbol, result, tracked_positions, stats_logger, notifier, orders.balance,
+                        state,
+                    )
+
+        # анализ сразу после закрытия свечи, между закрытиями — сверка позиций и баланс
+        schedule = None
+        if bar_schedule_enabled(BYBIT_CONFIG, strategy.interval):
+            schedule = BarSchedule(
+                strategy.interval,
+                delay=BYBIT_CONFIG.get("bar_close_delay", 0.05),
+                clock=client.clock,
+            )
+            schedule.every(BYBIT_CONFIG.get("position_check_interval", poll_interval), reconcile_positions)
+            schedule.every(BYBIT_CONFIG.get("balance_ttl", 60) / 2, refresh_balance)
+            strategy.closed_only = True
+            strategy.clock = client.clock
+        bar_close_ms = None
+
+        try:
+            while True:
+                apply_closes()
+                snapshot = dict(tracked_positions)
+                await refresh_positions()
+                await refresh_balance()
+
+                scans = await scan_symbols_async(
+                    coins, snapshot, orders, strategy, aclient, batch_scan, symbol_timeout
+                )
+                apply_closes()
+
+                batch = []
+                for symbol, result in zip(coins, scans):
+                    if isinstance(result, asyncio.TimeoutError):
+                        logger.warning("[%s] Таймаут опроса (%s с), пропуск цикла", symbol, symbol_timeout)
+                        continue
+                    if isinstance(result, Exception):
+                        logger.warning("[%s] Ошибка опроса: %s", symbol, result)
+                        continue
+
+                    if not apply_position_scan(
+                        symbol, result, tracked_positions, stats_logger, notifier, orders.balance,
+                        state,
+                    ):
+                        continue
+
+                    if result["decision"] is None:
+                        batch.append(symbol)
+                        continue
+
+                    _, signal, decision = result["decision"]
+                    await process(symbol, signal, decision)
+
+                if batch:
+                    if position_unknown(orders, batch):
+                        decisions = await asyncio.to_thread(strategy.analyze_batch, batch, False)
+                    else:
+                        decisions = strategy.analyze_batch(batch, refresh=False)
+                    for symbol, signal, decision in decisions:
+                        await process(symbol, signal, decision)
+
+                if schedule is None:
+                    await asyncio.sleep(max(1, poll_interval))
+                    continue
+                if bar_close_ms is not None:
+                    METRICS.observe(
+                        "bar_close_to_decision_seconds", (schedule.now_ms() - bar_close_ms) / 1000
+                    )
+                bar_close_ms = await schedule.wait_async()
+        except asyncio.CancelledError:
+            logger.info("Остановка бота по запросу пользователя.")
+        finally:
+            if private:
+                await asyncio.to_thread(private.stop)
+            stop_metrics()
+            stats_logger.close()
+            if state is not None:
+                state.close()
+            notifier.send("⏹️ Бот остановлен.")
+            await asyncio.to_thread(notifier.close)
+
+
+async def main():
+    # SIGINT/SIGTERM отменяют основную задачу; на Windows остаётся KeyboardInterrupt
+    task = asyncio.current_task()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, task.cancel)
+        except (NotImplementedError, RuntimeError):
+            pass
+    await run_strategy_async()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
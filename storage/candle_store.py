@@ -0,0 +1,203 @@
+# storage/candle_store.py
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+from exchange.kline_cache import MAX_KLINE_LIMIT, interval_to_ms, parse_klines
+
+logger = logging.getLogger("vetlan_strategy")
+
+# Одна свеча — запись фиксированной ширины (48 байт)
+CANDLE_DTYPE = np.dtype(
+    [
+        ("ts", "<i8"),
+        ("open", "<f8"),
+        ("high", "<f8"),
+        ("low", "<f8"),
+        ("close", "<f8"),
+        ("volume", "<f8"),
+    ]
+)
+
+
+def rows_to_records(rows):
+    """Массив формы (6, n) (как в KlineCache) -> записи CANDLE_DTYPE."""
+    records = np.empty(rows.shape[1], dtype=CANDLE_DTYPE)
+    for i, name in enumerate(CANDLE_DTYPE.names):
+        records[name] = rows[i]
+    return records
+
+
+class CandleStore:
+    """
+    Локальный архив закрытых свечей: один бинарный файл на пару
+    (symbol, interval) — {root}/{interval}/{symbol}.bin, записи CANDLE_DTYPE
+    в хронологическом порядке.
+
+    Файлы читаются через np.memmap: read() и ohlcv() возвращают срезы
+    без копирования данных. В истории возможны пропуски (например, пока бот
+    не работал) — их закрывает download().
+    """
+
+    def __init__(self, root="data/candles"):
+        self.root = root
+        self._maps = {}
+        self._lock = threading.Lock()
+
+    # ---------------------------
+    # Чтение
+    # ---------------------------
+    def path(self, symbol, interval):
+        return os.path.join(self.root, str(interval), f"{symbol}.bin")
+
+    def read(self, symbol, interval, start=None, end=None):
+        """
+        Записи с ts в диапазоне [start, end] (мс, границы необязательны).
+        Возвращает срез memmap (без копирования).
+        """
+        data = self._map(symbol, interval)
+        lo = 0 if start is None else np.searchsorted(data["ts"], start, side="left")
+        hi = len(data) if end is None else np.searchsorted(data["ts"], end, side="right")
+        return data[lo:hi]
+
+    def ohlcv(self, symbol, interval, start=None, end=None):
+        """Кортеж колонок (ts, open, high, low, close, volume) — представления memmap."""
+        data = self.read(symbol, interval, start, end)
+        return tuple(data[name] for name in CANDLE_DTYPE.names)
+
+    def tail(self, symbol, interval, count):
+        """Последние count свечей в виде массива формы (6, n) для KlineCache."""
+        data = self._map(symbol, interval)[-count:]
+        return np.array([data[name] for name in CANDLE_DTYPE.names], dtype=float).reshape(6, -1)
+
+    def last_timestamp(self, symbol, interval):
+        data = self._map(symbol, interval)
+        if len(data) == 0:
+            return None
+        return int(data["ts"][-1])
+
+    # ---------------------------
+    # Запись
+    # ---------------------------
+    def append(self, symbol, interval, rows):
+        """
+        Дописывает в конец файла закрытые свечи rows (форма (6, k),
+        хронологический порядок). Свечи не новее последней сохранённой
+        пропускаются. Хвост файла короче одной записи (оборванная запись)
+        перед дописыванием обрезается. Возвращает количество записанных свечей.
+        """
+        if rows.shape[1] == 0:
+            return 0
+
+        with self._lock:
+            last = self.last_timestamp(symbol, interval)
+            if last is not None:
+                rows = rows[:, rows[0] > last]
+            if rows.shape[1] == 0:
+                return 0
+
+            path = self.path(symbol, interval)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._maps.pop((symbol, str(interval)), None)
+            with open(path, "ab") as f:
+                # иначе все следующие записи в memmap сдвинутся на обрывок
+                torn = f.tell() % CANDLE_DTYPE.itemsize
+                if torn:
+                    logger.warning("%s: обрезан неполный хвост (%d байт)", path, torn)
+                    f.truncate(f.tell() - torn)
+                rows_to_records(rows).tofile(f)
+        return rows.shape[1]
+
+    def write(self, symbol, interval, records):
+        """
+        Вливает записи CANDLE_DTYPE в архив (свечи с тем же ts заменяются)
+        и атомарно перезаписывает файл.
+        """
+        with self._lock:
+            existing = np.array(self._map(symbol, interval))
+            merged = np.concatenate((records, existing))
+            # np.unique оставляет первое вхождение — новые записи важнее
+            _, idx = np.unique(merged["ts"], return_index=True)
+            merged = merged[idx]
+
+            path = self.path(symbol, interval)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = path + ".tmp"
+            merged.tofile(tmp)
+            self._maps.pop((symbol, str(interval)), None)
+            os.replace(tmp, path)
+        return len(merged)
+
+    # ---------------------------
+    # Загрузка истории с биржи
+    # ---------------------------
+    def download(self, client, symbol, interval, start, end=None):
+        """
+        Загружает закрытые свечи за [start, end] (мс) постранично через
+        get_kline (по MAX_KLINE_LIMIT за запрос, от новых к старым)
+        и вливает их в архив. Возвращает количество загруженных свечей.
+        """
+        interval_ms = interval_to_ms(interval)
+        now_ms = int(time.time() * 1000)
+        end = now_ms if end is None else min(end, now_ms)
+
+        chunks = []
+        cursor = end
+        while cursor >= start:
+            resp = client.get_kline(
+                category="linear",
+                symbol=symbol,
+                interval=str(interval),
+                start=int(start),
+                end=int(cursor),
+                limit=MAX_KLINE_LIMIT,
+            )
+            if resp.get("retCode") != 0:
+                raise RuntimeError(
+                    f"Ошибка Bybit ({resp.get('retCode')}): {resp.get('retMsg')}"
+                )
+
+            klines = resp.get("result", {}).get("list", [])
+            if not klines:
+                break
+            rows = parse_klines(klines)
+            chunks.append(rows)
+
+            oldest = int(rows[0, 0])
+            if len(klines) < MAX_KLINE_LIMIT or oldest <= start:
+                break
+            cursor = oldest - 1
+
+        if not chunks:
+            return 0
+
+        # страницы шли от новых к старым
+        rows = np.concatenate(chunks[::-1], axis=1)
+        if interval_ms is not None:
+            # формирующаяся свеча в архив не попадает
+            rows = rows[:, rows[0] + interval_ms <= now_ms]
+        self.write(symbol, interval, rows_to_records(rows))
+        return rows.shape[1]
+
+    # ---------------------------
+    # Внутренние методы
+    # ---------------------------
+    def _map(self, symbol, interval):
+        key = (symbol, str(interval))
+        data = self._maps.get(key)
+        if data is not None:
+            return data
+
+        path = self.path(symbol, interval)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        count = size // CANDLE_DTYPE.itemsize
+        if count == 0:
+            # memmap не умеет отображать пустой файл
+            return np.empty(0, dtype=CANDLE_DTYPE)
+
+        data = np.memmap(path, dtype=CANDLE_DTYPE, mode="r", shape=(count,))
+        self._maps[key] = data
+        return data
@@ -0,0 +1,303 @@
+# storage/state_store.py
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger("vetlan_strategy")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS signals (
+    ts INTEGER, symbol TEXT, signal TEXT, entry REAL, tp REAL, sl REAL, message TEXT
+);
+CREATE INDEX IF NOT EXISTS signals_symbol_ts ON signals (symbol, ts);
+
+CREATE TABLE IF NOT EXISTS orders (
+    ts INTEGER, symbol TEXT, order_id TEXT, side TEXT, qty REAL,
+    price REAL, tp REAL, sl REAL, status TEXT
+);
+CREATE INDEX IF NOT EXISTS orders_symbol_ts ON orders (symbol, ts);
+
+CREATE TABLE IF NOT EXISTS positions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    symbol TEXT, direction TEXT, size REAL, entry_price REAL, tp REAL, sl REAL,
+    status TEXT, opened_at INTEGER, updated_at INTEGER,
+    closed_at INTEGER, exit_price REAL, pnl REAL
+);
+CREATE INDEX IF NOT EXISTS positions_symbol_opened ON positions (symbol, opened_at);
+CREATE INDEX IF NOT EXISTS positions_open ON positions (closed_at);
+
+CREATE TABLE IF NOT EXISTS fills (
+    ts INTEGER, symbol TEXT, order_id TEXT, exec_id TEXT, side TEXT,
+    price REAL, qty REAL, fee REAL
+);
+CREATE INDEX IF NOT EXISTS fills_symbol_ts ON fills (symbol, ts);
+"""
+
+# Поля позиции в памяти — те же, что в tracked_positions
+_POSITION_FIELDS = ("symbol", "direction", "size", "entryPrice", "tp", "sl", "status", "opened_at")
+
+_STOP = object()
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+class StateStore:
+    """
+    Состояние бота в SQLite (WAL): сигналы, ордера, позиции с направлением
+    и TP/SL, исполнения. Нужен для «тёплого» перезапуска: открытые позиции
+    читаются из базы, а не восстанавливаются по ценам.
+
+    Открытые позиции дублируются в памяти — чтение не ходит в базу.
+    Запись ставится в очередь и выполняется фоновым потоком пачками
+    (одна транзакция на пачку), поэтому торговый цикл не ждёт диск.
+    """
+
+    def __init__(self, path="data/state.sqlite", batch_size=500):
+        self.path = path
+        self.batch_size = batch_size
+
+        self._positions = {}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        db = self._connect()
+        try:
+            db.executescript(_SCHEMA)
+            rows = db.execute(
+                "SELECT symbol, direction, size, entry_price, tp, sl, status, opened_at "
+                "FROM positions WHERE closed_at IS NULL ORDER BY opened_at"
+            ).fetchall()
+        finally:
+            db.close()
+        for row in rows:
+            self._positions[row[0]] = dict(zip(_POSITION_FIELDS, row))
+
+        self._writer = threading.Thread(target=self._run, name="state-store", daemon=True)
+        self._writer.start()
+
+    # ---------------------------
+    # Позиции
+    # ---------------------------
+    def position(self, symbol):
+        """Открытая (или ожидающая исполнения) позиция по монете или None."""
+        with self._lock:
+            pos = self._positions.get(symbol)
+            return dict(pos) if pos else None
+
+    def open_positions(self):
+        """Открытые позиции в формате tracked_positions (без ожидающих)."""
+        with self._lock:
+            return {
+                symbol: dict(pos)
+                for symbol, pos in self._positions.items()
+                if pos["status"] == "open"
+            }
+
+    def open_position(self, symbol, direction, size, entry, tp, sl, status="pending"):
+        """Новая позиция (после отправки ордера — со статусом pending)."""
+        now = _now_ms()
+        with self._lock:
+            if symbol in self._positions:
+                self._close(symbol, now, None, None)
+            self._positions[symbol] = {
+                "symbol": symbol,
+                "direction": direction,
+                "size": size,
+                "entryPrice": entry,
+                "tp": tp,
+                "sl": sl,
+                "status": status,
+                "opened_at": now,
+            }
+        self._execute(
+            "INSERT INTO positions (symbol, direction, size, entry_price, tp, sl, status, "
+            "opened_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (symbol, direction, size, entry, tp, sl, status, now, now),
+        )
+
+    def save_position(self, entry):
+        """
+        Обновляет открытую позицию по записи tracked_positions
+        (пишет в базу, только если что-то изменилось).
+        """
+        symbol = entry["symbol"]
+        with self._lock:
+            known = self._positions.get(symbol)
+            if known is None:
+                changed = None
+            else:
+                changed = {
+                    key: entry[key]
+                    for key in ("direction", "size", "entryPrice", "tp", "sl")
+                    if entry.get(key) is not None and entry[key] != known[key]
+                }
+                if not changed and known["status"] == "open":
+                    return
+                known.update(changed, status="open")
+
+        if known is None:
+            self.open_position(
+                symbol, entry.get("direction"), entry.get("size"), entry.get("entryPrice"),
+                entry.get("tp"), entry.get("sl"), status="open",
+            )
+            return
+
+        self._execute(
+            "UPDATE positions SET direction = ?, size = ?, entry_price = ?, tp = ?, sl = ?, "
+            "status = 'open', updated_at = ? WHERE symbol = ? AND closed_at IS NULL",
+            (known["direction"], known["size"], known["entryPrice"], known["tp"], known["sl"],
+             _now_ms(), symbol),
+        )
+
+    def close_position(self, symbol, exit_price=None, pnl=None):
+        """Закрывает позицию. Возвращает её последнюю запись или None."""
+        with self._lock:
+            return self._close(symbol, _now_ms(), exit_price, pnl)
+
+    def _close(self, symbol, now, exit_price, pnl):
+        pos = self._positions.pop(symbol, None)
+        if pos is None:
+            return None
+        self._execute(
+            "UPDATE positions SET closed_at = ?, updated_at = ?, exit_price = ?, pnl = ? "
+            "WHERE symbol = ? AND closed_at IS NULL",
+            (now, now, exit_price, pnl, symbol),
+        )
+        return pos
+
+    # ---------------------------
+    # Журналы
+    # ---------------------------
+    def record_signal(self, symbol, signal, decision):
+        decision = decision or {}
+        self._execute(
+            "INSERT INTO signals VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (_now_ms(), symbol, signal, decision.get("entry"), decision.get("tp"),
+             decision.get("sl"), decision.get("message")),
+        )
+
+    def record_order(self, symbol, side, qty, price, tp=None, sl=None, order_id=None, status="placed"):
+        self._execute(
+            "INSERT INTO orders VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (_now_ms(), symbol, order_id, side, qty, price, tp, sl, status),
+        )
+
+    def record_fill(self, symbol, side, price, qty, fee=None, order_id=None, exec_id=None, ts=None):
+        self._execute(
+            "INSERT INTO fills VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (ts or _now_ms(), symbol, order_id, exec_id, side, price, qty, fee),
+        )
+
+    def history(self, table, symbol=None, start=None, end=None):
+        """
+        Записи таблицы (signals, orders, fills, positions) по монете
+        и времени в мс (границы включительно) — словари, по возрастанию времени.
+        """
+        ts = {"signals": "ts", "orders": "ts", "fills": "ts", "positions": "opened_at"}[table]
+        query, args = f"SELECT * FROM {table} WHERE 1=1", []
+        if symbol:
+            query += " AND symbol = ?"
+            args.append(symbol)
+        if start is not None:
+            query += f" AND {ts} >= ?"
+            args.append(start)
+        if end is not None:
+            query += f" AND {ts} <= ?"
+            args.append(end)
+
+        self.flush()
+        db = self._connect()
+        try:
+            cursor = db.execute(f"{query} ORDER BY {ts}", args)
+            names = [c[0] for c in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+        finally:
+            db.close()
+
+    # ---------------------------
+    # Фоновая запись
+    # ---------------------------
+    def flush(self, timeout=10):
+        """Ждёт, пока фоновый поток запишет всё, что поставлено в очередь."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout=10):
+        self._queue.put(_STOP)
+        self._writer.join(timeout)
+
+    def _execute(self, sql, params):
+        self._queue.put((sql, params))
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def _run(self):
+        db = self._connect()
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            events, writes = [], []
+            for item in batch:
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    events.append(item)
+                else:
+                    writes.append(item)
+
+            try:
+                self._write(db, writes)
+            finally:
+                # ожидающие flush() не должны висеть до таймаута из-за ошибки записи
+                for event in events:
+                    event.set()
+        db.close()
+
+    def _write(self, db, writes):
+        """
+        Пачка — одной транзакцией. Если она не прошла, записи повторяются
+        по одной: ошибочная не откатывает остальные (например, открытие позиции).
+        """
+        if not writes:
+            return
+        try:
+            with db:
+                for sql, params in writes:
+                    db.execute(sql, params)
+            return
+        except Exception as e:
+            if len(writes) == 1:
+                logger.warning("Ошибка записи состояния в %s: %s", self.path, e)
+                return
+
+        failed, error = 0, None
+        for sql, params in writes:
+            try:
+                with db:
+                    db.execute(sql, params)
+            except Exception as e:
+                failed += 1
+                error = error or e
+        if failed:
+            logger.warning(
+                "Ошибка записи состояния в %s: не записано %d из %d (%s)",
+                self.path, failed, len(writes), error,
+            )
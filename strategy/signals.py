@@ -0,0 +1,177 @@
+# strategy/signals.py
+"""
+Правила стратегии в векторном виде.
+
+signal_masks() применяет те же условия, что и Strategy._decide, но сразу ко
+всем свечам и всем монетам: на вход подаются ряды формы (bars,) или
+матрицы (symbols, bars), на выходе — булевы маски сигналов и уровни TP/SL.
+last_bar_masks() — то же только для последней свечи (пакетный анализ):
+индикаторы не считаются по всей истории, и для каждой монеты без сигнала
+есть код причины из REASONS.
+"""
+import numpy as np
+
+from indicators.series import (
+    rsi_series,
+    ema_series,
+    atr_series,
+    volume_sma_series,
+    rsi_last,
+    ema_last,
+    atr_last,
+    volume_sma_last,
+    spring_series,
+    upthrust_series,
+)
+
+# Причины отказа в порядке проверки Strategy._decide; индекс в REASONS —
+# код в last_bar_masks()["reason"]
+REASONS = (
+    "signal",
+    "no_rsi",
+    "no_atr",
+    "low_atr",
+    "position",
+    "long_volume",
+    "long_trend",
+    "long_pattern",
+    "short_volume",
+    "short_trend",
+    "short_pattern",
+    "none",
+)
+
+
+def _cached(cache, key, func, *args):
+    if cache is None:
+        return func(*args)
+    if key not in cache:
+        cache[key] = func(*args)
+    return cache[key]
+
+
+def signal_masks(strategy, o, h, l, c, v, has_position=False, cache=None):
+    """
+    strategy — экземпляр Strategy (берутся только его настройки).
+    has_position — bool или массив, транслируемый к форме c
+    (например, (symbols, 1) для матрицы).
+    cache — словарь для повторных вызовов на тех же свечах (подбор
+    параметров): ряды индикаторов сохраняются в нём по (индикатор, период).
+    """
+    o, h, l, c, v = (np.asarray(x, dtype=float) for x in (o, h, l, c, v))
+
+    rsi = _cached(cache, ("rsi", strategy.rsi_period), rsi_series, c, strategy.rsi_period)
+    ema = _cached(cache, ("ema", strategy.ema_period), ema_series, c, strategy.ema_period)
+    atr = _cached(cache, ("atr", strategy.atr_period), atr_series, h, l, c, strategy.atr_period)
+    vol_sma = _cached(
+        cache, ("vol_sma", strategy.vol_sma_period), volume_sma_series, v, strategy.vol_sma_period
+    )
+    spring = upthrust = None
+    if strategy.enable_patterns:
+        spring = _cached(cache, ("spring",), spring_series, o, h, l, c)
+        upthrust = _cached(cache, ("upthrust",), upthrust_series, o, h, l, c)
+
+    return _apply_rules(strategy, c, v, rsi, ema, atr, vol_sma, spring, upthrust, has_position)
+
+
+def last_bar_masks(strategy, o, h, l, c, v, has_position=False):
+    """
+    signal_masks() только для последней свечи: o/h/l/c/v — ряды (bars,)
+    или матрицы (symbols, bars), результат — значения формы () или
+    (symbols,). Индикаторы считаются по хвосту, которого достаточно для
+    последнего значения (indicators.series.*_last); has_position —
+    bool или массив (symbols,). Дополнительно возвращает "reason" —
+    индекс в REASONS (почему нет сигнала).
+    """
+    o, h, l, c, v = (np.asarray(x, dtype=float) for x in (o, h, l, c, v))
+
+    rsi = rsi_last(c, strategy.rsi_period)
+    ema = ema_last(c, strategy.ema_period)
+    atr = atr_last(h, l, c, strategy.atr_period)
+    vol_sma = volume_sma_last(v, strategy.vol_sma_period)
+
+    o, h, l, c, v = (x[..., -1] for x in (o, h, l, c, v))
+    spring = upthrust = None
+    if strategy.enable_patterns:
+        spring = spring_series(o, h, l, c)
+        upthrust = upthrust_series(o, h, l, c)
+
+    masks = _apply_rules(strategy, c, v, rsi, ema, atr, vol_sma, spring, upthrust, has_position)
+
+    long_zone, short_zone = masks["long_zone"], masks["short_zone"]
+    weak_volume, against_trend = masks["weak_volume"], masks["against_trend"]
+    masks["reason"] = np.select(
+        [
+            masks["long"] | masks["short"],
+            np.isnan(rsi),
+            np.isnan(atr),
+            masks["low_atr"],
+            np.asarray(has_position, dtype=bool),
+            long_zone & weak_volume,
+            long_zone & against_trend,
+            long_zone,
+            short_zone & weak_volume,
+            short_zone & against_trend,
+            short_zone,
+        ],
+        np.arange(len(REASONS) - 1),
+        default=len(REASONS) - 1,
+    )
+    return masks
+
+
+def _apply_rules(strategy, c, v, rsi, ema, atr, vol_sma, spring, upthrust, has_position):
+    """Правила входа по готовым индикаторам; все массивы одной формы."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ready = ~np.isnan(rsi) & ~np.isnan(atr)
+
+        low_atr = np.zeros(np.shape(c), dtype=bool)
+        if strategy.min_atr_pct > 0:
+            low_atr = (atr / c) * 100 < strategy.min_atr_pct
+            ready &= ~low_atr
+
+        ready &= ~np.asarray(has_position, dtype=bool)
+
+        weak_volume = (
+            ~np.isnan(vol_sma)
+            & (vol_sma != 0)
+            & (v < vol_sma * strategy.min_vol_mult)
+        )
+        has_ema = ~np.isnan(ema)
+
+        # ЛОНГ
+        long_zone = strategy.enable_long & (rsi < strategy.rsi_long)
+        # ШОРТ (проверяется, только если не сработала зона лонга)
+        short_zone = strategy.enable_short & (rsi > strategy.rsi_short) & ~long_zone
+
+        # цена по другую сторону EMA (для лонга — ниже, для шорта — выше)
+        against_trend = np.zeros(np.shape(c), dtype=bool)
+        if strategy.use_trend_filter:
+            against_trend = has_ema & np.where(long_zone, c < ema, c > ema)
+
+        long = ready & long_zone & ~weak_volume & ~against_trend
+        short = ready & short_zone & ~weak_volume & ~against_trend
+        if strategy.enable_patterns:
+            long &= spring
+            short &= upthrust
+
+        tp_long = np.maximum(c + atr * strategy.tp_long_atr, c * (1 + strategy.min_tp_pct))
+        sl_long = np.minimum(c - atr * strategy.sl_long_atr, c * (1 - strategy.min_sl_pct))
+        tp_short = np.minimum(c - atr * strategy.tp_short_atr, c * (1 - strategy.min_tp_pct))
+        sl_short = np.maximum(c + atr * strategy.sl_short_atr, c * (1 + strategy.min_sl_pct))
+
+    return {
+        "rsi": rsi,
+        "ema": ema,
+        "atr": atr,
+        "vol_sma": vol_sma,
+        "long": long,
+        "short": short,
+        "tp": np.where(long, tp_long, np.where(short, tp_short, np.nan)),
+        "sl": np.where(long, sl_long, np.where(short, sl_short, np.nan)),
+        "low_atr": low_atr,
+        "long_zone": long_zone,
+        "short_zone": short_zone,
+        "weak_volume": weak_volume,
+        "against_trend": against_trend,
+    }
@@ -1,14 +1,25 @@
 # strategy/strategy.py
 
+import math
+import time
+
 import numpy as np
+from exchange.kline_cache import KlineCache, interval_to_ms
+from exchange.resampler import Resampler
 from indicators.indicators import (
-    calc_rsi,
-    calc_ema,
-    calc_atr,
-    calc_volume_sma,
     detect_spring,
     detect_upthrust,
 )
+from indicators.streaming import IndicatorSet
+from storage.candle_store import CandleStore
+from strategy.signals import REASONS, last_bar_masks
+from utils.metrics import METRICS
+
+
+def _scalar(value):
+    """NaN из векторных рядов -> None, как у calc_* функций."""
+    value = float(value)
+    return None if math.isnan(value) else value
 
 
 class Strategy:
@@ -16,12 +27,34 @@ class Strategy:
     Стратегия принимает pybit HTTP-клиент, OrderManager и настройки.
     """
 
-    def __init__(self, client, orders, settings: dict):
+    def __init__(self, client, orders, settings: dict, klines=None):
         self.client = client
         self.orders = orders
         self.settings = settings
 
         self.interval = settings.get("interval", "15")
+
+        # Кэш свечей: полная история загружается один раз, дальше только новые свечи;
+        # с архивом на диске история после перезапуска берётся оттуда
+        store_dir = settings.get("candle_store")
+        store = CandleStore(store_dir) if store_dir else None
+        history = settings.get("kline_history", 200)
+
+        # Мультитаймфрейм: с биржи идёт одна минутная лента на монету,
+        # свечи interval и timeframes собираются из неё локально
+        self.resampler = None
+        if settings.get("resample", False) and settings.get("market_data", "rest") == "rest":
+            self.resampler = Resampler(
+                client,
+                base=settings.get("resample_base", "1"),
+                timeframes=[self.interval, *settings.get("timeframes", [])],
+                history=history,
+                store=store,
+                feed=klines,
+            )
+            klines = self.resampler.feed
+        self.klines = klines or KlineCache(client, history=history, store=store)
+
         self.enable_long = settings.get("enable_long", True)
         self.enable_short = settings.get("enable_short", True)
 
@@ -45,283 +78,428 @@ class Strategy:
         self.use_trend_filter = settings.get("use_trend_filter", True)
         self.min_atr_pct = settings.get("min_atr_pct", 0.3)
 
+        # Потоковые индикаторы: один набор на монету
+        self._indicators = {}
+
+        # MarketDataStream, если свечи приходят по WebSocket
+        self.stream = None
+
+        # Анализ по закрытию свечи (BarSchedule): формирующаяся свеча
+        # отбрасывается; clock — ServerClock (время биржи) или None
+        self.closed_only = False
+        self.clock = None
+
+    @property
+    def feed_interval(self):
+        """Интервал свечей, которые запрашиваются с биржи в self.klines."""
+        return self.resampler.base if self.resampler is not None else self.interval
+
+    def _indicator_set(self, symbol, timeframe=None):
+        # основной интервал — по монете, остальные таймфреймы — по (монета, таймфрейм)
+        key = symbol if timeframe in (None, self.interval) else (symbol, timeframe)
+        indicators = self._indicators.get(key)
+        if indicators is None:
+            indicators = IndicatorSet(
+                rsi_period=self.rsi_period,
+                ema_period=self.ema_period,
+                atr_period=self.atr_period,
+                vol_sma_period=self.vol_sma_period,
+            )
+            self._indicators[key] = indicators
+        return indicators
+
+    def ohlcv(self, symbol, timeframe=None):
+        """
+        Свечи монеты на таймфрейме timeframe (по умолчанию — interval) из
+        кэша, без запроса к бирже. Таймфреймы, отличные от interval, есть
+        только с resample (Resampler), иначе — пустые массивы.
+        """
+        timeframe = str(timeframe or self.interval)
+        if self.resampler is not None:
+            return self.resampler.ohlcv(symbol, timeframe)
+        return self.klines.ohlcv(symbol, timeframe)
+
+    def indicators(self, symbol, timeframe=None):
+        """
+        Потоковые индикаторы монеты на таймфрейме timeframe по свечам из
+        кэша (с closed_only — только по закрытым). None — свечей нет.
+        """
+        timeframe = str(timeframe or self.interval)
+        ts, _, h, l, c, v = self._closed_candles(self.ohlcv(symbol, timeframe), timeframe)
+        if len(ts) == 0:
+            return None
+        indicators = self._indicator_set(symbol, timeframe)
+        indicators.sync(ts, h, l, c, v)
+        return indicators
+
+    def kline_error(self, symbol, exc):
+        """Ответ стратегии на ошибку загрузки или разбора свечей."""
+        if isinstance(exc, RuntimeError):
+            message = str(exc)
+        else:
+            message = (
+                f"Некорректные данные свечей: {exc}. "
+                "Ожидаем формат [ts, open, high, low, close, volume]."
+            )
+        return (
+            symbol,
+            None,
+            {
+                "message": message,
+                "indicators": [],
+            },
+        )
+
+    def _load_klines(self, symbol, refresh=True):
+        """
+        Возвращает (свечи, None) либо (None, готовый ответ с ошибкой).
+        refresh=False — взять свечи из кэша без запроса к бирже.
+        """
+        # свечи обновляет WebSocket-поток — REST не нужен
+        if refresh and self.stream is not None and self.stream.is_live(symbol):
+            refresh = False
+
+        try:
+            if refresh:
+                self.klines.update(symbol, self.feed_interval)
+            candles = self.ohlcv(symbol)
+        except (ValueError, TypeError, IndexError, RuntimeError) as exc:
+            return None, self.kline_error(symbol, exc)
+
+        candles = self._closed_candles(candles)
+
+        if len(candles[0]) == 0:
+            return None, (
+                symbol,
+                None,
+                {
+                    "message": "Нет данных по свечам",
+                    "indicators": [],
+                },
+            )
+
+        return candles, None
+
+    def _closed_candles(self, candles, timeframe=None):
+        """С closed_only — свечи без последней, если она ещё не закрылась."""
+        interval_ms = interval_to_ms(timeframe or self.interval)
+        ts = candles[0]
+        if not self.closed_only or interval_ms is None or len(ts) == 0:
+            return candles
+        now_ms = self.clock.now_ms() if self.clock is not None else time.time() * 1000
+        if ts[-1] + interval_ms > now_ms:
+            return tuple(series[:-1] for series in candles)
+        return candles
+
     # ===========================================================
     #   ГЛАВНЫЙ МЕТОД СТРАТЕГИИ
     # ===========================================================
-    def analyze_symbol(self, symbol: str):
+    def analyze_symbol(self, symbol: str, refresh=True):
+        """
+        refresh=False — свечи уже обновлены в self.klines (пулом потоков,
+        асинхронным циклом или WebSocket-потоком), запрос к бирже не нужен.
+        """
+        with METRICS.timer("strategy_analyze_seconds"):
+            return self._analyze_symbol(symbol, refresh)
+
+    def _analyze_symbol(self, symbol, refresh):
         decisions = []
         try:
-            # Загружаем свечи
-            resp = self.client.get_kline(
-                category="linear",
-                symbol=symbol,
-                interval=self.interval,
-                limit=200,
-            )
-
-            if resp.get("retCode") != 0:
-                return (
-                    symbol,
-                    None,
-                    {
-                        "message": (
-                            f"Ошибка Bybit ({resp.get('retCode')}): "
-                            f"{resp.get('retMsg')}"
-                        ),
-                        "indicators": decisions,
-                    },
-                )
-
-            klines = resp.get("result", {}).get("list", [])
-
-            if not klines:
-                return (
-                    symbol,
-                    None,
-                    {
-                        "message": "Нет данных по свечам",
-                        "indicators": decisions,
-                    },
-                )
-
-            # ----------------------------
-            # парсим OHLCV
-            # ----------------------------
-            try:
-                o = np.array([float(k[1]) for k in klines], dtype=float)
-                h = np.array([float(k[2]) for k in klines], dtype=float)
-                l = np.array([float(k[3]) for k in klines], dtype=float)
-                c = np.array([float(k[4]) for k in klines], dtype=float)
-                v = np.array([float(k[5]) for k in klines], dtype=float)
-            except (ValueError, TypeError, IndexError) as exc:
-                return (
-                    symbol,
-                    None,
-                    {
-                        "message": (
-                            f"Некорректные данные свечей: {exc}. "
-                            "Ожидаем формат [ts, open, high, low, close, volume]."
-                        ),
-                        "indicators": decisions,
-                    },
-                )
-
-            last_price = c[-1]
+            # Загружаем свечи (из кэша + только новые с биржи)
+            candles, error = self._load_klines(symbol, refresh)
+            if error:
+                return error
+            ts, o, h, l, c, v = candles
 
             # ----------------------------
             # Индикация
             # ----------------------------
-            rsi = calc_rsi(c, self.rsi_period)
-            ema50 = calc_ema(c, self.ema_period)
-            atr = calc_atr(h, l, c, self.atr_period)
-            vol_sma = calc_volume_sma(v, self.vol_sma_period)
-
-            if rsi is None:
-                return (
-                    symbol,
-                    None,
-                    {
-                        "message": "Недостаточно данных для RSI",
-                        "indicators": decisions,
-                    },
-                )
-
-            if atr is None:
-                return (
-                    symbol,
-                    None,
-                    {
-                        "message": "Недостаточно данных для ATR",
-                        "indicators": decisions,
-                    },
-                )
-
-            # Проверка волатильности
-            if self.min_atr_pct > 0:
-                atr_pct = (atr / last_price) * 100
-                if atr_pct < self.min_atr_pct:
-                    return (
-                        symbol,
-                        None,
-                        {
-                            "message": f"Волатильность слишком низкая ({atr_pct:.2f}% < {self.min_atr_pct}%)",
-                            "indicators": decisions,
-                        },
-                    )
+            indicators = self._indicator_set(symbol)
+            with METRICS.timer("indicator_seconds"):
+                indicators.sync(ts, h, l, c, v)
 
-            # расширенный лог
-            decisions = []
-            decisions.append(f"RSI={rsi:.2f}")
+            rsi = indicators.rsi
+            ema50 = indicators.ema
+            atr = indicators.atr
+            vol_sma = indicators.vol_sma
 
-            if ema50 is not None:
-                decisions.append(f"EMA{self.ema_period}={ema50:.4f}")
-            else:
-                decisions.append(f"EMA{self.ema_period}=n/a")
+            return self._decide(symbol, o, h, l, c, v, rsi, ema50, atr, vol_sma)
 
-            decisions.append(f"ATR={atr:.6f}")
+        except Exception as e:
+            return (
+                symbol,
+                None,
+                {"message": f"Ошибка: {e}", "indicators": decisions},
+            )
 
-            if vol_sma is not None:
-                decisions.append(f"Volume={v[-1]:.2f}, SMA={vol_sma:.2f}")
+    # ===========================================================
+    #   ПАКЕТНЫЙ АНАЛИЗ ВСЕХ МОНЕТ
+    # ===========================================================
+    def analyze_batch(self, symbols, refresh=True):
+        """
+        Анализ списка монет одним векторным проходом.
+
+        Монеты группируются по длине истории, свечи каждой группы
+        складываются в матрицы (symbols, bars); индикаторы и правила входа
+        считаются сразу для всей матрицы, только на последней свече
+        (strategy.signals.last_bar_masks). Возвращает список кортежей
+        (symbol, signal, decision) в порядке symbols, как analyze_symbol.
+        RSI/EMA здесь считаются векторно по всей истории монеты, а не
+        потоковыми индикаторами.
+        refresh=False — свечи уже подгружены (например, пулом потоков).
+        """
+        results = {}
+        loaded = {}
+        for symbol in symbols:
+            try:
+                candles, error = self._load_klines(symbol, refresh)
+            except Exception as e:
+                error = (symbol, None, {"message": f"Ошибка: {e}", "indicators": []})
+            if error:
+                results[symbol] = error
             else:
-                decisions.append(f"Volume={v[-1]:.2f}, SMA=n/a")
-
-            # ----------------------------
-            # проверяем позицию
-            # ----------------------------
-            if self.orders.has_open_position(symbol, use_cache=True):
-                return (
-                    symbol,
-                    None,
-                    {
-                        "message": "Позиция уже открыта",
-                        "indicators": decisions,
-                    },
-                )
-
-            # =====================================================
-            #                   ЛОНГ (Buy)
-            # =====================================================
-            if self.enable_long and rsi < self.rsi_long:
-                # Проверка объёма
-                if vol_sma and v[-1] < vol_sma * self.min_vol_mult:
-                    return (
+                loaded[symbol] = candles[1:]
+
+        # монеты с одинаковой длиной истории — в одну матрицу: каждая
+        # сохраняет всю свою историю (свежий листинг не обрезает остальные)
+        groups = {}
+        for symbol, candles in loaded.items():
+            groups.setdefault(len(candles[3]), []).append(symbol)
+        for names in groups.values():
+            results.update(self._batch_decisions(names, loaded))
+
+        return [results[symbol] for symbol in symbols]
+
+    def _batch_decisions(self, names, loaded):
+        """Решения по монетам names с историей одной длины одним векторным проходом."""
+        results = {}
+        # рекурсиям RSI/EMA нужна вся история close, ATR, SMA объёма и паттернам — хвост
+        tail = max(self.atr_period, self.vol_sma_period) + 1
+        c = np.vstack([loaded[name][3] for name in names])
+        o, h, l, v = (
+            np.vstack([loaded[name][k][-tail:] for name in names]) for k in (0, 1, 2, 4)
+        )
+        has_position = np.array(
+            [self.orders.has_open_position(name, use_cache=True) for name in names],
+            dtype=bool,
+        )
+
+        with METRICS.timer("indicator_seconds", mode="batch"):
+            masks = last_bar_masks(self, o, h, l, c, v, has_position)
+
+        # списки Python: поэлементный доступ к numpy-скалярам медленнее
+        rsi_l, ema_l, atr_l, vol_sma_l, tp_l, sl_l = (
+            masks[key].tolist() for key in ("rsi", "ema", "atr", "vol_sma", "tp", "sl")
+        )
+        reasons, longs = masks["reason"].tolist(), masks["long"].tolist()
+        closes, volumes = c[:, -1].tolist(), v[:, -1].tolist()
+
+        for i, symbol in enumerate(names):
+            rsi, ema50, atr, vol_sma = (
+                _scalar(values[i]) for values in (rsi_l, ema_l, atr_l, vol_sma_l)
+            )
+            last_price = closes[i]
+            try:
+                reason = REASONS[reasons[i]]
+                if reason == "signal":
+                    signal = "long" if longs[i] else "short"
+                    decisions = self._indicator_log(rsi, ema50, atr, volumes[i], vol_sma)
+                    results[symbol] = self._signal_decision(
                         symbol,
-                        None,
-                        {
-                            "message": (
-                                f"LONG отклонён: объём слабый "
-                                f"({v[-1]:.2f} < {vol_sma * self.min_vol_mult:.2f})"
-                            ),
-                            "indicators": decisions,
-                        },
+                        signal,
+                        rsi,
+                        ema50,
+                        last_price,
+                        last_price,
+                        tp_l[i],
+                        sl_l[i],
+                        decisions,
                     )
-
-                # Фильтр тренда по EMA50
-                if self.use_trend_filter and ema50 is not None:
-                    if last_price < ema50:
-                        return (
-                            symbol,
-                            None,
-                            {
-                                "message": f"LONG отклонён: цена ниже EMA50 (нисходящий тренд). Цена: {last_price:.4f}, EMA50: {ema50:.4f}",
-                                "indicators": decisions,
-                            },
-                        )
-
-                # Проверка паттерна Spring
-                if self.enable_patterns:
-                    if not detect_spring(o[-1], h[-1], l[-1], c[-1]):
-                        return (
-                            symbol,
-                            None,
-                            {
-                                "message": "LONG отклонён: нет паттерна Spring (ложный пробой вниз)",
-                                "indicators": decisions,
-                            },
-                        )
-
-                entry = last_price
-                tp = max(
-                    entry + atr * self.tp_long_atr,
-                    entry * (1 + self.min_tp_pct),
-                )
-                sl = min(
-                    entry - atr * self.sl_long_atr,
-                    entry * (1 - self.min_sl_pct),
-                )
-
-                pattern_info = ", Spring OK" if self.enable_patterns else ""
-                trend_info = f", цена выше EMA50 ({last_price:.4f} > {ema50:.4f})" if (self.use_trend_filter and ema50) else ""
-                return (
-                    symbol,
-                    "long",
-                    {
-                        "message": f"LONG сигнал: RSI={rsi:.2f}{pattern_info}{trend_info}",
-                        "entry": entry,
-                        "tp": tp,
-                        "sl": sl,
-                        "indicators": decisions,
-                    },
-                )
-
-            # =====================================================
-            #                   ШОРТ (Sell)
-            # =====================================================
-            if self.enable_short and rsi > self.rsi_short:
-                # Проверка объёма
-                if vol_sma and v[-1] < vol_sma * self.min_vol_mult:
-                    return (
-                        symbol,
-                        None,
-                        {
-                            "message": (
-                                f"SHORT отклонён: объём слабый "
-                                f"({v[-1]:.2f} < {vol_sma * self.min_vol_mult:.2f})"
-                            ),
-                            "indicators": decisions,
-                        },
+                else:
+                    # причина — из масок, правила повторно не проверяются
+                    results[symbol] = self._no_signal(
+                        symbol, reason, rsi, ema50, atr, last_price, volumes[i], vol_sma
                     )
+            except Exception as e:
+                results[symbol] = (symbol, None, {"message": f"Ошибка: {e}", "indicators": []})
+        return results
 
-                # Фильтр тренда по EMA50
-                if self.use_trend_filter and ema50 is not None:
-                    if last_price > ema50:
-                        return (
-                            symbol,
-                            None,
-                            {
-                                "message": f"SHORT отклонён: цена выше EMA50 (восходящий тренд). Цена: {last_price:.4f}, EMA50: {ema50:.4f}",
-                                "indicators": decisions,
-                            },
-                        )
-
-                # Проверка паттерна Upthrust
-                if self.enable_patterns:
-                    if not detect_upthrust(o[-1], h[-1], l[-1], c[-1]):
-                        return (
-                            symbol,
-                            None,
-                            {
-                                "message": "SHORT отклонён: нет паттерна Upthrust (ложный пробой вверх)",
-                                "indicators": decisions,
-                            },
-                        )
-
-                entry = last_price
-                tp = min(
-                    entry - atr * self.tp_short_atr,
-                    entry * (1 - self.min_tp_pct),
-                )
-                sl = max(
-                    entry + atr * self.sl_short_atr,
-                    entry * (1 + self.min_sl_pct),
-                )
-
-                pattern_info = ", Upthrust OK" if self.enable_patterns else ""
-                trend_info = f", цена ниже EMA50 ({last_price:.4f} < {ema50:.4f})" if (self.use_trend_filter and ema50) else ""
-                return (
-                    symbol,
-                    "short",
-                    {
-                        "message": f"SHORT сигнал: RSI={rsi:.2f}{pattern_info}{trend_info}",
-                        "entry": entry,
-                        "tp": tp,
-                        "sl": sl,
-                        "indicators": decisions,
-                    },
-                )
+    # ===========================================================
+    #   ПРАВИЛА ВХОДА
+    # ===========================================================
+    def _decide(self, symbol, o, h, l, c, v, rsi, ema50, atr, vol_sma):
+        """
+        Применяет правила стратегии к последней свече рядов o/h/l/c/v
+        и готовым значениям индикаторов.
+        """
+        last_price = c[-1]
+
+        def reject(reason):
+            return self._no_signal(symbol, reason, rsi, ema50, atr, last_price, v[-1], vol_sma)
+
+        if rsi is None:
+            return reject("no_rsi")
+
+        if atr is None:
+            return reject("no_atr")
+
+        # Проверка волатильности
+        if self.min_atr_pct > 0:
+            atr_pct = (atr / last_price) * 100
+            if atr_pct < self.min_atr_pct:
+                return reject("low_atr")
+
+        # расширенный лог
+        decisions = self._indicator_log(rsi, ema50, atr, v[-1], vol_sma)
+
+        # ----------------------------
+        # проверяем позицию
+        # ----------------------------
+        if self.orders.has_open_position(symbol, use_cache=True):
+            return reject("position")
+
+        # =====================================================
+        #                   ЛОНГ (Buy)
+        # =====================================================
+        if self.enable_long and rsi < self.rsi_long:
+            # Проверка объёма
+            if vol_sma and v[-1] < vol_sma * self.min_vol_mult:
+                return reject("long_volume")
+
+            # Фильтр тренда по EMA50
+            if self.use_trend_filter and ema50 is not None:
+                if last_price < ema50:
+                    return reject("long_trend")
+
+            # Проверка паттерна Spring
+            if self.enable_patterns:
+                if not detect_spring(o[-1], h[-1], l[-1], c[-1]):
+                    return reject("long_pattern")
+
+            entry = last_price
+            tp = max(
+                entry + atr * self.tp_long_atr,
+                entry * (1 + self.min_tp_pct),
+            )
+            sl = min(
+                entry - atr * self.sl_long_atr,
+                entry * (1 - self.min_sl_pct),
+            )
 
-            return (
-                symbol,
-                None,
-                {
-                    "message": "Сигналов нет.",
-                    "indicators": decisions,
-                },
+            return self._signal_decision(
+                symbol, "long", rsi, ema50, last_price, entry, tp, sl, decisions
             )
 
-        except Exception as e:
-            return (
-                symbol,
-                None,
-                {"message": f"Ошибка: {e}", "indicators": decisions},
-            )
\ No newline at end of file
+        # =====================================================
+        #                   ШОРТ (Sell)
+        # =====================================================
+        if self.enable_short and rsi > self.rsi_short:
+            # Проверка объёма
+            if vol_sma and v[-1] < vol_sma * self.min_vol_mult:
+                return reject("short_volume")
+
+            # Фильтр тренда по EMA50
+            if self.use_trend_filter and ema50 is not None:
+                if last_price > ema50:
+                    return reject("short_trend")
+
+            # Проверка паттерна Upthrust
+            if self.enable_patterns:
+                if not detect_upthrust(o[-1], h[-1], l[-1], c[-1]):
+                    return reject("short_pattern")
+
+            entry = last_price
+            tp = min(
+                entry - atr * self.tp_short_atr,
+                entry * (1 - self.min_tp_pct),
+            )
+            sl = max(
+                entry + atr * self.sl_short_atr,
+                entry * (1 + self.min_sl_pct),
+            )
+
+            return self._signal_decision(
+                symbol, "short", rsi, ema50, last_price, entry, tp, sl, decisions
+            )
+
+        return reject("none")
+
+    def _no_signal(self, symbol, reason, rsi, ema50, atr, last_price, last_volume, vol_sma):
+        """Ответ без сигнала по коду причины reason (strategy.signals.REASONS)."""
+        decisions = []
+        if reason not in ("no_rsi", "no_atr", "low_atr"):
+            # расширенный лог — когда все индикаторы посчитаны
+            decisions = self._indicator_log(rsi, ema50, atr, last_volume, vol_sma)
+        side = "LONG" if reason.startswith("long") else "SHORT"
+
+        if reason == "no_rsi":
+            message = "Недостаточно данных для RSI"
+        elif reason == "no_atr":
+            message = "Недостаточно данных для ATR"
+        elif reason == "low_atr":
+            atr_pct = (atr / last_price) * 100
+            message = f"Волатильность слишком низкая ({atr_pct:.2f}% < {self.min_atr_pct}%)"
+        elif reason == "position":
+            message = "Позиция уже открыта"
+        elif reason in ("long_volume", "short_volume"):
+            message = (
+                f"{side} отклонён: объём слабый "
+                f"({last_volume:.2f} < {vol_sma * self.min_vol_mult:.2f})"
+            )
+        elif reason == "long_trend":
+            message = f"LONG отклонён: цена ниже EMA50 (нисходящий тренд). Цена: {last_price:.4f}, EMA50: {ema50:.4f}"
+        elif reason == "short_trend":
+            message = f"SHORT отклонён: цена выше EMA50 (восходящий тренд). Цена: {last_price:.4f}, EMA50: {ema50:.4f}"
+        elif reason == "long_pattern":
+            message = "LONG отклонён: нет паттерна Spring (ложный пробой вниз)"
+        elif reason == "short_pattern":
+            message = "SHORT отклонён: нет паттерна Upthrust (ложный пробой вверх)"
+        else:
+            message = "Сигналов нет."
+
+        return (
+            symbol,
+            None,
+            {
+                "message": message,
+                "indicators": decisions,
+            },
+        )
+
+    def _indicator_log(self, rsi, ema50, atr, last_volume, vol_sma):
+        decisions = []
+        decisions.append(f"RSI={rsi:.2f}")
+
+        if ema50 is not None:
+            decisions.append(f"EMA{self.ema_period}={ema50:.4f}")
+        else:
+            decisions.append(f"EMA{self.ema_period}=n/a")
+
+        decisions.append(f"ATR={atr:.6f}")
+
+        if vol_sma is not None:
+            decisions.append(f"Volume={last_volume:.2f}, SMA={vol_sma:.2f}")
+        else:
+            decisions.append(f"Volume={last_volume:.2f}, SMA=n/a")
+
+        return decisions
+
+    def _signal_decision(self, symbol, signal, rsi, ema50, last_price, entry, tp, sl, decisions):
+        if signal == "long":
+            pattern_info = ", Spring OK" if self.enable_patterns else ""
+            trend_info = f", цена выше EMA50 ({last_price:.4f} > {ema50:.4f})" if (self.use_trend_filter and ema50) else ""
+        else:
+            pattern_info = ", Upthrust OK" if self.enable_patterns else ""
+            trend_info = f", цена ниже EMA50 ({last_price:.4f} < {ema50:.4f})" if (self.use_trend_filter and ema50) else ""
+
+        return (
+            symbol,
+            signal,
+            {
+                "message": f"{signal.upper()} сигнал: RSI={rsi:.2f}{pattern_info}{trend_info}",
+                "entry": entry,
+                "tp": tp,
+                "sl": sl,
+                "indicators": decisions,
+            },
+        )
@@ -0,0 +1,27 @@
+# tests/test_backtest.py
+import json
+
+from backtest.engine import Backtester
+from config.bybit_config import BYBIT_CONFIG
+from exchange.mock_exchange import synthetic_candles
+
+
+def test_btc_priced_series_trades_with_instrument_steps(tmp_path):
+    rows = synthetic_candles(["BTCUSDT"], bars=3000, seed=7)["BTCUSDT"]
+    rows[1:5] *= 60_000 / rows[4, -1]
+
+    path = tmp_path / "instruments.json"
+    path.write_text(json.dumps({
+        "updated_at": 0,
+        "instruments": {
+            "BTCUSDT": {"tick_size": 0.1, "qty_step": 0.001, "min_qty": 0.001, "max_qty": 100, "min_notional": 5},
+        },
+    }))
+    settings = {**BYBIT_CONFIG, "candle_store": None, "instruments_file": str(path)}
+
+    result = Backtester(settings, balance=1000).run({"BTCUSDT": tuple(rows)})
+
+    assert result["summary"]["total_trades"] > 0
+    for trade in result["trades"]:
+        assert trade["qty"] >= 0.001
+        assert abs(trade["qty"] * 1000 - round(trade["qty"] * 1000)) < 1e-6
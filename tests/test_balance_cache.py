@@ -0,0 +1,79 @@
+# tests/test_balance_cache.py
+import types
+
+import pytest
+
+from orders import balance_cache
+from orders.balance_cache import BalanceCache
+
+
+class _Wallet:
+    def __init__(self, balance):
+        self.balance = balance
+        self.calls = 0
+        self.error = None
+
+    def get_wallet_balance(self, accountType):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return {"result": {"list": [{"coin": [{"coin": "USDT", "walletBalance": str(self.balance)}]}]}}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = types.SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(balance_cache, "time", types.SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def test_value_is_reused_until_ttl_expires(clock):
+    wallet = _Wallet(500)
+    cache = BalanceCache(wallet, ttl=60)
+    assert cache.get() == 500
+
+    wallet.balance = 700
+    clock.now += 59
+    assert cache.get() == 500
+    assert wallet.calls == 1
+
+    clock.now += 1
+    assert cache.get() == 700
+    assert wallet.calls == 2
+
+
+def test_last_known_value_survives_api_errors(clock):
+    wallet = _Wallet(500)
+    cache = BalanceCache(wallet, ttl=60)
+    wallet.error = RuntimeError("timeout")
+    # значения ещё не было — ошибка наружу
+    with pytest.raises(RuntimeError):
+        cache.get()
+
+    wallet.error = None
+    cache.get()
+    wallet.error = RuntimeError("timeout")
+    clock.now += 120
+    assert cache.get() == 500
+    assert cache.age == 120
+
+
+def test_invalidate_and_wallet_stream_update(clock):
+    wallet = _Wallet(500)
+    cache = BalanceCache(wallet, ttl=60)
+    cache.get()
+
+    # после сделки — новый запрос, даже если TTL не истёк
+    wallet.balance = 480
+    cache.invalidate()
+    assert cache.get() == 480
+    assert wallet.calls == 2
+
+    cache.invalidate()
+    cache.apply_wallet_update([
+        {"accountType": "UNIFIED", "coin": [{"coin": "BTC", "walletBalance": "1"},
+                                            {"coin": "USDT", "walletBalance": "455.5"}]},
+    ])
+    assert cache.is_fresh()
+    assert cache.get() == 455.5
+    assert wallet.calls == 2
@@ -0,0 +1,122 @@
+# tests/test_bar_schedule.py
+import types
+from datetime import datetime, timezone
+
+import pytest
+
+from utils import bar_schedule
+from utils.bar_schedule import _WEEK_OFFSET_MS, BarSchedule, next_bar_close
+
+_MINUTE = 60_000
+_WEEK = 7 * 86_400_000
+
+
+class _Clock:
+    """Часы биржи, time.monotonic и Event расписания сразу: wait() сдвигает время."""
+
+    def __init__(self, ms):
+        self.ms = ms
+
+    def now_ms(self):
+        return self.ms
+
+    def monotonic(self):
+        return self.ms / 1000
+
+    def is_set(self):
+        return False
+
+    def wait(self, seconds):
+        self.ms += seconds * 1000
+        return False
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock(1_000 * _MINUTE + 10_000)
+    monkeypatch.setattr(bar_schedule, "time", types.SimpleNamespace(
+        monotonic=clock.monotonic, time=lambda: clock.ms / 1000,
+    ))
+    return clock
+
+
+def _schedule(clock, interval="1", delay=0.05):
+    schedule = BarSchedule(interval, delay=delay, clock=clock)
+    schedule._stop = clock
+    return schedule
+
+
+def test_next_bar_close():
+    assert next_bar_close(10 * _MINUTE + 1, _MINUTE) == 11 * _MINUTE
+    # ровно на границе свеча только открылась — закроется через interval
+    assert next_bar_close(10 * _MINUTE, _MINUTE) == 11 * _MINUTE
+    assert next_bar_close(11 * _MINUTE - 1, _MINUTE) == 11 * _MINUTE
+
+
+def test_weekly_bars_close_on_monday():
+    monday = int(datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp() * 1000)
+    assert next_bar_close(monday, _WEEK, _WEEK_OFFSET_MS) == monday + _WEEK
+    assert next_bar_close(monday - 1, _WEEK, _WEEK_OFFSET_MS) == monday
+    thursday = monday + 3 * 86_400_000
+    assert next_bar_close(thursday, _WEEK, _WEEK_OFFSET_MS) == monday + _WEEK
+    # без смещения недели считались бы от четверга
+    assert next_bar_close(thursday, _WEEK) == thursday + _WEEK
+
+
+def test_sleep_time(clock):
+    schedule = _schedule(clock)
+    close_ms = schedule.next_close_ms()
+    assert schedule._sleep_time(close_ms) == pytest.approx(50.05)
+
+    clock.ms = close_ms + 49
+    assert schedule._sleep_time(close_ms) == pytest.approx(0.001)
+    clock.ms = close_ms + 50
+    assert schedule._sleep_time(close_ms) is None
+
+
+def test_sleep_until_task_before_close(clock):
+    schedule = _schedule(clock).every(20, lambda: None)
+    close_ms = schedule.next_close_ms()
+    assert schedule._sleep_time(close_ms) == pytest.approx(20)
+    # задача просрочена — не спим
+    clock.ms += 30_000
+    assert schedule._sleep_time(close_ms) == 0
+
+
+def test_tasks_run_between_bar_closes(clock):
+    calls = []
+    schedule = _schedule(clock)
+    schedule.every(20, lambda: calls.append(("positions", clock.ms)))
+    schedule.every(25, lambda: calls.append(("balance", clock.ms)))
+    schedule.every(0, lambda: calls.append(("disabled", clock.ms)))
+    start = clock.ms
+
+    close_ms = schedule.wait()
+
+    assert close_ms == 1_001 * _MINUTE
+    assert [(name, round(ms - start)) for name, ms in calls] == [
+        ("positions", 20_000), ("balance", 25_000), ("positions", 40_000), ("balance", 50_000),
+    ]
+    # проснулись через delay после закрытия
+    assert clock.ms == pytest.approx(close_ms + 50)
+
+    # следующая свеча: задачи продолжают свой период
+    calls.clear()
+    assert schedule.wait() == 1_002 * _MINUTE
+    assert [(name, round(ms - start)) for name, ms in calls] == [
+        ("positions", 60_000), ("balance", 75_000), ("positions", 80_000),
+        ("positions", 100_000), ("balance", 100_000),
+    ]
+
+
+def test_failing_task_does_not_stop_schedule(clock):
+    def broken():
+        raise RuntimeError("api down")
+
+    schedule = _schedule(clock).every(10, broken)
+    assert schedule.wait() == 1_001 * _MINUTE
+
+
+def test_unsupported_interval():
+    with pytest.raises(ValueError):
+        BarSchedule("M")
@@ -0,0 +1,100 @@
+# tests/test_batch_scan.py
+import numpy as np
+
+from config.bybit_config import BYBIT_CONFIG
+from exchange.mock_exchange import MockExchange, synthetic_candles
+from indicators.series import (
+    atr_last,
+    atr_series,
+    ema_last,
+    ema_series,
+    rsi_last,
+    rsi_series,
+    volume_sma_last,
+    volume_sma_series,
+)
+from orders.order_manager import OrderManager
+from strategy.strategy import Strategy
+
+
+def _strategy(candles, start_ms=None, **overrides):
+    exchange = MockExchange(candles, start_ms=start_ms)
+    settings = {
+        **BYBIT_CONFIG,
+        "coins": list(candles),
+        "candle_store": None,
+        "position_book": False,
+        "instruments_file": None,
+        **overrides,
+    }
+    return Strategy(exchange, OrderManager(exchange, settings), settings)
+
+
+def _assert_same_decisions(single, batch):
+    for expected, got in zip(single, batch):
+        assert got[0] == expected[0]
+        assert got[1] == expected[1], got[0]
+        assert got[2]["message"] == expected[2]["message"], got[0]
+        assert got[2]["indicators"] == expected[2]["indicators"], got[0]
+
+
+def test_batch_matches_per_symbol_with_mixed_history():
+    candles = synthetic_candles([f"COIN{i}USDT" for i in range(40)], bars=200, seed=11)
+    # свежий листинг: 30 свечей, и монета с историей средней длины
+    candles["COIN0USDT"] = candles["COIN0USDT"][:, -30:]
+    candles["COIN1USDT"] = candles["COIN1USDT"][:, -120:]
+    strategy = _strategy(candles)
+    symbols = list(candles)
+
+    single = [strategy.analyze_symbol(symbol) for symbol in symbols]
+    batch = strategy.analyze_batch(symbols, refresh=False)
+
+    _assert_same_decisions(single, batch)
+    # у монет с полной историей EMA50 считается (фильтр тренда не выключается)
+    assert all("EMA50=n/a" not in d[2]["indicators"] for d in batch[2:] if d[2]["indicators"])
+
+
+def test_batch_reasons_match_per_symbol():
+    candles = synthetic_candles([f"COIN{i}USDT" for i in range(60)], bars=300, seed=5)
+    # мягкие пороги — чтобы встретились все ветки отказа, а не только "Сигналов нет."
+    strategy = _strategy(candles, enable_patterns=True, rsi_buy=45, rsi_sell=55, min_atr_pct=0.2)
+    symbols = list(candles)
+    strategy.orders.position_cache["COIN3USDT"] = {"symbol": "COIN3USDT", "size": "1"}
+
+    single = [strategy.analyze_symbol(symbol) for symbol in symbols]
+    batch = strategy.analyze_batch(symbols, refresh=False)
+
+    _assert_same_decisions(single, batch)
+    assert batch[3][2]["message"] == "Позиция уже открыта"
+    assert len({d[2]["message"].split(" (")[0] for d in batch}) > 3
+
+
+def test_batch_matches_per_symbol_after_cache_slides():
+    candles = synthetic_candles([f"COIN{i}USDT" for i in range(20)], bars=600, seed=7)
+    start_ms = int(candles["COIN0USDT"][0, 299])
+    strategy = _strategy(candles, start_ms=start_ms, enable_patterns=True, rsi_buy=45, rsi_sell=55)
+    strategy.klines.clock = strategy.client.clock
+    symbols = list(candles)
+
+    # окно кэша (200 свечей) сдвигается: потоковые индикаторы помнят ушедшие свечи
+    for bars in (0, 1, 3, 50, 120):
+        strategy.client.step(bars)
+        single = [strategy.analyze_symbol(symbol) for symbol in symbols]
+        batch = strategy.analyze_batch(symbols, refresh=False)
+        _assert_same_decisions(single, batch)
+
+
+def test_last_values_match_series():
+    rng = np.random.default_rng(3)
+    c = 100 + np.cumsum(rng.normal(size=(4, 400)), axis=1)
+    h, l, v = c + rng.random(c.shape), c - rng.random(c.shape), rng.random(c.shape)
+
+    for n in (10, 15, 50, 400):
+        np.testing.assert_allclose(rsi_last(c[:, :n], 14), rsi_series(c[:, :n], 14)[:, -1], rtol=1e-10)
+        np.testing.assert_allclose(ema_last(c[:, :n], 50), ema_series(c[:, :n], 50)[:, -1], rtol=1e-10)
+        np.testing.assert_allclose(
+            atr_last(h[:, :n], l[:, :n], c[:, :n], 14), atr_series(h[:, :n], l[:, :n], c[:, :n], 14)[:, -1]
+        )
+        np.testing.assert_allclose(
+            volume_sma_last(v[:, :n], 20), volume_sma_series(v[:, :n], 20)[:, -1]
+        )
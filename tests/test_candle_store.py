@@ -0,0 +1,27 @@
+# tests/test_candle_store.py
+import numpy as np
+
+from config.bybit_config import data_dir
+from exchange.mock_exchange import synthetic_candles
+from storage.candle_store import CANDLE_DTYPE, CandleStore
+
+
+def test_append_truncates_torn_tail(tmp_path):
+    rows = synthetic_candles(["BTCUSDT"], bars=10, seed=1)["BTCUSDT"]
+    store = CandleStore(str(tmp_path))
+    store.append("BTCUSDT", "15", rows[:, :5])
+
+    # оборванная запись: половина свечи в конце файла
+    with open(store.path("BTCUSDT", "15"), "ab") as f:
+        f.write(b"\0" * (CANDLE_DTYPE.itemsize // 2))
+
+    fresh = CandleStore(str(tmp_path))
+    assert fresh.append("BTCUSDT", "15", rows[:, 5:]) == 5
+    data = fresh.read("BTCUSDT", "15")
+    np.testing.assert_array_equal(data["ts"], rows[0])
+    np.testing.assert_array_equal(data["close"], rows[4])
+
+
+def test_data_dir_per_environment():
+    assert data_dir("mainnet") != data_dir("testnet")
+    assert data_dir("mainnet", "http://127.0.0.1:8080") not in (data_dir("mainnet"), data_dir("testnet"))
@@ -0,0 +1,85 @@
+# tests/test_concurrency.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config.bybit_config import BYBIT_CONFIG
+from exchange.concurrency import HostLimiter, LimitedClient
+from exchange.mock_exchange import MockExchange, synthetic_candles
+from orders.order_manager import OrderManager
+from run_strategy import scan_symbol
+from strategy.strategy import Strategy
+
+
+class _InFlight:
+    """Прокси, считающий одновременные вызовы клиента."""
+
+    def __init__(self, client):
+        self._client = client
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            with self._lock:
+                self.active += 1
+                self.peak = max(self.peak, self.active)
+            try:
+                return attr(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.active -= 1
+
+        return call
+
+
+def _bot(client, symbols):
+    settings = {
+        **BYBIT_CONFIG,
+        "coins": symbols,
+        "candle_store": None,
+        "position_book": False,
+        "instruments_file": None,
+    }
+    orders = OrderManager(client, settings)
+    return orders, Strategy(client, orders, settings)
+
+
+def test_host_limiter_bounds_concurrency_per_host():
+    limiter = HostLimiter(max_per_host=3)
+    active = {"a": 0, "b": 0}
+    peak = {"a": 0, "b": 0}
+    lock = threading.Lock()
+
+    def work(host):
+        with limiter.slot(host):
+            with lock:
+                active[host] += 1
+                peak[host] = max(peak[host], active[host])
+            time.sleep(0.01)
+            with lock:
+                active[host] -= 1
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(work, ["a", "b"] * 20))
+
+    # у каждого хоста свой лимит
+    assert peak == {"a": 3, "b": 3}
+
+
+def test_threaded_scan_respects_host_limit():
+    symbols = [f"COIN{i}USDT" for i in range(10)]
+    exchange = _InFlight(MockExchange(synthetic_candles(symbols, bars=300), latency=0.005))
+    http = LimitedClient(exchange, HostLimiter(max_per_host=2))
+    orders, strategy = _bot(http, symbols)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        scans = list(pool.map(lambda s: scan_symbol(s, None, orders, strategy, http), symbols))
+
+    assert exchange.peak == 2
+    assert all(scan["decision"] is not None for scan in scans)
@@ -0,0 +1,72 @@
+# tests/test_indicators.py
+import numpy as np
+import pytest
+
+from indicators.indicators import calc_atr, calc_ema, calc_rsi, calc_volume_sma
+from indicators.streaming import IndicatorSet
+
+
+def _candles(bars, seed=0):
+    rng = np.random.default_rng(seed)
+    ts = np.arange(bars, dtype=float) * 60_000
+    c = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, bars)))
+    h = c * (1 + rng.random(bars) * 0.01)
+    l = c * (1 - rng.random(bars) * 0.01)
+    v = rng.uniform(100, 1000, bars)
+    return ts, h, l, c, v
+
+
+def _assert_matches_calc(indicators, h, l, c, v):
+    expected = (calc_rsi(c, 14), calc_ema(c, 50), calc_atr(h, l, c, 14), calc_volume_sma(v, 20))
+    got = (indicators.rsi, indicators.ema, indicators.atr, indicators.vol_sma)
+    for e, g in zip(expected, got):
+        if e is None:
+            assert g is None
+        else:
+            assert g == pytest.approx(e, rel=1e-9)
+
+
+def test_streaming_matches_calc_every_bar():
+    # больше _RESUM_EVERY обновлений — проверяется и пересчёт суммы окна
+    ts, h, l, c, v = _candles(2500)
+    indicators = IndicatorSet(14, 50, 14, 20)
+    for n in (1, 14, 15, 20, 50, 51, 1000, 1100, 2500):
+        indicators.sync(ts[:n], h[:n], l[:n], c[:n], v[:n])
+        _assert_matches_calc(indicators, h[:n], l[:n], c[:n], v[:n])
+
+
+def test_streaming_revises_forming_bar():
+    ts, h, l, c, v = _candles(300, seed=1)
+    indicators = IndicatorSet(14, 50, 14, 20)
+    indicators.sync(ts, h, l, c, v)
+
+    # формирующаяся свеча обновилась несколько раз, затем пришла новая
+    for k in range(3):
+        h, l, c, v = h.copy(), l.copy(), c.copy(), v.copy()
+        c[-1] *= 1.002
+        h[-1] = max(h[-1], c[-1])
+        v[-1] += 50
+        indicators.sync(ts, h, l, c, v)
+        _assert_matches_calc(indicators, h, l, c, v)
+
+    ts, h, l, c, v = (np.append(x, x[-1] + step) for x, step in zip((ts, h, l, c, v), (60_000, 1, 1, 1, 10)))
+    indicators.sync(ts, h, l, c, v)
+    _assert_matches_calc(indicators, h, l, c, v)
+
+
+def test_streaming_matches_calc_on_sliding_window():
+    # кэш держит последние 200 свечей: старые уходят из окна
+    ts, h, l, c, v = _candles(1500, seed=2)
+    indicators = IndicatorSet(14, 50, 14, 20)
+    for end in (200, 201, 205, 400, 1300, 1500):
+        window = slice(end - 200, end)
+        indicators.sync(ts[window], h[window], l[window], c[window], v[window])
+        _assert_matches_calc(indicators, h[window], l[window], c[window], v[window])
+
+    # формирующаяся свеча сдвинутого окна и окно, ставшее длиннее
+    c = c.copy()
+    c[-1] *= 1.003
+    indicators.sync(ts[-200:], h[-200:], l[-200:], c[-200:], v[-200:])
+    _assert_matches_calc(indicators, h[-200:], l[-200:], c[-200:], v[-200:])
+    indicators.sync(ts[-300:], h[-300:], l[-300:], c[-300:], v[-300:])
+    _assert_matches_calc(indicators, h[-300:], l[-300:], c[-300:], v[-300:])
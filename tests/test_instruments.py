@@ -0,0 +1,71 @@
+# tests/test_instruments.py
+import json
+
+import pytest
+
+from config.bybit_config import BYBIT_CONFIG
+from exchange.instruments import Instrument
+from orders.order_manager import OrderManager
+
+
+def _btc():
+    return Instrument("BTCUSDT", tick_size="0.1", qty_step="0.001", min_qty="0.001", max_qty="1.5", min_notional="5")
+
+
+def test_qty_and_price_quantization():
+    inst = _btc()
+    assert inst.floor_qty(0.0029999) == 0.002
+    assert inst.floor_qty(0.043) == 0.043  # 0.043 / 0.001 во float чуть меньше 43
+    assert inst.ceil_qty(0.0021) == 0.003
+    assert inst.ceil_qty(0.003) == 0.003
+    assert inst.round_price(60_000.04) == 60_000.0
+    assert inst.round_price(60_000.06) == 60_000.1
+    assert inst.format_qty(0.1 + 0.2) == "0.300"
+    assert inst.format_price(0.1 + 0.2) == "0.3"
+
+
+def test_instrument_from_info_prefers_market_max():
+    inst = Instrument.from_info({
+        "symbol": "ETHUSDT",
+        "priceFilter": {"tickSize": "0.01"},
+        "lotSizeFilter": {"qtyStep": "0.01", "minOrderQty": "0.01", "maxOrderQty": "7000",
+                          "maxMktOrderQty": "500", "minNotionalValue": "5"},
+    })
+    assert (inst.tick_size, inst.qty_step, inst.min_qty, inst.max_qty, inst.min_notional) == (
+        0.01, 0.01, 0.01, 500.0, 5.0
+    )
+
+
+@pytest.fixture
+def orders(tmp_path):
+    path = tmp_path / "instruments.json"
+    path.write_text(json.dumps({"updated_at": 0, "instruments": {"BTCUSDT": _btc().to_dict()}}))
+    manager = OrderManager(None, {**BYBIT_CONFIG, "position_book": False, "instruments_file": str(path)})
+    manager.balance.set(1000)
+    return manager
+
+
+def test_calc_qty_floors_to_step(orders):
+    # риск 2% от 1000 = 20 USDT, стоп 1000 USDT -> 0.02, лимит 10% баланса -> 0.0016
+    assert orders.calc_qty(60_000, 59_000, "BTCUSDT") == 0.001
+    # стоп шире: 20 / 15000 = 0.00133 -> 0.001
+    assert orders.calc_qty(60_000, 45_000, "BTCUSDT") == 0.001
+
+
+def test_quantize_qty_limits(orders):
+    inst = _btc()
+    # меньше минимального объёма
+    assert orders._quantize_qty(inst, 0.0004, 60_000, 1000) == 0
+    # сумма ниже min_notional -> объём поднимается до минимальной суммы по шагу вверх
+    assert orders._quantize_qty(inst, 0.001, 4_000, 1000) == 0.002
+    # лимит позиции: 10% от 100 000 = 10 000 USDT -> 0.166
+    assert orders._quantize_qty(inst, 1.0, 60_000, 100_000) == 0.166
+    # max_qty инструмента
+    assert orders._quantize_qty(inst, 3.0, 60_000, 10_000_000) == 1.5
+    # лимит позиции меньше минимального объёма
+    assert orders._quantize_qty(inst, 0.01, 60_000, 100) == 0
+
+
+def test_calc_qty_without_rules_uses_whole_contracts(orders):
+    assert orders.calc_qty(60_000, 59_000, "ETHUSDT") == 0
+    assert orders.calc_qty(2.0, 1.9, "ETHUSDT") == 50.0
@@ -0,0 +1,83 @@
+# tests/test_kline_cache.py
+import numpy as np
+
+from exchange.kline_cache import KlineCache
+
+_MINUTE = 60_000
+
+
+class _Exchange:
+    """get_kline по заранее заданным свечам: видны первые visible, время — по открытию последней."""
+
+    def __init__(self, bars):
+        rng = np.random.default_rng(0)
+        close = 100 + np.cumsum(rng.normal(size=bars))
+        ts = np.arange(bars, dtype=float) * _MINUTE
+        self.rows = np.array([ts, close, close + 1, close - 1, close, rng.uniform(1, 10, bars)])
+        self.visible = 0
+        self.limits = []
+
+    def get_kline(self, category, symbol, interval, limit, **_):
+        self.limits.append(limit)
+        rows = self.rows[:, :self.visible][:, -limit:]
+        # Bybit: от новых к старым, строками
+        return {"retCode": 0, "result": {"list": [[str(x) for x in row] for row in rows.T[::-1]]}}
+
+    def now_ms(self):
+        return int(self.rows[0, self.visible - 1]) + _MINUTE // 2
+
+
+def test_incremental_merge_fetches_only_new_bars():
+    exchange = _Exchange(200)
+    cache = KlineCache(exchange, history=50, clock=exchange)
+    exchange.visible = 100
+    cache.update("BTCUSDT", "1")
+
+    exchange.visible = 103
+    ts, _, _, _, close, _ = cache.update("BTCUSDT", "1")
+
+    # последняя известная + 3 новых + запас
+    assert exchange.limits == [50, 5]
+    np.testing.assert_array_equal(ts, exchange.rows[0, 53:103])
+    np.testing.assert_array_equal(close, exchange.rows[4, 53:103])
+
+
+def test_forming_bar_is_overwritten():
+    exchange = _Exchange(100)
+    cache = KlineCache(exchange, history=50, clock=exchange)
+    exchange.visible = 80
+    cache.update("BTCUSDT", "1")
+
+    exchange.rows[4, 79] += 5
+    ts, _, _, _, close, _ = cache.update("BTCUSDT", "1")
+
+    assert len(ts) == 50
+    assert ts[-1] == exchange.rows[0, 79]
+    assert close[-1] == exchange.rows[4, 79]
+
+
+def test_gap_reloads_full_history():
+    exchange = _Exchange(200)
+    # часы отстают: кэш думает, что отстал на одну свечу, а прошло десять
+    clock = type("Clock", (), {"now_ms": lambda self: int(exchange.rows[0, 60]) + _MINUTE // 2})()
+    cache = KlineCache(exchange, history=50, clock=clock)
+    exchange.visible = 60
+    cache.update("BTCUSDT", "1")
+
+    exchange.visible = 70
+    ts, *_ = cache.update("BTCUSDT", "1")
+
+    assert exchange.limits == [50, 3, 50]
+    np.testing.assert_array_equal(ts, exchange.rows[0, 20:70])
+
+
+def test_request_limit_uses_clock():
+    exchange = _Exchange(100)
+    exchange.visible = 60
+    cache = KlineCache(exchange, history=50, clock=exchange)
+    cache.update("BTCUSDT", "1")
+
+    # часы биржи ушли на 5 свечей вперёд — локальные часы роли не играют
+    exchange.visible = 65
+    cache.update("BTCUSDT", "1")
+    assert exchange.limits[-1] == 7
@@ -0,0 +1,75 @@
+# tests/test_market_stream.py
+import threading
+import time
+
+import numpy as np
+
+from exchange.kline_cache import TS, KlineCache
+from exchange.market_stream import MarketDataStream
+from exchange.mock_exchange import MockExchange, synthetic_candles
+from exchange.mock_ws import MockWsServer
+
+_SYMBOLS = ["BTCUSDT", "ETHUSDT"]
+
+
+class _Rest:
+    """REST-клиент для KlineCache: запоминает, из какого потока шли запросы."""
+
+    def __init__(self, exchange):
+        self.exchange = exchange
+        self.threads = []
+
+    def get_kline(self, **kwargs):
+        self.threads.append(threading.current_thread().name)
+        return self.exchange.get_kline(**kwargs)
+
+
+def _wait(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "не дождались"
+        time.sleep(0.02)
+
+
+def _synced(klines, exchange, symbol):
+    return klines.last_timestamp(symbol, "15") == exchange.visible(symbol)[TS, -1]
+
+
+def test_stream_merges_bars_and_backfills_gaps_off_the_ws_thread():
+    candles = synthetic_candles(_SYMBOLS, bars=400)
+    exchange = MockExchange(candles, start_ms=int(candles["BTCUSDT"][TS, 300]))
+    rest = _Rest(exchange)
+    klines = KlineCache(rest, history=50, clock=exchange.clock)
+    server = MockWsServer(exchange, tick=0.05).start()
+    stream = MarketDataStream(klines, _SYMBOLS, "15", server.public_url, reconnect_delay=0.1)
+    stream.start()
+    try:
+        # после подключения история догружается через REST
+        _wait(lambda: all(_synced(klines, exchange, s) and stream.is_live(s) for s in _SYMBOLS))
+        calls = len(rest.threads)
+
+        # закрытие свечи приходит по WebSocket и вливается без REST
+        stream.wait_for_updates(0)
+        exchange.step(1)
+        closed = set()
+        _wait(lambda: closed.update(stream.wait_for_updates(0.1)) or closed == set(_SYMBOLS))
+        assert all(_synced(klines, exchange, s) for s in _SYMBOLS)
+        np.testing.assert_allclose(
+            klines.ohlcv("BTCUSDT", "15")[4], exchange.visible("BTCUSDT")[4, -50:], rtol=1e-8
+        )
+        assert len(rest.threads) == calls
+
+        # свеча через разрыв: обработчик не ждёт REST, событие — после догрузки
+        stream.wait_for_updates(0)
+        far = int(exchange.visible("BTCUSDT")[TS, -1]) + 10 * exchange.interval_ms
+        bar = {"start": far, "open": "1", "high": "1", "low": "1", "close": "1", "volume": "1",
+               "confirm": True}
+        stream.on_data({"topic": "kline.15.BTCUSDT", "data": [bar]})
+        assert "BTCUSDT" in stream.wait_for_updates(5)
+        assert _synced(klines, exchange, "BTCUSDT")
+        assert len(rest.threads) > calls
+        assert all(name.endswith("-backfill") for name in rest.threads)
+    finally:
+        # сервер закрывает соединение сам — клиенту не нужно ждать ответа на close
+        server.stop()
+        stream.stop()
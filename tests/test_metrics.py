@@ -0,0 +1,65 @@
+# tests/test_metrics.py
+from urllib.request import urlopen
+
+import pytest
+
+from utils.metrics import InstrumentedClient, Metrics, MetricsServer
+
+
+class _Client:
+    endpoint = "https://api-testnet.bybit.com"
+
+    def get_kline(self, **_):
+        return {"retCode": 0}
+
+    def place_order(self, **_):
+        raise TimeoutError("read timeout")
+
+
+def test_render_prometheus_text_with_cumulative_buckets():
+    metrics = Metrics(buckets=(0.01, 0.1, 1.0))
+    for seconds in (0.005, 0.01, 0.05, 0.5, 3.0):
+        metrics.observe("scan_seconds", seconds, symbol="BTCUSDT")
+    metrics.inc("signals_total", side="Buy")
+    metrics.inc("signals_total", 2, side="Buy")
+
+    assert metrics.render().splitlines() == [
+        "# TYPE signals_total counter",
+        'signals_total{side="Buy"} 3',
+        "# TYPE scan_seconds histogram",
+        # граница включается в корзину (le — «меньше или равно»)
+        'scan_seconds_bucket{symbol="BTCUSDT",le="0.01"} 2',
+        'scan_seconds_bucket{symbol="BTCUSDT",le="0.1"} 3',
+        'scan_seconds_bucket{symbol="BTCUSDT",le="1.0"} 4',
+        'scan_seconds_bucket{symbol="BTCUSDT",le="+Inf"} 5',
+        'scan_seconds_sum{symbol="BTCUSDT"} 3.565000',
+        'scan_seconds_count{symbol="BTCUSDT"} 5',
+    ]
+
+
+def test_instrumented_client_times_calls_and_counts_errors():
+    metrics = Metrics()
+    client = InstrumentedClient(_Client(), metrics)
+
+    assert client.get_kline(symbol="BTCUSDT") == {"retCode": 0}
+    with pytest.raises(TimeoutError):
+        client.place_order(symbol="BTCUSDT")
+    assert client.endpoint == _Client.endpoint
+
+    text = metrics.render()
+    assert 'bybit_request_seconds_count{endpoint="get_kline"} 1' in text
+    assert 'bybit_request_seconds_count{endpoint="place_order"} 1' in text
+    assert 'bybit_request_errors_total{endpoint="place_order",error="TimeoutError"} 1' in text
+
+
+def test_metrics_server_serves_render():
+    metrics = Metrics()
+    metrics.inc("cycles_total")
+    server = MetricsServer(metrics, port=0).start()
+    try:
+        host, port = server.server.server_address[:2]
+        with urlopen(f"http://{host}:{port}/metrics", timeout=5) as resp:
+            assert resp.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert resp.read().decode() == metrics.render()
+    finally:
+        server.stop()
@@ -0,0 +1,44 @@
+# tests/test_notifier.py
+import html
+
+from utils.notifier import MAX_MESSAGE_LENGTH, TelegramNotifier, _coalesce, _truncate
+
+
+def test_coalesce_fills_one_message_up_to_limit():
+    messages = ["a" * 2000, "b" * 2000, "c" * 100]
+    batch, rest = _coalesce(messages)
+    # два сообщения и разделитель "\n\n" помещаются, третье — уже нет
+    assert batch == messages[:2]
+    assert rest == messages[2:]
+    assert len("\n\n".join(batch)) <= MAX_MESSAGE_LENGTH
+
+    assert _coalesce(["x"]) == (["x"], [])
+
+
+def test_truncate_does_not_split_html_entities():
+    text = html.escape("a" * (MAX_MESSAGE_LENGTH - 2) + "<b>", quote=False)
+    truncated = _truncate(text)
+    # "&lt;" не поместился целиком — отрезан, а не оставлен как "&l"
+    assert truncated == "a" * (MAX_MESSAGE_LENGTH - 2)
+
+    whole = "a" * (MAX_MESSAGE_LENGTH - 4) + "&lt;" + "b" * 10
+    assert _truncate(whole) == whole[:MAX_MESSAGE_LENGTH]
+    assert _truncate("short &amp; sweet") == "short &amp; sweet"
+
+
+def test_rejected_batch_is_resent_one_by_one():
+    notifier = TelegramNotifier("token", "chat", min_interval=0)
+    sent = []
+
+    def post(text):
+        sent.append(text)
+        # Telegram отклоняет пачку целиком из-за одного сообщения
+        return ("400", None) if "bad" in text else ("ok", None)
+
+    notifier._post = post
+    notifier._deliver(["first", "bad", "third"])
+    assert sent == ["first\n\nbad\n\nthird", "first", "bad", "third"]
+
+    sent.clear()
+    notifier._deliver(["only bad"])
+    assert sent == ["only bad"]
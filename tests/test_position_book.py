@@ -0,0 +1,50 @@
+# tests/test_position_book.py
+from orders.position_book import _MAX_PAGES, PositionBook
+
+
+def _page(cursor, symbols):
+    return {
+        "retCode": 0,
+        "result": {"list": [{"symbol": s, "size": "1"} for s in symbols], "nextPageCursor": cursor},
+    }
+
+
+class _Client:
+    """get_positions отдаёт страницы по очереди, последнюю — бесконечно."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.calls = 0
+
+    def get_positions(self, **params):
+        page = self.pages[min(self.calls, len(self.pages) - 1)]
+        self.calls += 1
+        return page
+
+
+def test_next_cursor_stops_on_last_page():
+    book = PositionBook(None)
+    assert book.next_cursor([_page("a", ["BTCUSDT"])]) == "a"
+    assert book.next_cursor([_page("a", ["BTCUSDT"]), _page("", ["ETHUSDT"])]) is None
+
+
+def test_next_cursor_stops_on_repeated_cursor_and_empty_page():
+    book = PositionBook(None)
+    assert book.next_cursor([_page("a", ["BTCUSDT"]), _page("a", ["ETHUSDT"])]) is None
+    assert book.next_cursor([_page("a", ["BTCUSDT"]), _page("b", [])]) is None
+
+
+def test_refresh_terminates_on_endless_cursors():
+    client = _Client([_page(f"c{i}", [f"COIN{i}USDT"]) for i in range(_MAX_PAGES + 10)])
+    book = PositionBook(client)
+    book.refresh()
+    assert client.calls == _MAX_PAGES
+    assert book.get("COIN0USDT") is not None
+
+
+def test_refresh_terminates_when_cursor_loops():
+    client = _Client([_page("a", ["BTCUSDT"]), _page("b", ["ETHUSDT"]), _page("a", ["SOLUSDT"])])
+    book = PositionBook(client)
+    book.refresh()
+    assert client.calls == 3
+    assert {book.get(s)["symbol"] for s in ("BTCUSDT", "ETHUSDT", "SOLUSDT")} == {"BTCUSDT", "ETHUSDT", "SOLUSDT"}
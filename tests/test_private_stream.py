@@ -0,0 +1,48 @@
+# tests/test_private_stream.py
+import pytest
+
+from config.bybit_config import BYBIT_CONFIG
+from exchange.private_stream import PrivateStream
+from orders.order_manager import OrderManager
+
+
+class _Clock:
+    def now_ms(self):
+        return 1_700_000_000_000
+
+
+def _stream():
+    orders = OrderManager(None, {**BYBIT_CONFIG, "position_book": False, "instruments_file": None})
+    orders.position_cache["BTCUSDT"] = {"symbol": "BTCUSDT", "side": "Buy", "size": "0.3"}
+    return PrivateStream("key", "secret", orders, url="ws://unused", clock=_Clock())
+
+
+def _execution(price, closed, fee=0.1):
+    return {
+        "symbol": "BTCUSDT", "side": "Sell", "execType": "Trade", "execPrice": str(price),
+        "execQty": str(closed), "execFee": str(fee), "closedSize": str(closed),
+    }
+
+
+def test_close_waits_for_all_closing_executions():
+    stream = _stream()
+    stream._on_execution(_execution(100, 0.1))
+    stream._on_position({"symbol": "BTCUSDT", "size": "0"})
+    assert stream.closes.empty()
+
+    stream._on_execution(_execution(103, 0.2))
+    symbol, exit_price, fee, position = stream.closes.get_nowait()
+    assert symbol == "BTCUSDT"
+    assert exit_price == pytest.approx((100 * 0.1 + 103 * 0.2) / 0.3)
+    assert fee == pytest.approx(0.2)
+    assert position["size"] == "0.3"
+    # ничего не осталось для следующей сделки по монете
+    assert "BTCUSDT" not in stream._fills
+
+
+def test_auth_expires_from_server_clock():
+    stream = _stream()
+    sent = []
+    stream.send = sent.append
+    stream.on_connect()
+    assert sent[0]["args"][1] == 1_700_000_000_000 + 10_000
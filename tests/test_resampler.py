@@ -0,0 +1,28 @@
+# tests/test_resampler.py
+import numpy as np
+
+from exchange.kline_cache import TS, parse_klines
+from exchange.mock_exchange import MockExchange, synthetic_candles
+from exchange.resampler import Resampler
+
+
+def test_resampled_timeframes_match_exchange_candles():
+    candles = synthetic_candles(["BTCUSDT", "ETHUSDT"], interval="1", bars=3000, seed=4)
+    # часы посреди часовой свечи: последние корзины 15m и 1h неполные
+    start = int(candles["BTCUSDT"][TS, 2017])
+    exchange = MockExchange(candles, interval="1", start_ms=start)
+    resampler = Resampler(exchange, base="1", timeframes=("15", "60"), history=50)
+    resampler.feed.clock = exchange.clock
+
+    # сдвиги внутри свечи, через границу 15m и через границу часа
+    for bars in (0, 1, 7, 13, 45, 61, 200):
+        exchange.step(bars)
+        for symbol in candles:
+            resampler.update(symbol)
+            for timeframe in ("15", "60"):
+                resp = exchange.get_kline(symbol=symbol, interval=timeframe, limit=50)
+                expected = parse_klines(resp["result"]["list"])
+                got = np.array(resampler.ohlcv(symbol, timeframe))
+                assert got.shape == expected.shape, (bars, symbol, timeframe)
+                np.testing.assert_array_equal(got[TS], expected[TS])
+                np.testing.assert_allclose(got, expected, rtol=1e-8)
@@ -0,0 +1,58 @@
+# tests/test_run_strategy_async.py
+import asyncio
+import time
+
+from config.bybit_config import BYBIT_CONFIG
+from exchange.mock_exchange import MockExchange, synthetic_candles
+from orders.order_manager import OrderManager
+from run_strategy_async import scan_symbols_async
+from strategy.strategy import Strategy
+
+
+class _AsyncExchange:
+    """Асинхронный клиент поверх MockExchange; свечи монет из hang не приходят никогда."""
+
+    def __init__(self, exchange, hang=()):
+        self.exchange = exchange
+        self.hang = set(hang)
+        self.cancelled = []
+
+    async def get_kline(self, **kwargs):
+        if kwargs["symbol"] in self.hang:
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                self.cancelled.append(kwargs["symbol"])
+                raise
+        return self.exchange.get_kline(**kwargs)
+
+    async def get_positions(self, **kwargs):
+        return self.exchange.get_positions(**kwargs)
+
+
+def _bot(client, symbols):
+    settings = {
+        **BYBIT_CONFIG,
+        "coins": symbols,
+        "candle_store": None,
+        "position_book": False,
+        "instruments_file": None,
+    }
+    orders = OrderManager(client, settings)
+    return orders, Strategy(client, orders, settings)
+
+
+def test_async_scan_cancels_symbol_after_timeout():
+    symbols = [f"COIN{i}USDT" for i in range(5)]
+    exchange = MockExchange(synthetic_candles(symbols, bars=300))
+    aclient = _AsyncExchange(exchange, hang={"COIN2USDT"})
+    orders, strategy = _bot(exchange, symbols)
+
+    started = time.monotonic()
+    scans = asyncio.run(scan_symbols_async(symbols, {}, orders, strategy, aclient, False, 0.2))
+
+    # зависшая монета не задерживает остальные и отменяется
+    assert time.monotonic() - started < 5
+    assert isinstance(scans[2], asyncio.TimeoutError)
+    assert aclient.cancelled == ["COIN2USDT"]
+    assert all(scans[i]["decision"] is not None for i in (0, 1, 3, 4))
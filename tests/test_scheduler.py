@@ -0,0 +1,82 @@
+# tests/test_scheduler.py
+import types
+
+import pytest
+
+from exchange import scheduler as scheduler_module
+from exchange.scheduler import RequestScheduler, TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = types.SimpleNamespace(now=100.0, wall=1_700_000_000.0)
+    monkeypatch.setattr(scheduler_module, "time", types.SimpleNamespace(
+        monotonic=lambda: clock.now, time=lambda: clock.wall, sleep=None,
+    ))
+    return clock
+
+
+def _drain(scheduler, group):
+    taken = 0
+    while scheduler._take(group) == 0:
+        taken += 1
+    return taken
+
+
+def test_token_bucket_refills_up_to_capacity(clock):
+    bucket = TokenBucket(rate=10, capacity=5)
+    bucket.tokens = 0
+    assert bucket.wait_time(clock.now) == pytest.approx(0.1)
+
+    bucket.refill(clock.now + 0.25)
+    assert bucket.tokens == pytest.approx(2.5)
+    # с резервом ждать дольше: нужен токен сверх reserve
+    assert bucket.wait_time(clock.now + 0.25, reserve=2) == pytest.approx(0.05)
+
+    bucket.refill(clock.now + 60)
+    assert bucket.tokens == 5
+    bucket.blocked_until = clock.now + 61
+    assert bucket.wait_time(clock.now + 60) == pytest.approx(1)
+
+
+def test_reserve_keeps_total_quota_for_orders(clock):
+    scheduler = RequestScheduler(limits={"order": 100, "position": 100, "market": 100}, total=10, reserve=0.2)
+
+    # market недоступны последние 2 токена, позициям — 1, ордерам — ни одного
+    assert _drain(scheduler, "market") == 8
+    assert _drain(scheduler, "position") == 1
+    assert _drain(scheduler, "order") == 1
+
+    clock.now += 0.11
+    assert scheduler._take("market") > 0
+    assert scheduler._take("order") == 0
+
+
+def test_group_bucket_limits_before_total(clock):
+    scheduler = RequestScheduler(limits={"order": 2}, total=100)
+    assert _drain(scheduler, "order") == 2
+    assert scheduler._take("order") == pytest.approx(0.5)
+    assert scheduler._take("market") == 0
+
+
+def test_limit_headers_shrink_and_block_group(clock):
+    scheduler = RequestScheduler(limits={"position": 50}, total=0)
+    bucket = scheduler.buckets["position"]
+
+    scheduler.update_from_headers("position", {"X-Bapi-Limit-Status": "3"})
+    assert bucket.tokens == 3
+
+    # квота исчерпана — ждём до сброса из заголовка
+    reset_ms = (clock.wall + 2) * 1000
+    scheduler.update_from_headers(
+        "position", {"X-Bapi-Limit-Status": "0", "X-Bapi-Limit-Reset-Timestamp": str(reset_ms)}
+    )
+    assert scheduler._take("position") == pytest.approx(2)
+    clock.now += 2.05
+    assert scheduler._take("position") == 0
+
+    # без заголовков и с мусором — ничего не меняется
+    tokens = bucket.tokens
+    scheduler.update_from_headers("position", {})
+    scheduler.update_from_headers("position", {"X-Bapi-Limit-Status": "n/a"})
+    assert bucket.tokens == tokens
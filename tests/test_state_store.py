@@ -0,0 +1,17 @@
+# tests/test_state_store.py
+from storage.state_store import StateStore
+
+
+def test_failing_write_keeps_the_rest_of_the_batch(tmp_path):
+    path = str(tmp_path / "state.sqlite")
+    store = StateStore(path)
+    store.record_signal("ETHUSDT", "long", {"entry": 1.0})
+    store._execute("INSERT INTO no_such_table VALUES (?)", (1,))
+    store.open_position("BTCUSDT", "long", 0.01, 60_000.0, 61_000.0, 59_000.0, status="open")
+
+    assert store.flush(timeout=2)
+    assert [row["symbol"] for row in store.history("signals")] == ["ETHUSDT"]
+    store.close()
+
+    # тёплый старт видит открытую позицию
+    assert StateStore(path).open_positions()["BTCUSDT"]["direction"] == "long"
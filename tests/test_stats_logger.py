@@ -0,0 +1,131 @@
+# tests/test_stats_logger.py
+import csv
+import json
+from datetime import date, timedelta
+
+import pytest
+
+from utils.stats_logger import HEADER, StatsLogger, TradeTotals, _csv_line
+
+
+def _log_round_trip(stats, symbol, pnl):
+    stats.log_trade(symbol, "buy", 100.0, 110.0, 95.0)
+    stats.log_trade(symbol, "buy", 100.0, 110.0, 95.0, exit_price=100.0 + pnl, pnl=pnl, roi=pnl, fee=0.1)
+
+
+def _rows(path):
+    with open(path, encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+def test_trade_totals_summary():
+    totals = TradeTotals()
+    for result, pnl in (("Открыта", None), ("Прибыль", 3.0), ("Убыток", -1.0), ("Прибыль", 1.0),
+                        ("Закрыта", None)):
+        totals.add(result, pnl)
+
+    summary = totals.summary()
+    assert summary["total_trades"] == 5
+    assert summary["open_trades"] == 1
+    assert summary["closed_trades"] == 3
+    assert summary["win_rate"] == pytest.approx(200 / 3)
+    assert summary["avg_win"] == 2.0
+    assert summary["profit_factor"] == 4.0
+    assert TradeTotals().summary() is None
+
+
+def test_rotation_by_size_keeps_every_trade(tmp_path):
+    path = tmp_path / "stats.csv"
+    stats = StatsLogger(str(path), max_bytes=400)
+    for i in range(6):
+        _log_round_trip(stats, f"COIN{i}USDT", 1.0 if i % 2 else -1.0)
+    stats.close()
+
+    archived = sorted(tmp_path.glob("stats.*-*.csv"))
+    assert len(archived) >= 2
+    # у каждого файла свой заголовок
+    assert all(_rows(p)[0] == HEADER for p in archived + [path])
+
+    stats = StatsLogger(str(path), max_bytes=400)
+    assert len(stats.trades()) == 12
+    assert [t["Символ"] for t in stats.trades(symbol="COIN3USDT")] == ["COIN3USDT"] * 2
+    assert stats.get_summary()["closed_trades"] == 6
+    stats.close()
+
+
+def test_rotation_by_day(tmp_path):
+    path = tmp_path / "stats.csv"
+    stats = StatsLogger(str(path), rotate_daily=True)
+    _log_round_trip(stats, "BTCUSDT", 2.0)
+    stats._opened_day = date.today() - timedelta(days=1)
+    _log_round_trip(stats, "BTCUSDT", 2.0)
+    stats.close()
+
+    assert len(list(tmp_path.glob("stats.*-*.csv"))) == 1
+    assert len(_rows(path)) == 3
+
+
+def test_totals_resume_from_summary_offset(tmp_path):
+    path = tmp_path / "stats.csv"
+    stats = StatsLogger(str(path))
+    _log_round_trip(stats, "BTCUSDT", 2.0)
+    stats.close()
+
+    # итоги на смещении — подложные: если файл перечитан целиком, их не будет видно
+    summary_path = tmp_path / "stats.summary.json"
+    saved = json.loads(summary_path.read_text())
+    saved["totals"]["total_trades"] = 100
+    summary_path.write_text(json.dumps(saved))
+    # строка, дописанная после последнего сохранения итогов
+    with open(path, "a", encoding="utf-8", newline="") as f:
+        f.write(_csv_line(["2024-01-01 00:00:00", "ETHUSDT", "SELL", "1", "1", "1", "1", "-0.5000", "-1.00",
+                           "Убыток", "0.0100"]))
+
+    stats = StatsLogger(str(path))
+    summary = stats.get_summary()
+    assert summary["total_trades"] == 101
+    assert summary["losses"] == 1
+    stats.close()
+
+
+def test_old_csv_without_fee_column(tmp_path):
+    path = tmp_path / "stats.csv"
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(_csv_line(HEADER[:-1]))
+        f.write(_csv_line(["2024-01-01 00:00:00", "BTCUSDT", "BUY", "1", "2", "0.5", "1.5", "0.5000", "50.00",
+                           "Прибыль"]))
+
+    stats = StatsLogger(str(path))
+    _log_round_trip(stats, "ETHUSDT", -1.0)
+    stats.close()
+
+    # старый файл — в архиве, новый — с колонкой комиссии
+    assert len(list(tmp_path.glob("stats.*-*.csv"))) == 1
+    rows = _rows(path)
+    assert rows[0][-1] == "Комиссия (USDT)"
+    assert rows[-1][-1] == "0.1000"
+
+    stats = StatsLogger(str(path))
+    summary = stats.get_summary()
+    assert summary["closed_trades"] == 2
+    assert summary["total_pnl"] == pytest.approx(-0.5)
+    stats.close()
+
+
+def test_sqlite_backend(tmp_path):
+    path = tmp_path / "stats.csv"
+    stats = StatsLogger(str(path), backend="sqlite")
+    _log_round_trip(stats, "BTCUSDT", 2.0)
+    _log_round_trip(stats, "ETHUSDT", -1.0)
+    stats.close()
+
+    stats = StatsLogger(str(path), backend="sqlite")
+    assert (tmp_path / "stats.sqlite").exists()
+    assert not path.exists()
+    summary = stats.get_summary()
+    assert (summary["total_trades"], summary["open_trades"], summary["wins"], summary["losses"]) == (4, 2, 1, 1)
+    trades = stats.trades(symbol="ETHUSDT")
+    assert [t["Результат"] for t in trades] == ["Открыта", "Убыток"]
+    assert trades[-1]["PnL (USDT)"] == "-1.0000"
+    assert trades[-1]["Комиссия (USDT)"] == "0.1000"
+    stats.close()
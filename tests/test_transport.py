@@ -0,0 +1,161 @@
+# tests/test_transport.py
+import time
+import types
+
+import pytest
+import requests
+from pybit.exceptions import FailedRequestError, InvalidRequestError
+
+from exchange import transport
+from exchange.transport import BybitHTTP, CircuitBreaker, CircuitOpenError, ServerClock
+
+_KLINE = "https://api-testnet.bybit.com/v5/market/kline"
+_ORDER = "https://api-testnet.bybit.com/v5/order/create"
+
+
+def _api_error(code):
+    return InvalidRequestError(request="", message="error", status_code=code, time="", resp_headers={})
+
+
+def _http_error(status):
+    return FailedRequestError(request="", message=f"HTTP {status}", status_code=status, time="", resp_headers={})
+
+
+class _Scheduler:
+    def __init__(self):
+        self.acquired = []
+
+    def acquire(self, group):
+        self.acquired.append(group)
+
+
+def _transport(errors, **config):
+    """BybitHTTP, у которого _send по очереди бросает errors, затем отвечает."""
+    http = BybitHTTP({"retry_backoff": 0, "circuit_threshold": 3, **config},
+                     testnet=True, api_key="key", api_secret="secret")
+    http.clock.fetch_ms = lambda: time.time() * 1000
+    http.sent = []
+    errors = list(errors)
+
+    def send(method, path, query, auth, timeout):
+        http.sent.append((method, timeout))
+        if errors:
+            raise errors.pop(0)
+        return {"retCode": 0}
+
+    http._send = send
+    return http
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = types.SimpleNamespace(now=0.0)
+    monkeypatch.setattr(transport, "time", types.SimpleNamespace(
+        monotonic=lambda: clock.now, time=time.time, sleep=lambda _: None,
+    ))
+    return clock
+
+
+def test_circuit_opens_and_lets_one_trial_through(clock):
+    breaker = CircuitBreaker(threshold=2, reset_timeout=30)
+    breaker.failure()
+    breaker.before_call()
+    breaker.failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    # полуоткрытая цепь: один пробный запрос, остальные ждут его результата
+    clock.now += 30
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    # пробный запрос не прошёл — снова ждём reset_timeout
+    breaker.failure()
+    clock.now += 29
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    clock.now += 1
+    breaker.before_call()
+    breaker.success()
+    breaker.before_call()
+    breaker.before_call()
+
+
+def test_get_is_retried_on_server_errors(clock):
+    http = _transport([_http_error(502), _api_error(transport.SERVICE_ERROR_CODE)])
+    assert http._submit_request("GET", _KLINE, {"symbol": "BTCUSDT"}) == {"retCode": 0}
+    assert len(http.sent) == 3
+    # таймаут чтения — по группе эндпоинта
+    assert http.sent[0][1] == (3, transport.DEFAULT_TIMEOUTS["market"])
+
+    http = _transport([_http_error(502)] * 3)
+    with pytest.raises(FailedRequestError):
+        http._submit_request("GET", _KLINE, {})
+    assert len(http.sent) == 3
+
+
+def test_post_is_retried_only_before_the_request_is_sent(clock):
+    http = _transport([requests.ReadTimeout("read")])
+    with pytest.raises(requests.ReadTimeout):
+        http._submit_request("POST", _ORDER, {}, auth=True)
+    assert len(http.sent) == 1
+
+    http = _transport([requests.ConnectTimeout("connect")])
+    assert http._submit_request("POST", _ORDER, {}, auth=True) == {"retCode": 0}
+    assert len(http.sent) == 2
+
+    http = _transport([_http_error(502)])
+    with pytest.raises(FailedRequestError):
+        http._submit_request("POST", _ORDER, {}, auth=True)
+    assert len(http.sent) == 1
+
+
+def test_timestamp_error_resyncs_clock_and_retries(clock):
+    http = _transport([_api_error(transport.TIMESTAMP_ERROR_CODE)])
+    synced = []
+    http.clock.sync = lambda: synced.append(True)
+    assert http._submit_request("POST", _ORDER, {}, auth=True) == {"retCode": 0}
+    assert synced == [True]
+    assert len(http.sent) == 2
+
+
+def test_client_errors_are_not_retried_and_do_not_open_circuit(clock):
+    http = _transport([_api_error(10001)] * 5)
+    for _ in range(5):
+        with pytest.raises(InvalidRequestError):
+            http._submit_request("GET", _KLINE, {})
+    assert len(http.sent) == 5
+    assert http.breaker._opened_at is None
+
+
+def test_failures_open_circuit(clock):
+    http = _transport([requests.ConnectionError("reset")] * 3, request_retries=0)
+    for _ in range(3):
+        with pytest.raises(requests.ConnectionError):
+            http._submit_request("GET", _KLINE, {})
+    with pytest.raises(CircuitOpenError):
+        http._submit_request("GET", _KLINE, {})
+    assert len(http.sent) == 3
+
+
+def test_retries_take_scheduler_quota(clock):
+    http = _transport([_http_error(502), _http_error(503)])
+    http.scheduler = _Scheduler()
+    http._submit_request("GET", _KLINE, {})
+    # первую попытку оплачивает ScheduledClient
+    assert http.scheduler.acquired == ["market", "market"]
+
+
+def test_server_clock_offset():
+    local_ms = time.time() * 1000
+    clock = ServerClock(lambda: time.time() * 1000 + 5000, sync_interval=0)
+    assert clock.now_ms() - local_ms == pytest.approx(5000, abs=1000)
+    assert clock.offset_ms == pytest.approx(5000, abs=50)
+
+    # биржа недоступна — остаётся прежнее смещение
+    def fail():
+        raise requests.ConnectionError("down")
+
+    clock.fetch_ms = fail
+    assert clock.sync() == pytest.approx(5000, abs=50)
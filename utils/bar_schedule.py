@@ -0,0 +1,126 @@
+# utils/bar_schedule.py
+import asyncio
+import inspect
+import logging
+import threading
+import time
+
+from exchange.kline_cache import interval_to_ms
+from utils.metrics import METRICS
+
+logger = logging.getLogger("vetlan_strategy")
+
+# Недельные свечи Bybit открываются в понедельник 00:00 UTC, а 1970-01-01 — четверг
+_WEEK_OFFSET_MS = 4 * 86_400_000
+
+
+def next_bar_close(now_ms, interval_ms, offset_ms=0):
+    """Время закрытия текущей свечи (= открытия следующей), мс."""
+    return ((now_ms - offset_ms) // interval_ms + 1) * interval_ms + offset_ms
+
+
+class _Task:
+    __slots__ = ("name", "period", "fn", "due")
+
+    def __init__(self, name, period, fn):
+        self.name = name
+        self.period = period
+        self.fn = fn
+        self.due = time.monotonic() + period
+
+
+class BarSchedule:
+    """
+    Расписание главного цикла: полный проход по монетам — через delay
+    секунд после закрытия свечи interval (по часам биржи clock, если
+    задан ServerClock), между закрытиями — только лёгкие задачи
+    (сверка позиций, баланс), каждая со своим периодом.
+
+    Задержка пробуждения после закрытия — в гистограмму bar_wakeup_lag_seconds.
+    """
+
+    def __init__(self, interval, delay=0.05, clock=None):
+        self.interval_ms = interval_to_ms(interval)
+        if self.interval_ms is None:
+            raise ValueError(f"Интервал {interval} не поддерживается расписанием по закрытию свечи")
+        self.offset_ms = _WEEK_OFFSET_MS if str(interval) == "W" else 0
+        self.delay = delay
+        self.clock = clock
+        self._tasks = []
+        self._stop = threading.Event()
+
+    def every(self, period, fn, name=None):
+        """Лёгкая задача раз в period секунд (первый запуск — через period)."""
+        if period and period > 0:
+            self._tasks.append(_Task(name or getattr(fn, "__name__", "task"), period, fn))
+        return self
+
+    def now_ms(self):
+        if self.clock is not None:
+            return self.clock.now_ms()
+        return int(time.time() * 1000)
+
+    def next_close_ms(self):
+        return next_bar_close(self.now_ms(), self.interval_ms, self.offset_ms)
+
+    def stop(self):
+        self._stop.set()
+
+    # ---------------------------
+    # Ожидание закрытия свечи
+    # ---------------------------
+    def wait(self):
+        """
+        Ждёт закрытия свечи, выполняя по пути лёгкие задачи. Возвращает
+        время закрытия (мс) или None, если расписание остановлено.
+        """
+        close_ms = self.next_close_ms()
+        while not self._stop.is_set():
+            for task in self._due():
+                try:
+                    task.fn()
+                except Exception as e:
+                    logger.warning("Ошибка задачи %s: %s", task.name, e)
+            sleep = self._sleep_time(close_ms)
+            if sleep is None:
+                return self._woke(close_ms)
+            self._stop.wait(sleep)
+        return None
+
+    async def wait_async(self):
+        """То же, что wait, для asyncio (задачи могут быть корутинами)."""
+        close_ms = self.next_close_ms()
+        while not self._stop.is_set():
+            for task in self._due():
+                try:
+                    result = task.fn()
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception as e:
+                    logger.warning("Ошибка задачи %s: %s", task.name, e)
+            sleep = self._sleep_time(close_ms)
+            if sleep is None:
+                return self._woke(close_ms)
+            await asyncio.sleep(sleep)
+        return None
+
+    def _due(self):
+        now = time.monotonic()
+        due = [task for task in self._tasks if task.due <= now]
+        for task in due:
+            task.due = now + task.period
+        return due
+
+    def _sleep_time(self, close_ms):
+        """Сколько спать до закрытия свечи или ближайшей задачи; None — пора."""
+        until_close = (close_ms - self.now_ms()) / 1000 + self.delay
+        if until_close <= 0:
+            return None
+        if self._tasks:
+            until_task = min(task.due for task in self._tasks) - time.monotonic()
+            return max(0.0, min(until_close, until_task))
+        return until_close
+
+    def _woke(self, close_ms):
+        METRICS.observe("bar_wakeup_lag_seconds", max(0.0, (self.now_ms() - close_ms) / 1000))
+        return close_ms
@@ -0,0 +1,243 @@
+# utils/metrics.py
+"""
+Лёгкие метрики: счётчики и гистограммы времени с метками.
+
+Запись — одна блокировка и несколько сложений, поэтому метрики можно
+держать включёнными всегда. Данные отдаются в формате Prometheus
+(MetricsServer, /metrics) и периодической строкой в лог (start_summary_log).
+"""
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Границы корзин гистограмм, секунды
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        # с последней сводки в лог
+        self.window_count = 0
+        self.window_sum = 0.0
+        self.window_max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.window_count += 1
+        self.window_sum += value
+        if value > self.window_max:
+            self.window_max = value
+
+
+class Metrics:
+    """Реестр метрик. Метки — именованные аргументы (endpoint="get_kline")."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    # ---------------------------
+    # Запись
+    # ---------------------------
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = _Histogram(self.buckets)
+            hist.observe(seconds)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """
+        Время выполнения блока в гистограмму name; исключения считаются
+        в счётчике с суффиксом _errors_total (bybit_request_seconds ->
+        bybit_request_errors_total).
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            base = name[:-len("_seconds")] if name.endswith("_seconds") else name
+            self.inc(f"{base}_errors_total", error=type(e).__name__, **labels)
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    # ---------------------------
+    # Вывод
+    # ---------------------------
+    def render(self):
+        """Текст в формате Prometheus."""
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, list(h.counts), h.count, h.sum) for key, h in self._histograms.items()
+            )
+
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{_labels(labels)} {value}")
+
+        for (name, labels), counts, count, total in histograms:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f"{name}_bucket{_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{name}_sum{_labels(labels)} {total:.6f}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self, reset=True):
+        """
+        Строка-сводка по гистограммам с прошлой сводки:
+        имя{метки} n=вызовов avg=среднее max=максимум (мс).
+        """
+        parts = []
+        with self._lock:
+            for (name, labels), hist in sorted(self._histograms.items()):
+                if not hist.window_count:
+                    continue
+                avg = hist.window_sum / hist.window_count
+                parts.append(
+                    f"{name}{_labels(labels)} n={hist.window_count} "
+                    f"avg={avg * 1000:.1f}ms max={hist.window_max * 1000:.1f}ms"
+                )
+                if reset:
+                    hist.window_count = 0
+                    hist.window_sum = 0.0
+                    hist.window_max = 0.0
+        return "; ".join(parts)
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+# Общий реестр процесса
+METRICS = Metrics()
+
+
+class InstrumentedClient:
+    """
+    Прокси над pybit HTTP-клиентом: время каждого публичного метода
+    в гистограмму bybit_request_seconds{endpoint=имя метода}.
+    """
+
+    def __init__(self, client, metrics=METRICS):
+        self._client = client
+        self.metrics = metrics
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            with self.metrics.timer("bybit_request_seconds", endpoint=name):
+                return attr(*args, **kwargs)
+
+        return call
+
+
+# ---------------------------
+# HTTP-эндпоинт и сводка в лог
+# ---------------------------
+class MetricsServer:
+    """GET /metrics на host:port в фоновом потоке."""
+
+    def __init__(self, metrics=METRICS, host="127.0.0.1", port=9100):
+        handler = type("Handler", (_MetricsHandler,), {"metrics": metrics})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    metrics = None
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_summary_log(interval, metrics=METRICS, logger_name="vetlan_strategy"):
+    """Раз в interval секунд пишет сводку метрик в лог. Возвращает Event для остановки."""
+    logger = logging.getLogger(logger_name)
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(interval):
+            line = metrics.summary()
+            if line:
+                logger.info("📈 Метрики: %s", line)
+
+    threading.Thread(target=loop, name="metrics-log", daemon=True).start()
+    return stop
+
+
+def start_metrics(config, metrics=METRICS):
+    """
+    Запускает эндпоинт (metrics_port) и сводку в лог (metrics_log_interval)
+    по настройкам. Возвращает функцию остановки.
+    """
+    server = None
+    if config.get("metrics_port"):
+        server = MetricsServer(
+            metrics, config.get("metrics_host", "127.0.0.1"), config["metrics_port"]
+        ).start()
+
+    stop_log = None
+    if config.get("metrics_log_interval", 300):
+        stop_log = start_summary_log(config.get("metrics_log_interval", 300), metrics)
+
+    def stop():
+        if server is not None:
+            server.stop()
+        if stop_log is not None:
+            stop_log.set()
+
+    return stop
@@ -1,28 +1,190 @@
+import html
+import queue
+import threading
+import time
 import requests
 import logging
 
+from utils.metrics import METRICS
+
 logger = logging.getLogger("bot")
 
+# Telegram принимает сообщения до 4096 символов
+MAX_MESSAGE_LENGTH = 4096
+
+_STOP = object()
+
+
 class TelegramNotifier:
-    def __init__(self, token: str, chat_id: str):
+    """
+    Уведомления в Telegram через очередь: send() только кладёт сообщение
+    в очередь, отправляет фоновый поток (один HTTP-сеанс на все запросы).
+
+    Сообщения, пришедшие в течение batch_window секунд, склеиваются в одно;
+    между отправками выдерживается min_interval, на ответ 429 поток ждёт
+    retry_after и повторяет. Переполненная очередь отбрасывает сообщение,
+    но не задерживает торговлю. close() дожидается отправки очереди.
+
+    Текст экранируется для parse_mode=HTML ("<", ">", "&" в решениях
+    стратегии). Если Telegram всё же отклонил склеенную пачку (400),
+    её сообщения отправляются по одному.
+    """
+
+    def __init__(self, token: str, chat_id: str, queue_size=100, batch_window=1.0, min_interval=1.0):
         self.token = token
         self.chat_id = chat_id
         self.base_url = f"https://api.telegram.org/bot{self.token}/sendMessage"
+        self.batch_window = batch_window
+        self.min_interval = min_interval
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._session = requests.Session()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self._last_sent = 0.0
 
     def send(self, text: str):
-        """Отправка HTML-сообщения в Telegram"""
+        """Ставит сообщение в очередь (не блокирует)"""
         if not self.token or not self.chat_id:
             logger.warning("⚠️ Telegram токен или chat_id не заданы, уведомление не отправлено.")
             return
 
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(_truncate(html.escape(text, quote=False)))
+        except queue.Full:
+            METRICS.inc("telegram_dropped_total")
+            logger.warning("Очередь Telegram переполнена, уведомление отброшено.")
+
+    def close(self, timeout=10):
+        """Отправляет оставшиеся сообщения и останавливает поток"""
+        worker = self._worker
+        if worker is None:
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        worker.join(timeout)
+        self._worker = None
+        self._session.close()
+
+    # ---------------------------
+    # Фоновая отправка
+    # ---------------------------
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="telegram", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        pending = []
+        stopping = False
+        while not stopping or pending:
+            if not pending:
+                item = self._queue.get()
+                if item is _STOP:
+                    break
+                pending.append(item)
+
+            # собираем пачку сообщений за batch_window
+            deadline = time.monotonic() + self.batch_window
+            while not stopping:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                else:
+                    pending.append(item)
+
+            parts, pending = _coalesce(pending)
+            self._deliver(parts)
+
+    def _deliver(self, parts):
+        status = self._deliver_text("\n\n".join(parts))
+        if status == "400" and len(parts) > 1:
+            # одно сообщение с ошибкой разметки не должно утянуть всю пачку
+            for part in parts:
+                self._deliver_text(part)
+
+    def _deliver_text(self, text):
+        """Отправка с повторами; возвращает статус последней попытки."""
+        wait = self.min_interval - (time.monotonic() - self._last_sent)
+        if wait > 0:
+            time.sleep(wait)
+
+        backoff = 1.0
+        status = None
+        for _ in range(3):
+            status, retry_after = self._post(text)
+            if retry_after is None:
+                break
+            # 429 — ждём, сколько просит Telegram, иначе экспоненциальная пауза
+            time.sleep(retry_after or backoff)
+            backoff *= 2
+        return status
+
+    def _post(self, text):
+        """
+        Один запрос sendMessage. Возвращает (статус, retry_after): статус —
+        "ok", код ответа или "error" (сеть); retry_after — None, если
+        повторять не нужно, пауза из ответа 429 и 0 при временной ошибке
+        (сеть, 5xx).
+        """
+        started = time.perf_counter()
+        status = "ok"
+        retry_after = None
         try:
             payload = {
                 "chat_id": self.chat_id,
                 "text": text,
                 "parse_mode": "HTML"
             }
-            response = requests.post(self.base_url, json=payload, timeout=10)
-            if response.status_code != 200:
+            response = self._session.post(self.base_url, json=payload, timeout=10)
+            if response.status_code == 429:
+                status = "429"
+                try:
+                    retry_after = float(response.json().get("parameters", {}).get("retry_after", 5))
+                except ValueError:
+                    retry_after = 5.0
+                logger.warning(f"Telegram: слишком много запросов, пауза {retry_after:.0f} с")
+            elif response.status_code != 200:
+                status = str(response.status_code)
                 logger.warning(f"Ошибка Telegram API: {response.text}")
+                if response.status_code >= 500:
+                    retry_after = 0.0
         except Exception as e:
+            status = "error"
+            retry_after = 0.0
             logger.warning(f"Ошибка отправки Telegram-сообщения: {e}")
+        self._last_sent = time.monotonic()
+        METRICS.observe("telegram_send_seconds", time.perf_counter() - started, status=status)
+        return status, retry_after
+
+
+def _truncate(text):
+    """Обрезает экранированный текст до лимита Telegram, не разрывая &lt; и т.п."""
+    if len(text) <= MAX_MESSAGE_LENGTH:
+        return text
+    text = text[:MAX_MESSAGE_LENGTH]
+    amp = text.rfind("&")
+    if amp != -1 and ";" not in text[amp:]:
+        text = text[:amp]
+    return text
+
+
+def _coalesce(messages):
+    """Сообщения для одной отправки (вместе не длиннее лимита Telegram) и остаток."""
+    used = 1
+    length = len(messages[0])
+    for message in messages[1:]:
+        if length + 2 + len(message) > MAX_MESSAGE_LENGTH:
+            break
+        length += 2 + len(message)
+        used += 1
+    return messages[:used], messages[used:]
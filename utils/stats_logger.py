@@ -1,34 +1,112 @@
 import csv
+import glob
+import io
+import json
 import os
+import sqlite3
+import threading
+import time
 from datetime import datetime
 
+HEADER = [
+    "Дата",
+    "Символ",
+    "Направление",
+    "Цена входа",
+    "TP",
+    "SL",
+    "Цена выхода",
+    "PnL (USDT)",
+    "ROI (%)",
+    "Результат",
+    "Комиссия (USDT)",
+]
+
+CLOSED_RESULTS = ("Прибыль", "Убыток")
+
+
+class TradeTotals:
+    """
+    Накопительные итоги журнала сделок: обновляются на каждой записи,
+    поэтому сводка считается за O(1), без перечитывания истории.
+    """
+
+    FIELDS = ("total_trades", "open_trades", "closed_trades", "wins", "losses",
+              "total_pnl", "sum_wins", "sum_losses")
+
+    def __init__(self, **values):
+        for name in self.FIELDS:
+            setattr(self, name, values.get(name, 0))
+
+    def add(self, result, pnl):
+        """result — колонка «Результат», pnl — PnL в том виде, как он записан в журнал."""
+        self.total_trades += 1
+        if result == "Открыта":
+            self.open_trades += 1
+        if result not in CLOSED_RESULTS:
+            return
+        self.closed_trades += 1
+        if pnl is None:
+            return
+        self.total_pnl += pnl
+        if pnl > 0:
+            self.wins += 1
+            self.sum_wins += pnl
+        elif pnl < 0:
+            self.losses += 1
+            self.sum_losses += pnl
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    def summary(self):
+        if not self.total_trades:
+            return None
+        return _summary(**self.to_dict())
+
 
 class StatsLogger:
-    """Логирование статистики торговли"""
+    """
+    Журнал сделок.
+
+    backend="csv" — logs/stats.csv (формат прежний): файл держится открытым
+    на дозапись, fsync не чаще раза в fsync_interval секунд, ротация по
+    размеру (max_bytes) и/или по дате (rotate_daily) в stats.<дата-время>.csv.
+    Итоги (TradeTotals) лежат рядом в stats.summary.json вместе со смещением
+    в текущем файле: при старте дочитывается только хвост после смещения.
+
+    backend="sqlite" — таблица trades в stats.sqlite с индексами по символу
+    и времени (быстрые выборки по многолетней истории через trades()).
+    """
 
-    def __init__(self, file_path="logs/stats.csv"):
+    def __init__(self, file_path="logs/stats.csv", backend="csv", fsync_interval=5.0,
+                 max_bytes=None, rotate_daily=False):
         self.file_path = file_path
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        
-        # Инициализация файла, если не существует
-        if not os.path.exists(file_path):
-            with open(file_path, "w", newline="", encoding="utf-8") as f:
-                writer = csv.writer(f)
-                writer.writerow([
-                    "Дата",
-                    "Символ",
-                    "Направление",
-                    "Цена входа",
-                    "TP",
-                    "SL",
-                    "Цена выхода",
-                    "PnL (USDT)",
-                    "ROI (%)",
-                    "Результат",
-                ])
-
-    def log_trade(self, symbol, direction, entry, tp, sl, exit_price=None, pnl=None, roi=None):
-        """Записывает сделку в stats.csv"""
+        self.backend = backend
+        self.fsync_interval = fsync_interval
+        self.max_bytes = max_bytes
+        self.rotate_daily = rotate_daily
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+
+        base, _ = os.path.splitext(file_path)
+        self.summary_path = base + ".summary.json"
+        self.db_path = base + ".sqlite"
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._db = None
+        self._dirty = False
+        self._last_sync = time.monotonic()
+
+        if backend == "sqlite":
+            self._open_sqlite()
+        elif backend == "csv":
+            self._open_csv()
+        else:
+            raise ValueError(f"Неизвестный backend журнала сделок: {backend}")
+
+    def log_trade(self, symbol, direction, entry, tp, sl, exit_price=None, pnl=None, roi=None, fee=None):
+        """Записывает сделку в журнал (fee — комиссии биржи за сделку, если известны)"""
         result = "Открыта"
         if exit_price is not None:
             if pnl is not None:
@@ -36,58 +114,290 @@ class StatsLogger:
             else:
                 result = "Закрыта"
 
-        with open(self.file_path, "a", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                symbol,
-                direction.upper(),
-                f"{entry:.6f}",
-                f"{tp:.6f}",
-                f"{sl:.6f}",
-                f"{exit_price:.6f}" if exit_price else "",
-                f"{pnl:.4f}" if pnl is not None else "",
-                f"{roi:.2f}" if roi is not None else "",
-                result,
-            ])
+        row = [
+            datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            symbol,
+            direction.upper(),
+            f"{entry:.6f}",
+            f"{tp:.6f}",
+            f"{sl:.6f}",
+            f"{exit_price:.6f}" if exit_price else "",
+            f"{pnl:.4f}" if pnl is not None else "",
+            f"{roi:.2f}" if roi is not None else "",
+            result,
+            f"{fee:.4f}" if fee is not None else "",
+        ]
+
+        with self._lock:
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT INTO trades VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [row[0], row[1], row[2], float(row[3]), float(row[4]), float(row[5]),
+                     _float(row[6]), _float(row[7]), _float(row[8]), row[9], _float(row[10])],
+                )
+            else:
+                self._maybe_rotate()
+                self._file.write(_csv_line(row))
+                # в ОС отдаём сразу, на диск — периодически
+                self._file.flush()
+
+            # итоги считаем по округлённому PnL — как при пересчёте из файла
+            self.totals.add(result, _float(row[7]))
+            self._dirty = True
+            if time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
 
     def get_summary(self):
-        """Возвращает сводную статистику из файла"""
-        if not os.path.exists(self.file_path):
-            return None
+        """Возвращает сводную статистику (из накопительных итогов)"""
+        with self._lock:
+            return self.totals.summary()
+
+    def trades(self, symbol=None, start=None, end=None):
+        """
+        Сделки (словари с колонками HEADER) с фильтром по символу и
+        дате «YYYY-MM-DD HH:MM:SS» (границы включительно).
+        """
+        with self._lock:
+            if self._db is not None:
+                self._db.commit()
+                query, args = "SELECT * FROM trades WHERE 1=1", []
+                if symbol:
+                    query += " AND symbol = ?"
+                    args.append(symbol)
+                if start:
+                    query += " AND ts >= ?"
+                    args.append(start)
+                if end:
+                    query += " AND ts <= ?"
+                    args.append(end)
+                rows = self._db.execute(query + " ORDER BY ts", args).fetchall()
+                return [dict(zip(HEADER, _csv_values(row))) for row in rows]
+
+            self._file.flush()
+            selected = []
+            for path in self._csv_files():
+                with open(path, "r", encoding="utf-8") as f:
+                    for row in csv.DictReader(f):
+                        if symbol and row["Символ"] != symbol:
+                            continue
+                        if (start and row["Дата"] < start) or (end and row["Дата"] > end):
+                            continue
+                        selected.append(row)
+            return selected
+
+    def flush(self):
+        """Сбрасывает журнал и итоги на диск"""
+        with self._lock:
+            self._sync()
+
+    def close(self):
+        with self._lock:
+            self._sync()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if self._db is not None:
+                self._db.close()
+                self._db = None
 
-        trades = []
+    # ---------------------------
+    # CSV
+    # ---------------------------
+    def _open_csv(self):
+        if not os.path.exists(self.file_path) or os.path.getsize(self.file_path) == 0:
+            self._start_file()
+        self._file = open(self.file_path, "a", newline="", encoding="utf-8")
+        self._opened_day = _file_day(self.file_path)
+
+        saved = _load_json(self.summary_path)
+        size = os.path.getsize(self.file_path)
+        if saved and saved.get("offset", size + 1) <= size:
+            # итоги сохранены на смещении offset — дочитываем только новые строки
+            self.totals = TradeTotals(**saved.get("totals", {}))
+            self._read_rows(self.file_path, saved["offset"])
+        else:
+            self.totals = TradeTotals()
+            for path in self._csv_files():
+                self._read_rows(path, 0)
+        self._dirty = True
+
+        # файл со старым набором колонок уходит в архив, новый — с текущим заголовком
         with open(self.file_path, "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                trades.append(row)
+            header = next(csv.reader([f.readline()]), [])
+        if header != HEADER:
+            self._rotate()
+        self._sync()
 
-        if not trades:
-            return None
+    def _start_file(self):
+        with open(self.file_path, "w", newline="", encoding="utf-8") as f:
+            f.write(_csv_line(HEADER))
+
+    def _read_rows(self, path, offset):
+        with open(path, "rb") as f:
+            f.seek(offset)
+            text = f.read().decode("utf-8")
+        reader = csv.reader(io.StringIO(text, newline=""))
+        for row in reader:
+            # строки журнала без колонки комиссии (старый формат) тоже учитываются
+            if len(row) < 10 or row[0] == HEADER[0]:
+                continue
+            self.totals.add(row[9], _float(row[7]))
+
+    def _csv_files(self):
+        """Архивные файлы (по времени ротации) и текущий."""
+        base, ext = os.path.splitext(self.file_path)
+        return sorted(glob.glob(f"{glob.escape(base)}.*-*{ext}")) + [self.file_path]
+
+    def _maybe_rotate(self):
+        size = self._file.tell()
+        by_size = self.max_bytes and size >= self.max_bytes
+        by_day = self.rotate_daily and self._opened_day != datetime.now().date()
+        if not (by_size or by_day) or size <= len(_csv_line(HEADER).encode("utf-8")):
+            return
+        self._rotate()
+
+    def _rotate(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        base, ext = os.path.splitext(self.file_path)
+        os.replace(self.file_path, f"{base}.{datetime.now():%Y%m%d-%H%M%S-%f}{ext}")
+        self._start_file()
+        self._file = open(self.file_path, "a", newline="", encoding="utf-8")
+        self._opened_day = datetime.now().date()
+        self._dirty = True
+        self._sync()
+
+    # ---------------------------
+    # SQLite
+    # ---------------------------
+    def _open_sqlite(self):
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS trades (
+                ts TEXT, symbol TEXT, direction TEXT, entry REAL, tp REAL, sl REAL,
+                exit_price REAL, pnl REAL, roi REAL, result TEXT, fee REAL
+            )"""
+        )
+        columns = [c[1] for c in self._db.execute("PRAGMA table_info(trades)")]
+        if "fee" not in columns:
+            self._db.execute("ALTER TABLE trades ADD COLUMN fee REAL")
+        self._db.execute("CREATE INDEX IF NOT EXISTS trades_ts ON trades (ts)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS trades_symbol_ts ON trades (symbol, ts)")
+        self._db.commit()
+
+        closed = "result IN ('Прибыль', 'Убыток')"
+        row = self._db.execute(
+            f"""SELECT COUNT(*),
+                SUM(result = 'Открыта'),
+                SUM({closed}),
+                SUM({closed} AND pnl > 0),
+                SUM({closed} AND pnl < 0),
+                TOTAL(CASE WHEN {closed} THEN pnl END),
+                TOTAL(CASE WHEN {closed} AND pnl > 0 THEN pnl END),
+                TOTAL(CASE WHEN {closed} AND pnl < 0 THEN pnl END)
+            FROM trades"""
+        ).fetchone()
+        self.totals = TradeTotals(**dict(zip(TradeTotals.FIELDS, (0 if v is None else v for v in row))))
+
+    # ---------------------------
+    # Сброс на диск
+    # ---------------------------
+    def _sync(self):
+        self._last_sync = time.monotonic()
+        if not self._dirty:
+            return
+        if self._db is not None:
+            self._db.commit()
+        elif self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            _save_json(self.summary_path, {"offset": self._file.tell(), "totals": self.totals.to_dict()})
+        self._dirty = False
+
+
+def summarize_trades(profits, total_trades=None, open_trades=0, closed_trades=None):
+    """
+    Сводная статистика по списку PnL закрытых сделок
+    (та же, что StatsLogger.get_summary, — используется и в бэктесте).
+    """
+    if closed_trades is None:
+        closed_trades = len(profits)
+    if total_trades is None:
+        total_trades = closed_trades + open_trades
 
-        closed_trades = [t for t in trades if t["Результат"] in ["Прибыль", "Убыток"]]
-        
-        if not closed_trades:
-            return {
-                "total_trades": len(trades),
-                "open_trades": len([t for t in trades if t["Результат"] == "Открыта"]),
-                "closed_trades": 0,
-            }
+    wins = [p for p in profits if p > 0]
+    losses = [p for p in profits if p < 0]
+    return _summary(
+        total_trades, open_trades, closed_trades, len(wins), len(losses),
+        sum(profits), sum(wins), sum(losses),
+    )
 
-        profits = [float(t["PnL (USDT)"]) for t in closed_trades if t["PnL (USDT)"]]
-        wins = [p for p in profits if p > 0]
-        losses = [p for p in profits if p < 0]
 
+def _summary(total_trades, open_trades, closed_trades, wins, losses, total_pnl, sum_wins, sum_losses):
+    if not closed_trades:
         return {
-            "total_trades": len(trades),
-            "open_trades": len([t for t in trades if t["Результат"] == "Открыта"]),
-            "closed_trades": len(closed_trades),
-            "wins": len(wins),
-            "losses": len(losses),
-            "win_rate": (len(wins) / len(closed_trades) * 100) if closed_trades else 0,
-            "total_pnl": sum(profits),
-            "avg_win": sum(wins) / len(wins) if wins else 0,
-            "avg_loss": sum(losses) / len(losses) if losses else 0,
-            "profit_factor": abs(sum(wins) / sum(losses)) if losses and sum(losses) != 0 else 0,
+            "total_trades": total_trades,
+            "open_trades": open_trades,
+            "closed_trades": 0,
         }
 
+    return {
+        "total_trades": total_trades,
+        "open_trades": open_trades,
+        "closed_trades": closed_trades,
+        "wins": wins,
+        "losses": losses,
+        "win_rate": (wins / closed_trades * 100) if closed_trades else 0,
+        "total_pnl": total_pnl,
+        "avg_win": sum_wins / wins if wins else 0,
+        "avg_loss": sum_losses / losses if losses else 0,
+        "profit_factor": abs(sum_wins / sum_losses) if losses and sum_losses != 0 else 0,
+    }
+
+
+# ---------------------------
+# Вспомогательные функции
+# ---------------------------
+def _csv_line(row):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(row)
+    return buffer.getvalue()
+
+
+def _csv_values(row):
+    """Строка таблицы trades -> значения в формате CSV-журнала."""
+    ts, symbol, direction, entry, tp, sl, exit_price, pnl, roi, result, fee = row
+    return [
+        ts, symbol, direction, f"{entry:.6f}", f"{tp:.6f}", f"{sl:.6f}",
+        f"{exit_price:.6f}" if exit_price else "",
+        f"{pnl:.4f}" if pnl is not None else "",
+        f"{roi:.2f}" if roi is not None else "",
+        result,
+        f"{fee:.4f}" if fee is not None else "",
+    ]
+
+
+def _float(value):
+    return float(value) if value not in ("", None) else None
+
+
+def _file_day(path):
+    return datetime.fromtimestamp(os.path.getmtime(path)).date()
+
+
+def _load_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_json(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)